@@ -0,0 +1,4 @@
+"""python -m src: start the till (see src.main.main)."""
+from src.main import main
+
+main()
@@ -0,0 +1,193 @@
+"""Hot/cold archival of order history.
+
+Completed orders whose bill is paid and that are older than ARCHIVE_AFTER_DAYS are moved, with
+their items, payments, bill, discounts and loyalty point logs, into the matching *_archive tables.
+Each chunk of ARCHIVE_CHUNK_SIZE orders is copied and deleted in its own transaction, so the
+till's tables (and their indexes) stay the size of the recent history however much accumulates.
+
+Ids are copied as they are. Feedbacks and complaints on an archived order move their order_id to
+archived_order_id, so both still reference a real order. Reports that need the whole history read
+union_table() here, or the *_all views in the MySQL DDL script.
+
+Usage: python -m src.archive [--older-than-days 90] [--chunk-size 1000] [--max-chunks N] [--dry-run]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select, insert, update, delete, func, bindparam
+from src.controller import BaseCRUD
+from src.database import engine
+from src.logger import logger
+from src.settings import ARCHIVE_AFTER_DAYS, ARCHIVE_CHUNK_SIZE
+from src.utils import render_as_table
+
+# Hot tables with an archive twin, parents first: copied in this order and deleted in reverse.
+ARCHIVED_TABLES = ('orders', 'order_items', 'order_payments', 'order_bills', 'order_discounts', 'loyalty_points_logs')
+
+# Tables whose order_id moves to archived_order_id when their order is archived.
+ORDER_REFERENCES = ('feedbacks', 'complaints')
+
+hot_tables = {table_name: BaseCRUD(table_name) for table_name in ARCHIVED_TABLES}
+archive_tables = {table_name: BaseCRUD(f"{table_name}_archive") for table_name in ARCHIVED_TABLES}
+reference_tables = {table_name: BaseCRUD(table_name) for table_name in ORDER_REFERENCES}
+
+
+def archive_cutoff(older_than_days=ARCHIVE_AFTER_DAYS) -> datetime:
+    return datetime.now() - timedelta(days=older_than_days)
+
+
+def union_table(table_name):
+    """Hot and archived rows of table_name as one selectable (a UNION ALL subquery named <table>_all)."""
+    hot = hot_tables[table_name].table
+    cold = archive_tables[table_name].table
+    return (
+        select(*hot.c)
+        .union_all(select(*[cold.c[column.name] for column in hot.c]))
+        .subquery(f"{table_name}_all")
+    )
+
+
+def linked_order_id(table):
+    """The order a feedbacks / complaints row is about, whether that order is hot or archived."""
+    return func.coalesce(table.c.order_id, table.c.archived_order_id).label('order_id')
+
+
+def _eligible_orders(limit):
+    """Archivable order_ids (created before :cutoff, after :after_id), oldest first, at most limit."""
+    o = hot_tables['orders'].table
+    ob = hot_tables['order_bills'].table
+    stmt = (
+        select(o.c.order_id)
+        .select_from(o.join(ob, o.c.order_id == ob.c.order_id))
+        .where(o.c.order_status == 'completed', ob.c.payment_status == 'paid',
+               o.c.created_at < bindparam('cutoff'), o.c.order_id > bindparam('after_id'))
+        .order_by(o.c.order_id)
+    )
+    return stmt.limit(limit) if limit is not None else stmt
+
+
+def _copy_statement(table_name):
+    hot_crud = hot_tables[table_name]
+    hot, cold = hot_crud.table, archive_tables[table_name].table
+    return hot_crud._cached(
+        ('archive_copy',),
+        lambda: insert(cold).from_select(
+            [column.name for column in hot.c],
+            select(*hot.c).where(hot.c.order_id.in_(bindparam('order_ids', expanding=True)))
+        )
+    )
+
+
+def _delete_statement(table_name):
+    crud = hot_tables[table_name]
+    return crud._cached(
+        ('archive_delete',),
+        lambda: delete(crud.table).where(crud.table.c.order_id.in_(bindparam('order_ids', expanding=True)))
+    )
+
+
+def _relink_statement(table_name):
+    crud = reference_tables[table_name]
+    table = crud.table
+    return crud._cached(
+        ('archive_relink',),
+        lambda: update(table)
+        .where(table.c.order_id.in_(bindparam('order_ids', expanding=True)))
+        # MySQL applies SET left to right, so order_id is copied before it is cleared
+        .ordered_values((table.c.archived_order_id, table.c.order_id), (table.c.order_id, None))
+    )
+
+
+def archive_chunk(conn, order_ids) -> dict:
+    """Move order_ids and everything hanging off them into the archive tables; rows moved per table."""
+    params = {"order_ids": list(order_ids)}
+    moved = {}
+    for table_name in ARCHIVED_TABLES:
+        moved[table_name] = conn.execute(_copy_statement(table_name), params).rowcount
+
+    for table_name in ORDER_REFERENCES:
+        conn.execute(_relink_statement(table_name), params)
+
+    for table_name in reversed(ARCHIVED_TABLES):
+        deleted = conn.execute(_delete_statement(table_name), params).rowcount
+        if deleted != moved[table_name]:
+            raise RuntimeError(f"{table_name}: copied {moved[table_name]} rows but deleted {deleted}; rolling back.")
+    return moved
+
+
+def archive_orders(bind=engine, cutoff=None, chunk_size=ARCHIVE_CHUNK_SIZE, max_chunks=None) -> dict:
+    """Archive every eligible order created before cutoff, chunk_size orders per transaction.
+
+    Returns the rows moved per table and the number of chunks. A failed chunk rolls back on its
+    own; the chunks before it stay archived.
+    """
+    cutoff = cutoff or archive_cutoff()
+    eligible = _eligible_orders(chunk_size)
+    totals = dict.fromkeys(ARCHIVED_TABLES, 0)
+    chunks, after_id = 0, 0
+    started = time.perf_counter()
+
+    while max_chunks is None or chunks < max_chunks:
+        with bind.begin() as conn:
+            order_ids = conn.execute(eligible, {"cutoff": cutoff, "after_id": after_id}).scalars().all()
+            if not order_ids:
+                break
+            moved = archive_chunk(conn, order_ids)
+
+        chunks += 1
+        after_id = order_ids[-1]
+        for table_name, count in moved.items():
+            totals[table_name] += count
+
+    if chunks:
+        for crud in (*hot_tables.values(), *archive_tables.values(), *reference_tables.values()):
+            crud._invalidate_caches()
+    logger.info("Archived %s orders older than %s in %s chunks (%.2fs): %s",
+                totals['orders'], cutoff, chunks, time.perf_counter() - started, totals)
+    return {"cutoff": cutoff, "chunks": chunks, "moved": totals}
+
+
+def count_eligible(conn, cutoff=None) -> int:
+    """How many orders archive_orders() would move right now."""
+    eligible = _eligible_orders(None).subquery()
+    return conn.execute(select(func.count()).select_from(eligible),
+                        {"cutoff": cutoff or archive_cutoff(), "after_id": 0}).scalar()
+
+
+def table_sizes(conn) -> list[dict]:
+    """Row counts of each hot table and its archive."""
+    return [
+        {
+            "table": table_name,
+            "hot_rows": conn.execute(select(func.count()).select_from(hot_tables[table_name].table)).scalar(),
+            "archived_rows": conn.execute(
+                select(func.count()).select_from(archive_tables[table_name].table)).scalar(),
+        }
+        for table_name in ARCHIVED_TABLES
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Move old, completed and paid orders into the archive tables.")
+    parser.add_argument('--older-than-days', type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument('--chunk-size', type=int, default=ARCHIVE_CHUNK_SIZE)
+    parser.add_argument('--max-chunks', type=int, default=None, help="stop after this many chunks")
+    parser.add_argument('--dry-run', action='store_true', help="only count the orders that would be archived")
+    args = parser.parse_args(argv)
+
+    cutoff = archive_cutoff(args.older_than_days)
+    if args.dry_run:
+        with engine.connect() as conn:
+            print(f"{count_eligible(conn, cutoff)} orders created before {cutoff:%Y-%m-%d %H:%M} can be archived.")
+            render_as_table("Table Sizes", table_sizes(conn))
+        return
+
+    result = archive_orders(engine, cutoff, args.chunk_size, args.max_chunks)
+    print(f"Archived {result['moved']['orders']} orders created before {cutoff:%Y-%m-%d %H:%M} "
+          f"in {result['chunks']} chunks.")
+    with engine.connect() as conn:
+        render_as_table("Table Sizes", table_sizes(conn))
+
+
+if __name__ == '__main__':
+    main()
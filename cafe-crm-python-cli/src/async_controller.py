@@ -0,0 +1,243 @@
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy import make_url, text, bindparam
+from src.controller import BaseCRUD, get_dialect, GET_MANY_CHUNK_SIZE, DEFAULT_PAGE_SIZE
+from src.database import db_url, pool_options
+from src.metrics import instrument_engine
+from src.settings import ASYNC_DB_URL
+
+# Async drivers for the sync driver names DB_URL may use.
+ASYNC_DRIVERS = {
+    'mysql': 'aiomysql',
+    'mariadb': 'aiomysql',
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg',
+}
+
+_async_engine = None
+
+
+def async_url(url) -> str:
+    """DB_URL with its driver swapped for the asyncio one, e.g. mysql+pymysql -> mysql+aiomysql."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No asyncio driver known for {backend}; set ASYNC_DB_URL.")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+
+def get_async_engine():
+    """The shared AsyncEngine, created on first use so the sync app never needs the async drivers."""
+    global _async_engine
+    if _async_engine is None:
+        url = ASYNC_DB_URL or async_url(db_url)
+        _async_engine = create_async_engine(url, **pool_options(url))
+        instrument_engine(_async_engine.sync_engine, 'async')
+    return _async_engine
+
+
+class AsyncBaseCRUD(BaseCRUD):
+    """BaseCRUD for AsyncConnection / AsyncSession: same methods and cached statements, awaited.
+
+    Tables are still reflected through the sync engine (and the schema cache) on first use.
+    """
+
+    async def _execute_update(self, conn, filters, data):
+        stmt = self._statement('update', self._filter_shape(filters), tuple(sorted(data)))
+        params = self._filter_params(filters)
+        params.update({f"v_{column}": value for column, value in data.items()})
+        return await conn.execute(stmt, params)
+
+    async def get_all(self, conn, **filters) -> list[dict]:
+        """Retrieve all records matching optional filters."""
+        stmt = self._statement('select', self._filter_shape(filters))
+
+        result = (await conn.execute(stmt, self._filter_params(filters))).mappings().fetchall()
+        return [dict(row) for row in result] if result else []
+
+    async def get_one(self, conn, **filters) -> dict | None:
+        """Retrieve a single record matching filters."""
+        stmt = self._statement('select_one', self._filter_shape(filters))
+
+        result = (await conn.execute(stmt, self._filter_params(filters))).mappings().fetchone()
+        return dict(result) if result else None
+
+    async def get_many(self, conn, column, values, chunk_size=GET_MANY_CHUNK_SIZE) -> list[dict]:
+        """Retrieve all records whose column matches any of values, using chunked IN lists."""
+        keys = list(dict.fromkeys(value for value in values if value is not None))
+        if not keys:
+            return []
+
+        stmt = self._statement('select_in', ((column, False),))
+        rows = []
+        for start in range(0, len(keys), chunk_size):
+            result = (await conn.execute(stmt, {"w_values": keys[start:start + chunk_size]})).mappings()
+            rows.extend(dict(row) for row in result)
+        return rows
+
+    async def get_page(self, conn, limit=DEFAULT_PAGE_SIZE, after=None, **filters) -> tuple[list[dict], tuple | None]:
+        """Fetch up to limit rows ordered by primary key, starting after the key tuple `after`."""
+        filter_shape = self._filter_shape(filters)
+        stmt = self._cached(
+            ('page', filter_shape, after is None),
+            lambda: self._build_page_statement(filter_shape, after is None)
+        )
+        params = self._filter_params(filters)
+        params['page_size'] = limit
+        if after is not None:
+            params.update({f"k_{i}": value for i, value in enumerate(after)})
+
+        rows = [dict(row) for row in (await conn.execute(stmt, params)).mappings()]
+
+        if len(rows) < limit:
+            return rows, None
+        return rows, tuple(rows[-1][column] for column in self.primary_key_columns)
+
+    async def iter_pages(self, conn, page_size=DEFAULT_PAGE_SIZE, after=None, **filters):
+        """Async-iterate pages of the whole table using keyset pagination on the primary key."""
+        while True:
+            rows, after = await self.get_page(conn, page_size, after, **filters)
+            if rows:
+                yield rows
+            if after is None:
+                return
+
+    async def iter_all(self, conn, page_size=DEFAULT_PAGE_SIZE, after=None, limit=None, **filters):
+        """Async-iterate matching rows one at a time; stops after limit rows."""
+        remaining = limit
+        async for rows in self.iter_pages(conn, page_size, after, **filters):
+            for row in rows:
+                if remaining is not None:
+                    if remaining <= 0:
+                        return
+                    remaining -= 1
+                yield row
+
+    async def add(self, conn, **data) -> dict | None:
+        """Insert a new record and return its primary key."""
+        result = await conn.execute(self._statement('insert'), data)
+        self._invalidate_caches()
+
+        if len(result.inserted_primary_key) == 1:
+            return result.inserted_primary_key[0]
+        return result.inserted_primary_key
+
+    async def add_batch(self, conn, data_list: list[dict]) -> list[dict]:
+        """Insert multiple rows in a batch."""
+        if not data_list:
+            return []
+
+        result = await conn.execute(self._statement('insert'), data_list)
+        self._invalidate_caches()
+
+        return data_list if result.rowcount else []
+
+    async def update(self, conn, id_column, id_value, return_row=True, **data) -> dict | None:
+        """Update a record based on its primary key; see BaseCRUD.update."""
+        filters = {id_column: id_value}
+        if return_row and get_dialect(conn).update_returning:
+            value_columns = tuple(sorted(data))
+            stmt = self._cached(
+                ('update_returning', self._filter_shape(filters), value_columns),
+                lambda: self._statement('update', self._filter_shape(filters), value_columns).returning(*self.table.c)
+            )
+            params = self._filter_params(filters)
+            params.update({f"v_{column}": value for column, value in data.items()})
+            row = (await conn.execute(stmt, params)).mappings().fetchone()
+            self._invalidate_caches()
+            return dict(row) if row else None
+
+        result = await self._execute_update(conn, filters, data)
+        self._invalidate_caches()
+
+        if not result.rowcount:
+            return None
+        return await self.get_one(conn, **filters) if return_row else filters
+
+    async def upsert(self, conn, conflict_columns, update_columns=None, **data) -> dict:
+        """Insert a row, or update the existing row with the same conflict_columns values."""
+        conflict_columns = tuple(conflict_columns)
+        if update_columns is None:
+            update_columns = [column for column in data if column not in conflict_columns]
+        update_columns = tuple(sorted(update_columns))
+
+        if self._supports_native_upsert(conn, conflict_columns):
+            dialect_name = get_dialect(conn).name
+            stmt = self._cached(
+                ('upsert', dialect_name, conflict_columns, update_columns),
+                lambda: self._build_upsert(dialect_name, conflict_columns, update_columns)
+            )
+            await conn.execute(stmt, data)
+            self._invalidate_caches()
+            return {"message": "Upserted successfully"}
+
+        filters = {column: data[column] for column in conflict_columns}
+        result = await self._execute_update(conn, filters, {column: data[column] for column in update_columns})
+        if result.rowcount:
+            self._invalidate_caches()
+            return {"message": "Updated successfully"}
+
+        await self.add(conn, **data)
+        return {"message": "Inserted successfully"}
+
+    async def add_or_increment(self, conn, increment_columns=('quantity',), **data) -> dict:
+        """Insert a row, or add its increment_columns onto the row with the same primary key."""
+        key_columns = self.primary_key_columns
+        increment_columns = tuple(increment_columns)
+
+        if self._supports_native_upsert(conn, key_columns):
+            dialect_name = get_dialect(conn).name
+            stmt = self._cached(
+                ('add_or_increment', dialect_name, increment_columns),
+                lambda: self._build_upsert(dialect_name, key_columns, (), increment_columns)
+            )
+            await conn.execute(stmt, data)
+            self._invalidate_caches()
+            return {"message": "Merged successfully"}
+
+        table = self.table
+        filters = {column: data[column] for column in key_columns}
+        stmt = self._cached(
+            ('increment', self._filter_shape(filters), increment_columns),
+            lambda: self._build_statement('update', self._filter_shape(filters), ()).values(
+                {column: table.c[column] + bindparam(f"v_{column}") for column in increment_columns}
+            )
+        )
+        params = self._filter_params(filters)
+        params.update({f"v_{column}": data[column] for column in increment_columns})
+        if (await conn.execute(stmt, params)).rowcount:
+            self._invalidate_caches()
+            return {"message": "Merged successfully"}
+
+        await self.add(conn, **data)
+        return {"message": "Inserted successfully"}
+
+    async def delete(self, conn, id_column, id_value) -> dict:
+        """Delete a record by its primary key."""
+        filters = {id_column: id_value}
+        stmt = self._statement('delete', self._filter_shape(filters))
+        result = await conn.execute(stmt, self._filter_params(filters))
+        self._invalidate_caches()
+
+        return {"message": "Deleted successfully"} if result.rowcount else {"message": "Delete failed"}
+
+    async def delete_all(self, conn) -> dict:
+        """Delete all records in the table."""
+        await conn.execute(text(f"DELETE FROM {self.table.name}"))
+        self._invalidate_caches()
+
+        return {"message": f"All records in {self.table.name} deleted successfully"}
+
+    async def update_junction(self, conn, filters: dict, **data) -> dict:
+        """Update a junction table using composite keys."""
+        result = await self._execute_update(conn, filters, data)
+        self._invalidate_caches()
+
+        return {"message": "Updated successfully"} if result.rowcount else {"message": "Update failed"}
+
+    async def delete_junction(self, conn, filters: dict) -> dict:
+        """Delete a record from a junction table using composite keys."""
+        stmt = self._statement('delete', self._filter_shape(filters))
+        result = await conn.execute(stmt, self._filter_params(filters))
+        self._invalidate_caches()
+
+        return {"message": "Deleted successfully"} if result.rowcount else {"message": "Delete failed"}
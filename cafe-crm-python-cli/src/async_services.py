@@ -0,0 +1,263 @@
+"""Asyncio counterpart of services.py: the billing and loyalty flows on an AsyncConnection.
+
+Each function mirrors the synchronous one of the same name and shares its validation and pure
+helpers. Reference data, pricing and the summary-table bookkeeping reuse the synchronous
+functions through AsyncConnection.run_sync. AsyncOrderService.checkout runs a whole
+CheckoutRequest in one transaction, so one event loop can keep many checkouts in flight, and
+applies its summary increments in a short transaction after that one commits.
+"""
+from src.async_controller import AsyncBaseCRUD, get_async_engine
+from src.billing import price_order, build_bill
+from src.cache import invalidate_table
+from src.loyalty import points_update
+from src.summaries import SummaryUpdates, record_order, record_bill
+from src.helper_classes import Payment, CheckoutRequest, CheckoutResult
+from src.metrics import stage
+from src.services import (MIN_POINTS_TO_REDEEM, MIN_BILL_FOR_REWARDS, check_tier, get_discount_engine, best_discounts,
+                          merge_lines, payment_status_for, get_reward_points, check_checkout_request)
+from src.settings import NEWBIE_LOYALTY_POINTS, POINTS_CONVERSION_RATE
+from src.discounts import discount_amount
+from src.utils import points_to_cash
+from src.logger import logger, transaction_log_context, bind_log_context
+
+customer = AsyncBaseCRUD('customers')
+orders = AsyncBaseCRUD('orders')
+loyalty_program = AsyncBaseCRUD('loyalty_program')
+order_items = AsyncBaseCRUD('order_items')
+order_bills = AsyncBaseCRUD('order_bills')
+order_discounts = AsyncBaseCRUD('order_discounts')
+order_payments = AsyncBaseCRUD('order_payments')
+loyalty_points_logs = AsyncBaseCRUD('loyalty_points_logs')
+
+
+# Customers and loyalty
+
+async def resolve_customer(conn, **lookup) -> dict | None:
+    """Find a customer by any one column, e.g. customer_id=3 or mobile_no='98...'."""
+    return await customer.get_one(conn, **lookup)
+
+
+async def credit_points(conn, points, **key) -> bool:
+    """Atomically add points to an account and move it to the matching tier; see loyalty.credit_points."""
+    stmt, params = points_update(points, **key)
+    result = await conn.execute(stmt, params)
+    invalidate_table('loyalty_program')
+    return bool(result.rowcount)
+
+
+async def debit_points(conn, points, **key) -> bool:
+    """Atomically spend points if the balance covers them; see loyalty.debit_points."""
+    stmt, params = points_update(-points, guarded=True, **key)
+    result = await conn.execute(stmt, params)
+    invalidate_table('loyalty_program')
+    return bool(result.rowcount)
+
+
+async def add_points(conn, loyalty_id, no_of_points):
+    """Add points to a loyalty account and move it to the matching tier, in one atomic update."""
+    if not await credit_points(conn, no_of_points, loyalty_id=loyalty_id):
+        logger.error("Loyalty ID %s not found", loyalty_id)
+        raise ValueError("Loyalty ID not found")
+
+    return await loyalty_program.get_one(conn, loyalty_id=loyalty_id)
+
+
+async def register_customer(conn, **data) -> dict:
+    """Create a customer with a loyalty account holding the newbie points."""
+    customer_id = await customer.add(conn, **data)
+    if not customer_id:
+        raise ValueError("Failed to register customer.")
+
+    customer_data = await customer.get_one(conn, customer_id=customer_id)
+    tier = await conn.run_sync(check_tier, NEWBIE_LOYALTY_POINTS)
+    await loyalty_program.add(conn, customer_id=customer_id, total_points=NEWBIE_LOYALTY_POINTS,
+                              tier_id=tier['tier_id'])
+    return customer_data
+
+
+# Orders
+
+async def create_order(conn, customer_id=None, summary=None) -> dict:
+    """Create a new order, with or without a customer; see services.create_order."""
+    order_id = await orders.add(conn, customer_id=customer_id)
+    if not order_id:
+        raise ValueError("Failed to create order.")
+
+    order_data = await orders.get_one(conn, order_id=order_id)
+    if summary is not None:
+        summary.add_order(order_data)
+    else:
+        await conn.run_sync(record_order, order_data)
+    return order_data
+
+
+async def add_items(conn, order_id, lines, new_order=False) -> list[dict]:
+    """Add lines to an order; see services.add_items."""
+    rows = [{"order_id": order_id, "item_id": line.item_id, "quantity": line.quantity}
+            for line in merge_lines(lines)]
+    if new_order:
+        await order_items.add_batch(conn, rows)
+    else:
+        for row in rows:
+            await order_items.add_or_increment(conn, **row)
+    return rows
+
+
+async def complete_order(conn, order_id) -> dict:
+    """Mark the order completed before it is billed."""
+    return await orders.update(conn, 'order_id', order_id, order_status='completed')
+
+
+async def redeem_points(conn, order, points_to_claim) -> dict:
+    """Spend a customer's loyalty points as a discount on order; returns the order_discounts row."""
+    if not order['customer_id']:
+        raise ValueError("Loyalty points can only be used on a customer's order.")
+
+    if points_to_claim <= MIN_POINTS_TO_REDEEM:
+        raise ValueError(f"You must claim more than {MIN_POINTS_TO_REDEEM} points.")
+
+    if not await debit_points(conn, points_to_claim, customer_id=order['customer_id']):
+        current_loyalty_data = await loyalty_program.get_one(conn, customer_id=order['customer_id'])
+        raise ValueError(f"Insufficient points. You only have {current_loyalty_data['total_points']}.")
+
+    cost_value = int(points_to_cash(points_to_claim, POINTS_CONVERSION_RATE))
+    discount = {"order_id": order['order_id'], "loyalty_points_used": points_to_claim, "discount_amount": cost_value}
+    await order_discounts.add(conn, **discount)
+    await loyalty_points_logs.add(conn, customer_id=order['customer_id'], order_id=order['order_id'],
+                                  points_redeemed=points_to_claim)
+    return discount
+
+
+async def apply_order_discount(conn, order, total_price, discount_id, amount=None) -> dict:
+    """Apply one active, eligible discount to order; see services.apply_order_discount."""
+    if not order['customer_id']:
+        raise ValueError("Discounts can only be applied to a customer's order.")
+
+    discount_engine = await conn.run_sync(get_discount_engine)
+    selected_discount = discount_engine.get_eligible(discount_id, total_price)
+    if not selected_discount:
+        raise ValueError(f"Discount {discount_id} is not available for this order.")
+
+    full_amount = discount_amount(total_price, selected_discount)
+    discount = {"order_id": order['order_id'], "discount_id": discount_id,
+                "discount_amount": full_amount if amount is None else min(amount, full_amount)}
+    await order_discounts.add(conn, **discount)
+    return discount
+
+
+async def write_bill(conn, order, pricing, applied_discounts=None, summary=None) -> dict:
+    """Write the order's bill once every discount is known; see services.write_bill."""
+    if applied_discounts is None:
+        applied_discounts = await order_discounts.get_all(conn, order_id=order['order_id'])
+    total_discount_applied = sum(discount['discount_amount'] for discount in applied_discounts)
+
+    bill = build_bill(pricing, min(total_discount_applied, pricing['total_price']))
+    await order_bills.add(conn, **bill)
+    if summary is not None:
+        summary.add_bill(order, bill)
+    else:
+        await conn.run_sync(record_bill, order, bill)
+    return {**bill, "payment_status": 'pending'}
+
+
+async def pay_order(conn, order_id, amount_paid, payment_type='cash', bill=None) -> dict:
+    """Record a payment against the order's bill; returns the order_payments row with the new status."""
+    if bill is None:
+        bill = await order_bills.get_one(conn, order_id=order_id)
+    payment_status = payment_status_for(int(amount_paid), int(bill['final_price']))
+
+    await order_bills.update(conn, 'order_id', order_id, return_row=False, payment_status=payment_status)
+    payment = {"order_id": order_id, "payment_type": payment_type, "amount_paid": amount_paid}
+    payment_id = await order_payments.add(conn, **payment)
+    return {"payment_id": payment_id, **payment, "payment_status": payment_status}
+
+
+async def award_points(conn, order, bill=None) -> int:
+    """Credit loyalty points for a paid order; returns the points earned (0 when not eligible)."""
+    if not order['customer_id']:
+        return 0
+    if bill is None:
+        bill = await order_bills.get_one(conn, order_id=order['order_id'])
+
+    total_price = int(bill['total_price'])
+    if bill['payment_status'] != 'paid' or total_price <= MIN_BILL_FOR_REWARDS:
+        return 0
+
+    points_earned = get_reward_points(total_price, POINTS_CONVERSION_RATE)
+    await credit_points(conn, points_earned, customer_id=order['customer_id'])
+
+    log_result = await loyalty_points_logs.upsert(conn, ['order_id'],
+                                                  customer_id=order['customer_id'],
+                                                  order_id=order['order_id'],
+                                                  points_earned=points_earned)
+    logger.info("Customer %s earned %s points for order %s: %s", order['customer_id'], points_earned,
+                order['order_id'], log_result['message'])
+    return points_earned
+
+
+class AsyncOrderService:
+    """OrderService on the async engine: each checkout runs in its own transaction on a pooled connection."""
+
+    def __init__(self, bind=None):
+        self.bind = bind
+
+    async def checkout(self, request: CheckoutRequest, conn=None) -> CheckoutResult:
+        """Run request end to end and commit; any error rolls the whole checkout back and is re-raised.
+
+        Pass an open AsyncConnection to run inside a transaction the caller owns instead.
+        """
+        if conn is not None:
+            return await self._checkout(conn, request)
+
+        bind = self.bind or get_async_engine()
+        summary = SummaryUpdates()
+        async with bind.begin() as conn:
+            with stage('async_checkout'), transaction_log_context():
+                result = await self._checkout(conn, request, summary)
+        async with bind.connect() as conn:
+            await conn.run_sync(summary.apply)
+        return result
+
+    async def _checkout(self, conn, request, summary=None):
+        check_checkout_request(request)
+
+        if request.customer_id is not None:
+            customer_data = await resolve_customer(conn, customer_id=request.customer_id)
+            if not customer_data:
+                raise ValueError(f"Customer {request.customer_id} doesn't exist.")
+        elif request.new_customer:
+            customer_data = await register_customer(conn, **request.new_customer)
+        else:
+            customer_data = None
+
+        order = await create_order(conn, customer_data['customer_id'] if customer_data else None, summary)
+        bind_log_context(order_id=order['order_id'])
+        items = await add_items(conn, order['order_id'], request.items, new_order=True)
+
+        order = await complete_order(conn, order['order_id'])
+        pricing = await conn.run_sync(price_order, order['order_id'])
+
+        discount_ids, points_to_redeem = request.discount_ids, request.points_to_redeem
+        amounts = {}
+        if request.apply_best_offer and order['customer_id']:
+            best = await conn.run_sync(best_discounts, pricing['total_price'], order['customer_id'])
+            discount_ids = [discount['discount_id'] for discount in best['discounts']]
+            amounts = {discount['discount_id']: discount['discount_amount'] for discount in best['discounts']}
+            points_to_redeem = best['points_to_redeem']
+
+        applied_discounts = []
+        if points_to_redeem:
+            applied_discounts.append(await redeem_points(conn, order, points_to_redeem))
+        for discount_id in discount_ids:
+            applied_discounts.append(await apply_order_discount(conn, order, pricing['total_price'], discount_id,
+                                                                amounts.get(discount_id)))
+        bill = await write_bill(conn, order, pricing, applied_discounts, summary)
+
+        payment_request = request.payment or Payment(amount_paid=bill['final_price'])
+        payment = await pay_order(conn, order['order_id'], payment_request.amount_paid,
+                                  payment_request.payment_type, bill=bill)
+        bill['payment_status'] = payment['payment_status']
+
+        points_earned = await award_points(conn, order, bill)
+        return CheckoutResult(customer=customer_data, order=order, items=items, bill=bill,
+                              payments=[payment], points_earned=points_earned)
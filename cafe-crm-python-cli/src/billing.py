@@ -0,0 +1,112 @@
+from sqlalchemy import text, bindparam, update
+from src.controller import BaseCRUD
+from src.cache import invalidate_table
+
+order_bills = BaseCRUD('order_bills')
+
+BILLING_CHUNK_SIZE = 1000
+
+ORDER_TOTALS_STMT = text(
+    '''
+    SELECT oi.order_id,
+           SUM(oi.quantity * mi.item_price) AS total_price,
+           COUNT(*) AS line_count,
+           SUM(oi.quantity) AS item_count
+    FROM order_items AS oi
+    INNER JOIN menu_items AS mi
+    ON oi.item_id = mi.item_id
+    WHERE oi.order_id IN :order_ids
+    GROUP BY oi.order_id;
+    '''
+).bindparams(bindparam('order_ids', expanding=True))
+
+ORDER_DISCOUNTS_STMT = text(
+    '''
+    SELECT order_id, SUM(discount_amount) AS discount_applied
+    FROM order_discounts
+    WHERE order_id IN :order_ids
+    GROUP BY order_id;
+    '''
+).bindparams(bindparam('order_ids', expanding=True))
+
+
+def _chunks(values, size):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def empty_pricing(order_id) -> dict:
+    return {"order_id": order_id, "total_price": 0.0, "line_count": 0, "item_count": 0}
+
+
+def price_orders(conn, order_ids, chunk_size=BILLING_CHUNK_SIZE) -> dict[int, dict]:
+    """Price many orders at once: one aggregate join per chunk of order ids."""
+    priced = {order_id: empty_pricing(order_id) for order_id in order_ids}
+
+    for chunk in _chunks(priced.keys(), chunk_size):
+        result = conn.execute(ORDER_TOTALS_STMT, {"order_ids": chunk}).mappings()
+        for row in result:
+            priced[row['order_id']] = {
+                "order_id": row['order_id'],
+                "total_price": float(row['total_price'] or 0),
+                "line_count": int(row['line_count']),
+                "item_count": int(row['item_count'] or 0),
+            }
+
+    return priced
+
+
+def price_order(conn, order_id) -> dict:
+    """Price a single order with one aggregate join."""
+    return price_orders(conn, [order_id])[order_id]
+
+
+def get_discount_totals(conn, order_ids, chunk_size=BILLING_CHUNK_SIZE) -> dict[int, float]:
+    """Sum order_discounts per order for many orders at once."""
+    totals = {order_id: 0.0 for order_id in order_ids}
+
+    for chunk in _chunks(totals.keys(), chunk_size):
+        result = conn.execute(ORDER_DISCOUNTS_STMT, {"order_ids": chunk}).mappings()
+        for row in result:
+            totals[row['order_id']] = float(row['discount_applied'] or 0)
+
+    return totals
+
+
+def build_bill(pricing, discount_applied=0.0) -> dict:
+    """Turn a pricing result into an order_bills row."""
+    total_price = pricing['total_price']
+    final_price = int(total_price - int(discount_applied))
+    return {
+        "order_id": pricing['order_id'],
+        "total_price": total_price,
+        "discount_applied": discount_applied,
+        "final_price": final_price,
+    }
+
+
+def rebill_orders(conn, order_ids, chunk_size=BILLING_CHUNK_SIZE) -> list[dict]:
+    """Recompute totals and final prices of existing bills in bulk, for re-billing and audits."""
+    bills = []
+    for chunk in _chunks(order_ids, chunk_size):
+        priced = price_orders(conn, chunk, chunk_size)
+        discount_totals = get_discount_totals(conn, chunk, chunk_size)
+        bills.extend(build_bill(priced[order_id], discount_totals[order_id]) for order_id in chunk)
+
+    if not bills:
+        return bills
+
+    table = order_bills.table
+    stmt = (
+        update(table)
+        .where(table.c.order_id == bindparam('b_order_id'))
+        .values(total_price=bindparam('b_total_price'),
+                discount_applied=bindparam('b_discount_applied'),
+                final_price=bindparam('b_final_price'))
+    )
+    for chunk in _chunks(bills, chunk_size):
+        conn.execute(stmt, [{f"b_{key}": value for key, value in bill.items()} for bill in chunk])
+    invalidate_table('order_bills')
+
+    return bills
@@ -0,0 +1,133 @@
+import threading
+import time
+from collections import OrderedDict
+from src.settings import REFERENCE_CACHE_TTL, REFERENCE_CACHE_MAXSIZE
+
+# Every cache (or other listener) that tracks table dependencies, so BaseCRUD writes can invalidate them.
+_registered_caches = []
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl=REFERENCE_CACHE_TTL, maxsize=REFERENCE_CACHE_MAXSIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._dependents = {}
+        # bumped by invalidate_table (per table) and invalidate() (everything), loaded or not
+        self._table_generations = {}
+        self._cleared = 0
+        self._lock = threading.Lock()
+        _registered_caches.append(self)
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._discard(key)
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self, depends_on=()):
+        """Token for how often depends_on has been invalidated; take it before loading a value for set()."""
+        with self._lock:
+            return self._generation(depends_on)
+
+    def set(self, key, value, depends_on=(), generation=None) -> bool:
+        """Store value under key; it is dropped when any table in depends_on is written.
+
+        With a generation() token taken before value was loaded, value is not stored (False is
+        returned) if a table in depends_on was invalidated since, as value may predate that write.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation(depends_on):
+                return False
+            self._discard(key)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tuple(depends_on))
+            for table_name in depends_on:
+                self._dependents.setdefault(table_name, set()).add(key)
+
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+        return True
+
+    def get_or_load(self, key, loader, depends_on=()):
+        """Return the cached value for key, calling loader() to fill it on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            generation = self.generation(depends_on)
+            value = loader()
+            self.set(key, value, depends_on, generation)
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when no key is given."""
+        with self._lock:
+            if key is None:
+                self._cleared += 1
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._dependents.clear()
+            elif key in self._entries:
+                self.invalidations += 1
+                self._discard(key)
+
+    def invalidate_table(self, table_name):
+        """Drop every entry that was loaded from table_name."""
+        with self._lock:
+            self._table_generations[table_name] = self._table_generations.get(table_name, 0) + 1
+            for key in list(self._dependents.get(table_name, ())):
+                self.invalidations += 1
+                self._discard(key)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _generation(self, depends_on):
+        return self._cleared, tuple(self._table_generations.get(table_name, 0) for table_name in depends_on)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for table_name in entry[2]:
+            keys = self._dependents.get(table_name)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._dependents[table_name]
+
+
+def register_invalidation_listener(listener):
+    """Have listener.invalidate_table(table_name) called whenever BaseCRUD writes a table."""
+    _registered_caches.append(listener)
+
+
+def invalidate_table(table_name):
+    """Invalidate cached entries derived from table_name in every registered cache."""
+    for cache in _registered_caches:
+        cache.invalidate_table(table_name)
+
+
+# Process-wide cache for data that almost never changes (menu, discounts, tiers, review categories).
+reference_cache = TTLCache()
@@ -1,35 +1,240 @@
-from sqlalchemy import select, update, insert, delete, text
-from src.database import metadata, engine
+from sqlalchemy import select, update, insert, delete, text, bindparam, tuple_, Integer, UniqueConstraint
+from src.database import metadata, engine, get_table
+from src.cache import invalidate_table
+from src.routing import router as default_router, READ
 from sqlalchemy.orm import session
+from sqlalchemy.dialects import mysql, sqlite, postgresql
+
+# Upper bound on the number of keys sent in one IN (...) list by get_many.
+GET_MANY_CHUNK_SIZE = 500
+
+# Rows fetched per round trip by iter_all / iter_pages.
+DEFAULT_PAGE_SIZE = 1000
+
+# Dialects whose insert() supports ON CONFLICT (...) DO UPDATE.
+ON_CONFLICT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def get_dialect(conn):
+    """Dialect of a Connection or Session."""
+    dialect = getattr(conn, 'dialect', None)
+    return dialect if dialect is not None else conn.get_bind().dialect
 
 class BaseCRUD:
-    def __init__(self, table_name):
-        """Initialize with the table name and fetch its schema."""
-        self.table = metadata.tables[table_name]
+    def __init__(self, table_name, router=None):
+        """Initialize with the table name; the schema is fetched on first use.
+
+        router (an EngineRouter, the process-wide one by default) decides where reading() goes.
+        """
+        self.table_name = table_name
+        self.router = router or default_router
+        self._table = None
+        self._statements = {}
+
+    @property
+    def table(self):
+        """The reflected table, loaded from the schema cache or the database on first access."""
+        if self._table is None:
+            self._table = get_table(self.table_name)
+        return self._table
+
+    def reading(self, conn=None, intent=READ):
+        """Connection to read this table through: the replica when the router allows it, else conn.
+
+        Use for listings and reports, e.g. `with customers.reading(session) as conn:`; the checkout's
+        own reads and writes keep using its session.
+        """
+        return self.router.reading(conn, (self.table_name,), intent)
+
+    def _invalidate_caches(self):
+        """Drop cached reference data derived from this table after a write."""
+        invalidate_table(self.table_name)
+
+    @staticmethod
+    def _filter_shape(filters) -> tuple:
+        """Statement cache key for a set of filters: the columns, and which ones compare to NULL."""
+        return tuple(sorted((column, value is None) for column, value in filters.items()))
+
+    @staticmethod
+    def _filter_params(filters) -> dict:
+        return {f"w_{column}": value for column, value in filters.items() if value is not None}
+
+    def _cached(self, key, builder):
+        stmt = self._statements.get(key)
+        if stmt is None:
+            stmt = builder()
+            self._statements[key] = stmt
+        return stmt
+
+    def _statement(self, kind, filter_shape=(), value_columns=()):
+        """Return a cached, parameterized statement for this shape, building it on first use."""
+        return self._cached(
+            (kind, filter_shape, value_columns),
+            lambda: self._build_statement(kind, filter_shape, value_columns)
+        )
+
+    @property
+    def primary_key_columns(self) -> tuple:
+        return tuple(col.name for col in self.table.primary_key.columns)
+
+    def _is_unique_key(self, columns) -> bool:
+        """True when columns exactly match the primary key or a unique index/constraint."""
+        wanted = set(columns)
+        if wanted == set(self.primary_key_columns):
+            return True
+        for index in self.table.indexes:
+            if index.unique and wanted == {col.name for col in index.columns}:
+                return True
+        for constraint in self.table.constraints:
+            if isinstance(constraint, UniqueConstraint) and wanted == {col.name for col in constraint.columns}:
+                return True
+        return False
+
+    def _build_upsert(self, dialect_name, conflict_columns, update_columns, increment_columns=()):
+        """Native INSERT ... ON DUPLICATE KEY UPDATE / ON CONFLICT DO UPDATE for this dialect."""
+        table = self.table
+        if dialect_name in ('mysql', 'mariadb'):
+            stmt = mysql.insert(table)
+            values = self._conflict_values(stmt.inserted, update_columns, increment_columns)
+            # MySQL needs at least one assignment; a no-op one keeps the existing row.
+            return stmt.on_duplicate_key_update(values or {conflict_columns[0]: table.c[conflict_columns[0]]})
+
+        stmt = ON_CONFLICT_DIALECTS[dialect_name](table)
+        values = self._conflict_values(stmt.excluded, update_columns, increment_columns)
+        if not values:
+            return stmt.on_conflict_do_nothing(index_elements=list(conflict_columns))
+        return stmt.on_conflict_do_update(index_elements=list(conflict_columns), set_=values)
+
+    def _conflict_values(self, incoming, update_columns, increment_columns):
+        values = {column: incoming[column] for column in update_columns}
+        for column in increment_columns:
+            values[column] = self.table.c[column] + incoming[column]
+        return values
+
+    def _supports_native_upsert(self, conn, conflict_columns) -> bool:
+        name = get_dialect(conn).name
+        return (name in ('mysql', 'mariadb') or name in ON_CONFLICT_DIALECTS) and self._is_unique_key(conflict_columns)
+
+    def _build_statement(self, kind, filter_shape, value_columns):
+        table = self.table
+        match kind:
+            case 'select':
+                stmt = select(table)
+            case 'select_one':
+                stmt = select(table).limit(1)
+            case 'select_in':
+                (column, _), = filter_shape
+                return select(table).where(table.c[column].in_(bindparam('w_values', expanding=True)))
+            case 'insert':
+                return insert(table)
+            case 'update':
+                stmt = update(table).values({column: bindparam(f"v_{column}") for column in value_columns})
+            case 'delete':
+                stmt = delete(table)
+            case _:
+                raise ValueError(f"Unknown statement kind: {kind}")
+
+        # bound parameters keep the SQL text identical across calls, so the compiled form is reused.
+        for column, is_null in filter_shape:
+            col = table.c[column]
+            stmt = stmt.where(col.is_(None) if is_null else col == bindparam(f"w_{column}"))
+        return stmt
+
+    def _execute_update(self, conn, filters, data):
+        stmt = self._statement('update', self._filter_shape(filters), tuple(sorted(data)))
+        params = self._filter_params(filters)
+        params.update({f"v_{column}": value for column, value in data.items()})
+        return conn.execute(stmt, params)
 
     def get_all(self, conn, **filters) -> list[dict]:
         """Retrieve all records matching optional filters."""
-        stmt = select(self.table)
-        for column, value in filters.items():
-            stmt = stmt.where(getattr(self.table.c, column) == value)
+        stmt = self._statement('select', self._filter_shape(filters))
 
-        result = conn.execute(stmt).mappings().fetchall()
+        result = conn.execute(stmt, self._filter_params(filters)).mappings().fetchall()
         return [dict(row) for row in result] if result else []
 
     def get_one(self, conn, **filters) -> dict | None:
         """Retrieve a single record matching filters."""
-        stmt = select(self.table)
-        for column, value in filters.items():
-            stmt = stmt.where(getattr(self.table.c, column) == value)
+        stmt = self._statement('select_one', self._filter_shape(filters))
 
-        result = conn.execute(stmt).mappings().fetchone()
+        result = conn.execute(stmt, self._filter_params(filters)).mappings().fetchone()
         return dict(result) if result else None
 
+    def get_many(self, conn, column, values, chunk_size=GET_MANY_CHUNK_SIZE) -> list[dict]:
+        """Retrieve all records whose column matches any of values, using chunked IN lists."""
+        keys = list(dict.fromkeys(value for value in values if value is not None))
+        if not keys:
+            return []
+
+        stmt = self._statement('select_in', ((column, False),))
+        rows = []
+        for start in range(0, len(keys), chunk_size):
+            result = conn.execute(stmt, {"w_values": keys[start:start + chunk_size]}).mappings()
+            rows.extend(dict(row) for row in result)
+        return rows
+
+    def _build_page_statement(self, filter_shape, first_page):
+        table = self.table
+        key_columns = [table.c[column] for column in self.primary_key_columns]
+        stmt = self._build_statement('select', filter_shape, ()).order_by(*key_columns)
+
+        if not first_page:
+            if len(key_columns) == 1:
+                stmt = stmt.where(key_columns[0] > bindparam('k_0'))
+            else:
+                stmt = stmt.where(
+                    tuple_(*key_columns) > tuple_(*[bindparam(f"k_{i}") for i in range(len(key_columns))])
+                )
+        return stmt.limit(bindparam('page_size', type_=Integer))
+
+    def get_page(self, conn, limit=DEFAULT_PAGE_SIZE, after=None, **filters) -> tuple[list[dict], tuple | None]:
+        """Fetch up to limit rows ordered by primary key, starting after the key tuple `after`.
+
+        Returns the rows and the key to pass as `after` for the next page (None on the last page).
+        """
+        filter_shape = self._filter_shape(filters)
+        stmt = self._cached(
+            ('page', filter_shape, after is None),
+            lambda: self._build_page_statement(filter_shape, after is None)
+        )
+        params = self._filter_params(filters)
+        params['page_size'] = limit
+        if after is not None:
+            params.update({f"k_{i}": value for i, value in enumerate(after)})
+
+        result = conn.execute(stmt, params, execution_options={"yield_per": limit})
+        rows = [dict(row) for row in result.mappings()]
+
+        if len(rows) < limit:
+            return rows, None
+        return rows, tuple(rows[-1][column] for column in self.primary_key_columns)
+
+    def iter_pages(self, conn, page_size=DEFAULT_PAGE_SIZE, after=None, **filters):
+        """Yield pages (lists of rows) of the whole table using keyset pagination on the primary key."""
+        while True:
+            rows, after = self.get_page(conn, page_size, after, **filters)
+            if rows:
+                yield rows
+            if after is None:
+                return
+
+    def iter_all(self, conn, page_size=DEFAULT_PAGE_SIZE, after=None, limit=None, **filters):
+        """Stream matching rows one at a time without materializing the table; stops after limit rows."""
+        remaining = limit
+        for rows in self.iter_pages(conn, page_size, after, **filters):
+            for row in rows:
+                if remaining is not None:
+                    if remaining <= 0:
+                        return
+                    remaining -= 1
+                yield row
+
     def add(self, conn, **data) -> dict | None:
         """Insert a new record and return the created row."""
-        stmt = insert(self.table).values(**data)
-        result = conn.execute(stmt)
+        stmt = self._statement('insert')
+        result = conn.execute(stmt, data)
         # conn.commit()
+        self._invalidate_caches()
 
         if len(result.inserted_primary_key) == 1:
             return result.inserted_primary_key[0]
@@ -40,29 +245,109 @@ class BaseCRUD:
         if not data_list:
             return []
 
-        stmt = insert(self.table)
+        stmt = self._statement('insert')
         result = conn.execute(stmt, data_list)
         # conn.commit()
+        self._invalidate_caches()
 
         return data_list if result.rowcount else []
 
-    def update(self, conn, id_column, id_value, **data) -> dict | None:
-        """Update a record based on its primary key."""
-        stmt = (
-            update(self.table)
-            .where(getattr(self.table.c, id_column) == id_value)
-            .values(**data)
-        )
-        result = conn.execute(stmt)
+    def update(self, conn, id_column, id_value, return_row=True, **data) -> dict | None:
+        """Update a record based on its primary key.
+
+        The updated row is returned via RETURNING where the dialect supports it, otherwise it is
+        re-fetched. With return_row=False only the key is returned and no row is read back.
+        """
+        filters = {id_column: id_value}
+        if return_row and get_dialect(conn).update_returning:
+            value_columns = tuple(sorted(data))
+            stmt = self._cached(
+                ('update_returning', self._filter_shape(filters), value_columns),
+                lambda: self._statement('update', self._filter_shape(filters), value_columns).returning(*self.table.c)
+            )
+            params = self._filter_params(filters)
+            params.update({f"v_{column}": value for column, value in data.items()})
+            row = conn.execute(stmt, params).mappings().fetchone()
+            self._invalidate_caches()
+            return dict(row) if row else None
+
+        result = self._execute_update(conn, filters, data)
         # conn.commit()
+        self._invalidate_caches()
 
-        return self.get_one(conn, **{id_column: id_value}) if result.rowcount else None
+        if not result.rowcount:
+            return None
+        return self.get_one(conn, **filters) if return_row else filters
+
+    def upsert(self, conn, conflict_columns, update_columns=None, **data) -> dict:
+        """Insert a row, or update the existing row with the same conflict_columns values.
+
+        Uses MySQL ON DUPLICATE KEY UPDATE / SQLite ON CONFLICT DO UPDATE when conflict_columns
+        is a primary or unique key; otherwise falls back to update-then-insert.
+        """
+        conflict_columns = tuple(conflict_columns)
+        if update_columns is None:
+            update_columns = [column for column in data if column not in conflict_columns]
+        update_columns = tuple(sorted(update_columns))
+
+        if self._supports_native_upsert(conn, conflict_columns):
+            dialect_name = get_dialect(conn).name
+            stmt = self._cached(
+                ('upsert', dialect_name, conflict_columns, update_columns),
+                lambda: self._build_upsert(dialect_name, conflict_columns, update_columns)
+            )
+            conn.execute(stmt, data)
+            self._invalidate_caches()
+            return {"message": "Upserted successfully"}
+
+        filters = {column: data[column] for column in conflict_columns}
+        result = self._execute_update(conn, filters, {column: data[column] for column in update_columns})
+        if result.rowcount:
+            self._invalidate_caches()
+            return {"message": "Updated successfully"}
+
+        self.add(conn, **data)
+        return {"message": "Inserted successfully"}
+
+    def add_or_increment(self, conn, increment_columns=('quantity',), **data) -> dict:
+        """Insert a junction row, or add its increment_columns onto the row with the same primary key."""
+        key_columns = self.primary_key_columns
+        increment_columns = tuple(increment_columns)
+
+        if self._supports_native_upsert(conn, key_columns):
+            dialect_name = get_dialect(conn).name
+            stmt = self._cached(
+                ('add_or_increment', dialect_name, increment_columns),
+                lambda: self._build_upsert(dialect_name, key_columns, (), increment_columns)
+            )
+            conn.execute(stmt, data)
+            self._invalidate_caches()
+            return {"message": "Merged successfully"}
+
+        table = self.table
+        filters = {column: data[column] for column in key_columns}
+        stmt = self._cached(
+            ('increment', self._filter_shape(filters), increment_columns),
+            lambda: self._build_statement('update', self._filter_shape(filters), ()).values(
+                {column: table.c[column] + bindparam(f"v_{column}") for column in increment_columns}
+            )
+        )
+        params = self._filter_params(filters)
+        params.update({f"v_{column}": data[column] for column in increment_columns})
+        if conn.execute(stmt, params).rowcount:
+            self._invalidate_caches()
+            return {"message": "Merged successfully"}
+
+        self.add(conn, **data)
+        return {"message": "Inserted successfully"}
 
     def delete(self, conn, id_column, id_value) -> dict:
         """Delete a record by its primary key."""
-        stmt = delete(self.table).where(getattr(self.table.c, id_column) == id_value)
-        result = conn.execute(stmt)
+        filters = {id_column: id_value}
+        stmt = self._statement('delete', self._filter_shape(filters))
+        result = conn.execute(stmt, self._filter_params(filters))
         # conn.commit()
+        self._invalidate_caches()
 
         return {"message": "Deleted successfully"} if result.rowcount else {"message": "Delete failed"}
 
@@ -71,28 +356,23 @@ class BaseCRUD:
         stmt = text(f"DELETE FROM {self.table.name}")
         conn.execute(stmt)
         # conn.commit()
+        self._invalidate_caches()
 
         return {"message": f"All records in {self.table.name} deleted successfully"}
 
     def update_junction(self, conn, filters: dict, **data) -> dict:
         """Update a junction table using composite keys."""
-        stmt = update(self.table)
-        for column, value in filters.items():
-            stmt = stmt.where(getattr(self.table.c, column) == value)
-
-        stmt = stmt.values(**data)
-        result = conn.execute(stmt)
+        result = self._execute_update(conn, filters, data)
         # conn.commit()
+        self._invalidate_caches()
 
         return {"message": "Updated successfully"} if result.rowcount else {"message": "Update failed"}
 
     def delete_junction(self, conn, filters: dict) -> dict:
         """Delete a record from a junction table using composite keys."""
-        stmt = delete(self.table)
-        for column, value in filters.items():
-            stmt = stmt.where(getattr(self.table.c, column) == value)
-
-        result = conn.execute(stmt)
+        stmt = self._statement('delete', self._filter_shape(filters))
+        result = conn.execute(stmt, self._filter_params(filters))
         # conn.commit()
+        self._invalidate_caches()
 
         return {"message": "Deleted successfully"} if result.rowcount else {"message": "Delete failed"}
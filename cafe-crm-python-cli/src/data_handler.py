@@ -46,20 +46,36 @@ class DataHandler:
         except ValueError:
             return False
 
+    @staticmethod
+    def validate_date(date_str):
+        """Return date_str if it is a valid SQL DATE, otherwise raise ValueError."""
+        if DataHandler.sql_date_validator(date_str):
+            return date_str
+        raise ValueError("Invalid date format. Please enter in YYYY-MM-DD format.")
+
     @staticmethod
     def get_date(prompt):
         """Prompt user for a valid date input."""
         while True:
-            date_str = input(prompt)
-            if DataHandler.sql_date_validator(date_str):
-                return date_str
-            print("Invalid date format. Please enter in YYYY-MM-DD format.")
+            try:
+                return DataHandler.validate_date(input(prompt))
+            except ValueError as err:
+                print(err)
 
     @staticmethod
     def is_enum(val, enum_type):
         """Check if a value is a valid ENUM choice."""
         return isinstance(enum_type, Enum) and val in enum_type.enums
 
+    @staticmethod
+    def validate_enum(val, enum_type):
+        """Return val if it is one of the ENUM choices, otherwise raise ValueError."""
+        if not isinstance(enum_type, Enum):
+            raise ValueError("Provided type is not a valid SQLAlchemy Enum.")
+        if val in enum_type.enums:
+            return val
+        raise ValueError(f"Invalid choice. Please choose from: {', '.join(enum_type.enums)}")
+
     @staticmethod
     def get_enum(prompt, enum_type):
         """Prompt user for an ENUM input, automatically displaying available options."""
@@ -75,15 +91,22 @@ class DataHandler:
                 return val
             print(f"Invalid choice. Please choose from: {', '.join(enum_values)}")
 
+    @staticmethod
+    def validate_string(val, max_length=None):
+        """Return the stripped string if it fits max_length, otherwise raise ValueError."""
+        val = val.strip()
+        if max_length and len(val) > max_length:
+            raise ValueError(f"Input too long. Maximum length is {max_length} characters.")
+        return val
+
     @staticmethod
     def get_string(prompt, max_length=None):
         """Prompt user for a string input and validate its length."""
         while True:
-            val = input(prompt).strip()
-            if max_length and len(val) > max_length:
-                print(f"Input too long. Maximum length is {max_length} characters.")
-            else:
-                return val
+            try:
+                return DataHandler.validate_string(input(prompt), max_length)
+            except ValueError as err:
+                print(err)
 
 
     @staticmethod
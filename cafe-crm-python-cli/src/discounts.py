@@ -0,0 +1,114 @@
+"""Discount eligibility and best-combination selection over the active discounts.
+
+DiscountEngine is built once from get_discounts() rows (and rebuilt when the discounts tables
+change, via the reference cache). Discounts are kept sorted by min_order_value, so the eligible
+set for a total is a bisect, and per-type prefix maxima give the best flat and best percentage
+offer in O(log n). Every discount is worked out on the undiscounted total, as apply_order_discount
+does, so the best stack is simply the largest eligible amounts; the last one is trimmed to what is
+left of the total, so the stack's amounts add up to exactly what it takes off.
+"""
+import heapq
+import math
+from bisect import bisect_right
+from src.utils import apply_discount
+
+
+def discount_amount(total_price, discount) -> float:
+    """What one discount takes off total_price, rounded the way apply_order_discount records it."""
+    return float(total_price - int(apply_discount(total_price, float(discount['discount_value']),
+                                                  discount['type_name'])))
+
+
+class DiscountEngine:
+    """Index of active discounts by min_order_value; see the module docstring."""
+
+    def __init__(self, discounts):
+        self.discounts = sorted(discounts, key=lambda discount: float(discount['min_order_value']))
+        self.thresholds = [float(discount['min_order_value']) for discount in self.discounts]
+        self.by_id = {discount['discount_id']: discount for discount in self.discounts}
+        # type_name -> list whose entry i is the index of that type's largest discount_value in discounts[:i + 1]
+        self._best_of_type = {}
+        for type_name in {discount['type_name'] for discount in self.discounts}:
+            best_index, prefix = None, []
+            for index, discount in enumerate(self.discounts):
+                if discount['type_name'] == type_name and (
+                        best_index is None
+                        or float(discount['discount_value']) > float(self.discounts[best_index]['discount_value'])):
+                    best_index = index
+                prefix.append(best_index)
+            self._best_of_type[type_name] = prefix
+
+    def __len__(self):
+        return len(self.discounts)
+
+    def _cutoff(self, total_price):
+        return bisect_right(self.thresholds, total_price)
+
+    def eligible(self, total_price) -> list[dict]:
+        """Active discounts whose min_order_value total_price meets, by ascending min_order_value."""
+        return self.discounts[:self._cutoff(total_price)]
+
+    def get_eligible(self, discount_id, total_price) -> dict | None:
+        """The discount if it exists and total_price qualifies for it."""
+        discount = self.by_id.get(discount_id)
+        if discount is None or float(discount['min_order_value']) > total_price:
+            return None
+        return discount
+
+    def best_of_each_type(self, total_price) -> dict:
+        """type_name -> (discount, amount) for the largest eligible offer of each type."""
+        cutoff = self._cutoff(total_price)
+        if not cutoff:
+            return {}
+        best = {}
+        for type_name, prefix in self._best_of_type.items():
+            index = prefix[cutoff - 1]
+            if index is not None:
+                discount = self.discounts[index]
+                best[type_name] = (discount, discount_amount(total_price, discount))
+        return best
+
+    def outcomes(self, total_price) -> list[dict]:
+        """Every eligible discount with its amount and resulting price, largest saving first."""
+        rows = [{**discount, "discount_amount": discount_amount(total_price, discount)}
+                for discount in self.eligible(total_price)]
+        for row in rows:
+            row["final_price"] = total_price - row["discount_amount"]
+        return sorted(rows, key=lambda row: row["discount_amount"], reverse=True)
+
+    def best(self, total_price, max_stacked=1, points_balance=0, conversion_rate=0.0, min_points_to_redeem=0) -> dict:
+        """The best stack of up to max_stacked eligible discounts, topped up with loyalty points.
+
+        Points are only suggested when they fit the redemption rules: more than min_points_to_redeem and
+        no more than the balance, and no more than it takes to cover what the discounts leave.
+        """
+        if max_stacked == 1:
+            candidates = sorted(self.best_of_each_type(total_price).values(), key=lambda pair: pair[1], reverse=True)
+            chosen = candidates[:1]
+        else:
+            chosen = heapq.nlargest(max_stacked, ((discount, discount_amount(total_price, discount))
+                                                  for discount in self.eligible(total_price)),
+                                    key=lambda pair: pair[1])
+        trimmed, discounts_total = [], 0
+        for discount, amount in chosen:
+            amount = min(amount, total_price - discounts_total)
+            if amount > 0:
+                trimmed.append((discount, amount))
+                discounts_total += amount
+        chosen = trimmed
+        remaining = total_price - discounts_total
+
+        points_to_redeem = 0
+        if remaining > 0 and conversion_rate > 0:
+            points_to_redeem = min(points_balance, math.ceil(remaining / conversion_rate))
+            if points_to_redeem <= min_points_to_redeem:
+                points_to_redeem = 0
+        points_value = int(points_to_redeem * conversion_rate)
+
+        return {
+            "discounts": [{**discount, "discount_amount": amount} for discount, amount in chosen],
+            "points_to_redeem": points_to_redeem,
+            "points_value": points_value,
+            "discount_applied": discounts_total + points_value,
+            "final_price": max(total_price - discounts_total - points_value, 0),
+        }
@@ -0,0 +1,388 @@
+"""Deterministic synthetic cafe data for scale testing.
+
+Generates customers, orders, order_items, bills, discounts, payments, loyalty accounts and logs,
+feedbacks and complaints that follow the cafe_crm schema and the pre-filled menu, discount, tier
+and review-category data. The same arguments and --seed always produce the same dataset
+(pass --end-date to pin the calendar too). Rows are bulk-loaded with BaseCRUD.add_batch, one
+transaction per chunk, against whatever DB_URL points at (MySQL or a local SQLite file).
+
+Usage: python -m src.generator [--customers 10000] [--orders 100000] [--days 365] [--seed 42]
+                               [--end-date YYYY-MM-DD] [--chunk-size 10000] [--create-schema]
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+from sqlalchemy import select, func, text
+from src.controller import BaseCRUD
+from src.database import engine
+from src.billing import build_bill
+from src.schema import create_schema, prefill_statements
+from src.services import get_menu_list, get_discounts, get_loyalty_tiers
+from src.settings import NEWBIE_LOYALTY_POINTS, POINTS_CONVERSION_RATE
+from src.summaries import rebuild_summaries
+from src.utils import apply_discount, tier_for_points
+from src.logger import logger
+
+GENERATOR_CHUNK_SIZE = 10000
+PREFILL_SCRIPT = os.path.join(os.path.dirname(__file__), '..', '..', 'mysql-scripts',
+                              'cafe_crm_pre_filling_data_script.sql')
+
+FIRST_NAMES = ('Aarav', 'Aditi', 'Akash', 'Ananya', 'Arjun', 'Deepa', 'Divya', 'Ganesh', 'Harini', 'Isha',
+               'Karthik', 'Kavya', 'Lakshmi', 'Manoj', 'Meena', 'Naveen', 'Nithya', 'Pooja', 'Pradeep', 'Priya',
+               'Rahul', 'Ramya', 'Sanjay', 'Shreya', 'Siddharth', 'Sneha', 'Suresh', 'Swathi', 'Vignesh', 'Vijay')
+LAST_NAMES = ('Balaji', 'Chandran', 'Iyer', 'Krishnan', 'Kumar', 'Menon', 'Murugan', 'Nair', 'Natarajan', 'Pillai',
+              'Raghavan', 'Rajan', 'Raman', 'Reddy', 'Sankar', 'Sharma', 'Srinivasan', 'Subramanian', 'Venkatesh')
+EMAIL_DOMAINS = ('gmail.com', 'yahoo.com', 'outlook.com', 'hotmail.com', 'rediffmail.com')
+
+# Share of each day's orders by hour: a breakfast rush, a lunch bump and the evening tea peak.
+HOUR_WEIGHTS = {7: 4, 8: 9, 9: 10, 10: 6, 11: 5, 12: 7, 13: 7, 14: 4, 15: 5, 16: 9, 17: 11, 18: 10, 19: 7,
+                20: 4, 21: 2}
+# Monday .. Sunday
+WEEKDAY_WEIGHTS = (0.9, 0.85, 0.9, 0.95, 1.1, 1.35, 1.3)
+# Relative popularity of menu categories from the pre-filling script.
+CATEGORY_WEIGHTS = {'Hot Beverages': 3.0, 'Bakery Items': 1.6, 'South Indian Snacks': 1.3, 'Cold Beverages': 1.0,
+                    'Chaats': 1.0, 'Desserts': 0.7}
+BASKET_SIZES = ((1, 35), (2, 30), (3, 18), (4, 10), (5, 5), (6, 2))
+QUANTITIES = ((1, 80), (2, 15), (3, 5))
+PAYMENT_TYPES = (('cash', 40), ('upi', 35), ('card', 20), ('paypal', 5))
+PAYMENT_OUTCOMES = (('paid', 96), ('partially_paid', 2), ('pending', 2))
+COMPLAINT_STATUSES = (('resolved', 55), ('pending', 20), ('in_progress', 15), ('dismissed', 10))
+# rating -> weight; most feedback is positive
+RATINGS = ((10, 18), (9, 22), (8, 22), (7, 14), (6, 8), (5, 6), (4, 4), (3, 3), (2, 2), (1, 1))
+
+WALK_IN_SHARE = 0.25
+# Spread (log-normal sigma) of how often customers come back: a core of regulars, a long tail of rare visits.
+REPEAT_CUSTOMER_SPREAD = 1.3
+DISCOUNT_UPTAKE = 0.15
+POINTS_REDEMPTION_RATE = 0.05
+CANCELLED_SHARE = 0.02
+FEEDBACK_RATE = 0.08
+COMPLAINT_RATE = 0.02
+MISSING_DOB_SHARE = 0.1
+MISSING_EMAIL_SHARE = 0.15
+
+FEEDBACK_COMMENTS = {
+    'high': ('Loved it!', 'Great filter coffee.', 'Quick service, will come again.', None),
+    'mid': ('Good but a bit slow.', 'Decent taste.', None),
+    'low': ('Food was cold.', 'Too expensive for the portion.', 'Waited too long.'),
+}
+COMPLAINT_COMMENTS = ('Wrong item served.', 'Order took too long.', 'Charged twice.', 'Table was not clean.',
+                      'Discount was not applied.')
+
+customers = BaseCRUD('customers')
+orders = BaseCRUD('orders')
+order_items = BaseCRUD('order_items')
+order_bills = BaseCRUD('order_bills')
+order_discounts = BaseCRUD('order_discounts')
+order_payments = BaseCRUD('order_payments')
+loyalty_program = BaseCRUD('loyalty_program')
+loyalty_points_logs = BaseCRUD('loyalty_points_logs')
+feedbacks = BaseCRUD('feedbacks')
+complaints = BaseCRUD('complaints')
+menu_items = BaseCRUD('menu_items')
+review_categories = BaseCRUD('review_categories')
+
+# Parent tables first so foreign keys hold inside every chunk.
+LOAD_ORDER = (orders, order_items, order_discounts, order_bills, order_payments, loyalty_points_logs,
+              feedbacks, complaints)
+
+
+def _weighted(pairs):
+    values, weights = zip(*pairs)
+    return values, list(accumulate(weights))
+
+
+def ensure_reference_data(conn, prefill_path=PREFILL_SCRIPT):
+    """Run the pre-filling script when the menu is empty (fresh SQLite files)."""
+    if conn.execute(select(func.count()).select_from(menu_items.table)).scalar():
+        return
+    for statement in prefill_statements(prefill_path):
+        conn.execute(text(statement))
+
+
+def next_id(conn, crud):
+    key = crud.table.primary_key.columns[0]
+    return (conn.execute(select(func.max(key))).scalar() or 0) + 1
+
+
+class DatasetGenerator:
+    """Builds rows in memory chunk by chunk; ids are assigned here so child rows never need a read back."""
+
+    def __init__(self, conn, seed=42):
+        self.rng = random.Random(seed)
+        menu = get_menu_list(conn)
+        self.menu_prices = {item['item_id']: float(item['item_price']) for item in menu}
+        self.menu_ids = [item['item_id'] for item in menu]
+        self.menu_cum_weights = list(accumulate(CATEGORY_WEIGHTS.get(item['category_name'], 1.0) for item in menu))
+        self.discounts = get_discounts(conn)
+        self.tiers = get_loyalty_tiers(conn)
+        self.review_category_ids = [row['category_id'] for row in review_categories.get_all(conn)]
+
+        self.basket_sizes = _weighted(BASKET_SIZES)
+        self.quantities = _weighted(QUANTITIES)
+        self.payment_types = _weighted(PAYMENT_TYPES)
+        self.payment_outcomes = _weighted(PAYMENT_OUTCOMES)
+        self.complaint_statuses = _weighted(COMPLAINT_STATUSES)
+        self.ratings = _weighted(RATINGS)
+        self.hours = _weighted(HOUR_WEIGHTS.items())
+
+        self.next_ids = {crud.table_name: next_id(conn, crud)
+                         for crud in (customers, orders, order_discounts, order_payments, loyalty_program,
+                                      loyalty_points_logs, feedbacks, complaints)}
+        self.customer_ids = []
+        self.customer_cum_weights = []
+        self.points = {}
+
+    def _take_id(self, table_name):
+        value = self.next_ids[table_name]
+        self.next_ids[table_name] += 1
+        return value
+
+    def _pick(self, weighted):
+        values, cum_weights = weighted
+        return self.rng.choices(values, cum_weights=cum_weights)[0]
+
+    def customer_rows(self, count):
+        """New customers; emails and mobile numbers are unique by construction."""
+        rows = []
+        for _ in range(count):
+            customer_id = self._take_id('customers')
+            first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+            email = None
+            if self.rng.random() >= MISSING_EMAIL_SHARE:
+                email = f"{first}.{last}{customer_id}@{self.rng.choice(EMAIL_DOMAINS)}".lower()
+            date_of_birth = None
+            if self.rng.random() >= MISSING_DOB_SHARE:
+                date_of_birth = date(1955, 1, 1) + timedelta(days=self.rng.randrange(19000))
+            rows.append({
+                "customer_id": customer_id,
+                "name": f"{first} {last}",
+                "email": email,
+                "mobile_no": str(6000000000 + customer_id * 7919 % 4000000000),
+                "date_of_birth": date_of_birth,
+            })
+            self.customer_ids.append(customer_id)
+            self.points[customer_id] = NEWBIE_LOYALTY_POINTS
+        return rows
+
+    def rank_customers(self):
+        """Give each generated customer a log-normally distributed visit frequency."""
+        self.customer_cum_weights = list(accumulate(self.rng.lognormvariate(0, REPEAT_CUSTOMER_SPREAD)
+                                                    for _ in self.customer_ids))
+
+    def order_times(self, day, count):
+        day_start = datetime(day.year, day.month, day.day)
+        return sorted(
+            day_start + timedelta(hours=self._pick(self.hours), minutes=self.rng.randrange(60),
+                                  seconds=self.rng.randrange(60))
+            for _ in range(count)
+        )
+
+    def _discount_for(self, order_id, total_price):
+        eligible = [d for d in self.discounts if float(d['min_order_value']) <= total_price]
+        if not eligible:
+            return None
+        discount = self.rng.choice(eligible)
+        final_price = int(apply_discount(total_price, float(discount['discount_value']), discount['type_name']))
+        return {"order_discount_id": self._take_id('order_discounts'), "order_id": order_id,
+                "discount_id": discount['discount_id'], "loyalty_points_used": 0,
+                "discount_amount": float(total_price - final_price)}
+
+    def order_rows(self, created_at, rows):
+        """Append one order and everything that hangs off it to the per-table row lists in rows."""
+        order_id = self._take_id('orders')
+        customer_id = None
+        if self.customer_ids and self.rng.random() >= WALK_IN_SHARE:
+            customer_id = self.rng.choices(self.customer_ids, cum_weights=self.customer_cum_weights)[0]
+
+        cancelled = self.rng.random() < CANCELLED_SHARE
+        rows['orders'].append({"order_id": order_id, "customer_id": customer_id,
+                               "order_status": 'cancelled' if cancelled else 'completed',
+                               "created_at": created_at,
+                               "updated_at": created_at + timedelta(minutes=self.rng.randrange(2, 20))})
+
+        basket = set()
+        for _ in range(self._pick(self.basket_sizes)):
+            basket.add(self.rng.choices(self.menu_ids, cum_weights=self.menu_cum_weights)[0])
+        lines = [{"order_id": order_id, "item_id": item_id, "quantity": self._pick(self.quantities)}
+                 for item_id in sorted(basket)]
+        rows['order_items'].extend(lines)
+        if cancelled:
+            return
+
+        pricing = {"order_id": order_id,
+                   "total_price": float(sum(self.menu_prices[line['item_id']] * line['quantity'] for line in lines))}
+        total_price = pricing['total_price']
+
+        applied = []
+        if customer_id:
+            balance = self.points[customer_id]
+            if balance > 51 and self.rng.random() < POINTS_REDEMPTION_RATE:
+                points_used = self.rng.randint(51, balance)
+                self.points[customer_id] -= points_used
+                applied.append({"order_discount_id": self._take_id('order_discounts'), "order_id": order_id,
+                                "discount_id": None, "loyalty_points_used": points_used,
+                                "discount_amount": int(points_used * POINTS_CONVERSION_RATE)})
+                rows['loyalty_points_logs'].append(self._points_log(customer_id, order_id, created_at,
+                                                                    redeemed=points_used))
+            if self.rng.random() < DISCOUNT_UPTAKE:
+                discount = self._discount_for(order_id, total_price)
+                if discount:
+                    applied.append(discount)
+        rows['order_discounts'].extend(applied)
+
+        bill = build_bill(pricing, sum(discount['discount_amount'] for discount in applied))
+        outcome = self._pick(self.payment_outcomes)
+        final_price = float(bill['final_price'])
+        amount_paid = {'paid': final_price, 'partially_paid': round(final_price * 0.5, 2), 'pending': 0.0}[outcome]
+        rows['order_bills'].append({**bill, "payment_status": outcome})
+        if amount_paid:
+            rows['order_payments'].append({"payment_id": self._take_id('order_payments'), "order_id": order_id,
+                                           "payment_type": self._pick(self.payment_types),
+                                           "amount_paid": amount_paid})
+
+        if customer_id and outcome == 'paid' and int(total_price) > 10:
+            points_earned = int(int(total_price) * POINTS_CONVERSION_RATE)
+            self.points[customer_id] += points_earned
+            rows['loyalty_points_logs'].append(self._points_log(customer_id, order_id, created_at,
+                                                                earned=points_earned))
+
+        if self.rng.random() < FEEDBACK_RATE:
+            rating = self._pick(self.ratings)
+            band = 'high' if rating >= 8 else 'mid' if rating >= 5 else 'low'
+            rows['feedbacks'].append({"feedback_id": self._take_id('feedbacks'), "customer_id": customer_id,
+                                      "order_id": order_id, "item_id": self.rng.choice(lines)['item_id'],
+                                      "category_id": self.rng.choice(self.review_category_ids),
+                                      "rating": rating, "comments": self.rng.choice(FEEDBACK_COMMENTS[band]),
+                                      "created_at": created_at + timedelta(minutes=30)})
+        if self.rng.random() < COMPLAINT_RATE:
+            rows['complaints'].append({"complaint_id": self._take_id('complaints'), "customer_id": customer_id,
+                                       "order_id": order_id, "category_id": self.rng.choice(self.review_category_ids),
+                                       "item_id": self.rng.choice(lines)['item_id'],
+                                       "comments": self.rng.choice(COMPLAINT_COMMENTS),
+                                       "status": self._pick(self.complaint_statuses),
+                                       "created_at": created_at + timedelta(minutes=45)})
+
+    def _points_log(self, customer_id, order_id, created_at, earned=None, redeemed=None):
+        return {"log_id": self._take_id('loyalty_points_logs'), "customer_id": customer_id, "order_id": order_id,
+                "points_earned": earned, "points_redeemed": redeemed,
+                "created_at": created_at, "updated_at": created_at}
+
+    def loyalty_rows(self):
+        """Loyalty accounts with the balances and tiers the generated history ends on."""
+        return [{"loyalty_id": self._take_id('loyalty_program'), "customer_id": customer_id,
+                 "total_points": points, "tier_id": tier_for_points(self.tiers, points)['tier_id']}
+                for customer_id, points in sorted(self.points.items())]
+
+
+def daily_order_counts(order_count, start, days):
+    """Spread order_count over the days, weighted by weekday, summing exactly to order_count."""
+    day_list = [start + timedelta(days=offset) for offset in range(days)]
+    total_weight = sum(WEEKDAY_WEIGHTS[day.weekday()] for day in day_list)
+    emitted, expected = 0, 0.0
+    for day in day_list:
+        expected += order_count * WEEKDAY_WEIGHTS[day.weekday()] / total_weight
+        count = round(expected) - emitted
+        emitted += count
+        yield day, count
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _flush(conn, rows, chunk_size):
+    for crud in LOAD_ORDER:
+        for chunk in _chunks(rows[crud.table_name], chunk_size):
+            crud.add_batch(conn, chunk)
+        rows[crud.table_name] = []
+
+
+def generate(customer_count, order_count, days=365, seed=42, end_date=None, chunk_size=GENERATOR_CHUNK_SIZE,
+             create_tables=False, summaries=True) -> dict:
+    """Generate and load a dataset; returns the number of rows written per table."""
+    end_date = end_date or date.today()
+    start = end_date - timedelta(days=days - 1)
+    written = {}
+    started = time.perf_counter()
+
+    def count(table_name, rows):
+        written[table_name] = written.get(table_name, 0) + len(rows)
+
+    with engine.connect() as conn:
+        if create_tables:
+            with conn.begin():
+                create_schema(conn)
+        # reflect every table up front: reflection uses its own connection, which SQLite would
+        # block behind this connection's write transactions.
+        for crud in (customers, menu_items, review_categories, loyalty_program) + LOAD_ORDER:
+            crud.table
+        with conn.begin():
+            ensure_reference_data(conn)
+        with conn.begin():
+            generator = DatasetGenerator(conn, seed)
+
+        for offset in range(0, customer_count, chunk_size):
+            batch = generator.customer_rows(min(chunk_size, customer_count - offset))
+            with conn.begin():
+                customers.add_batch(conn, batch)
+            count('customers', batch)
+        generator.rank_customers()
+
+        rows = {crud.table_name: [] for crud in LOAD_ORDER}
+        pending = 0
+        for day, day_count in daily_order_counts(order_count, start, days):
+            for created_at in generator.order_times(day, day_count):
+                generator.order_rows(created_at, rows)
+            pending += day_count
+            if pending >= chunk_size:
+                for table_name, table_rows in rows.items():
+                    count(table_name, table_rows)
+                with conn.begin():
+                    _flush(conn, rows, chunk_size)
+                pending = 0
+                print(f"{written.get('orders', 0)} orders loaded through {day} "
+                      f"({written.get('orders', 0) / (time.perf_counter() - started):.0f} orders/s)")
+
+        for table_name, table_rows in rows.items():
+            count(table_name, table_rows)
+        loyalty_rows = generator.loyalty_rows()
+        count('loyalty_program', loyalty_rows)
+        with conn.begin():
+            _flush(conn, rows, chunk_size)
+            for chunk in _chunks(loyalty_rows, chunk_size):
+                loyalty_program.add_batch(conn, chunk)
+
+        if summaries:
+            with conn.begin():
+                rebuild_summaries(conn)
+
+    logger.info("Generated dataset (seed %s) in %.1fs: %s", seed, time.perf_counter() - started, written)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic cafe dataset into DB_URL.")
+    parser.add_argument('--customers', type=int, default=10000)
+    parser.add_argument('--orders', type=int, default=100000)
+    parser.add_argument('--days', type=int, default=365, help="length of the order history, ending on --end-date")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--end-date', type=date.fromisoformat, help="last day of history (default: today)")
+    parser.add_argument('--chunk-size', type=int, default=GENERATOR_CHUNK_SIZE)
+    parser.add_argument('--create-schema', action='store_true',
+                        help="create missing tables first (for SQLite files; use the DDL script on MySQL)")
+    parser.add_argument('--skip-summaries', action='store_true', help="don't rebuild the summary tables afterwards")
+    args = parser.parse_args(argv)
+
+    written = generate(args.customers, args.orders, args.days, args.seed, args.end_date, args.chunk_size,
+                       args.create_schema, not args.skip_summaries)
+    for table_name, rows in written.items():
+        print(f"{table_name}: {rows} rows")
+
+
+if __name__ == '__main__':
+    main()
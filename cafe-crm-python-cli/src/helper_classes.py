@@ -0,0 +1,38 @@
+from dataclasses import dataclass, field
+
+
+@dataclass
+class OrderLine:
+    item_id: int
+    quantity: int = 1
+
+
+@dataclass
+class Payment:
+    amount_paid: float
+    payment_type: str = 'cash'
+
+
+@dataclass
+class CheckoutRequest:
+    """Everything one checkout needs, gathered up front so it can run without prompts."""
+    items: list[OrderLine]
+    customer_id: int | None = None
+    # customers columns; registered as a new customer when customer_id is not given
+    new_customer: dict | None = None
+    discount_ids: list[int] = field(default_factory=list)
+    points_to_redeem: int = 0
+    # pick the best discount stack and points redemption instead of discount_ids / points_to_redeem
+    apply_best_offer: bool = False
+    # None pays the final price in full, in cash
+    payment: Payment | None = None
+
+
+@dataclass
+class CheckoutResult:
+    customer: dict | None
+    order: dict
+    items: list[dict]
+    bill: dict
+    payments: list[dict]
+    points_earned: int = 0
@@ -0,0 +1,202 @@
+"""Non-interactive bulk import of customers from CSV.
+
+Usage: python -m src.importer datasets/customers.csv [--chunk-size 5000] [--rejects rejects.csv]
+"""
+import argparse
+import csv
+import time
+from datetime import date
+from sqlalchemy import Enum, String
+from sqlalchemy.exc import IntegrityError
+from src.controller import BaseCRUD
+from src.database import engine
+from src.data_handler import DataHandler
+from src.settings import NEWBIE_LOYALTY_POINTS
+from src.utils import tier_for_points
+from src.logger import logger
+
+IMPORT_CHUNK_SIZE = 5000
+CUSTOMER_COLUMNS = ('name', 'email', 'mobile_no', 'date_of_birth')
+UNIQUE_COLUMNS = ('email', 'mobile_no')
+
+customer = BaseCRUD('customers')
+loyalty_program = BaseCRUD('loyalty_program')
+loyalty_tiers = BaseCRUD('loyalty_tiers')
+
+
+def read_chunks(path, chunk_size):
+    """Stream (line_no, row) pairs from a CSV file in lists of chunk_size."""
+    with open(path, newline='', encoding='utf-8') as csv_file:
+        chunk = []
+        for line_no, row in enumerate(csv.DictReader(csv_file), start=2):
+            chunk.append((line_no, row))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def validate_value(col, raw):
+    """Validate one CSV value against its column with the same rules DataHandler applies to input()."""
+    val = (raw or '').strip()
+    if not val:
+        if not col.nullable:
+            raise ValueError(f"{col.name} is required.")
+        return None
+
+    if isinstance(col.type, Enum):
+        return DataHandler.validate_enum(val, col.type)
+
+    col_type = str(col.type).upper()
+    if 'DATE' in col_type and 'TIME' not in col_type:
+        return date.fromisoformat(DataHandler.validate_date(val))
+    if isinstance(col.type, String):
+        return DataHandler.validate_string(val, col.type.length)
+    return val
+
+
+def validate_customer(columns, row) -> dict:
+    """Build a customers row from a CSV row, raising ValueError on the first invalid field."""
+    data = {}
+    for name in CUSTOMER_COLUMNS:
+        try:
+            data[name] = validate_value(columns[name], row.get(name))
+        except ValueError as err:
+            raise ValueError(f"{name}: {err}") from err
+    return data
+
+
+def unique_key(value):
+    """value as the database compares it for uniqueness: MySQL's default collation ignores case and trailing spaces."""
+    return value.strip().casefold() if value is not None else None
+
+
+def _existing_keys(conn, column, values) -> set:
+    return {unique_key(row[column]) for row in customer.get_many(conn, column, values)}
+
+
+def _insert_one_by_one(conn, rows):
+    """Insert (line_no, data) rows each under its own savepoint; returns (customer_ids, rejects)."""
+    customer_ids, rejects = [], []
+    for line_no, data in rows:
+        try:
+            with conn.begin_nested():
+                customer_ids.append(customer.add(conn, **data))
+        except IntegrityError as err:
+            rejects.append((line_no, data, f"duplicate in database: {err.orig}"))
+    return customer_ids, rejects
+
+
+def import_chunk(conn, columns, chunk, seen, newbie_tier_id):
+    """Validate, de-duplicate and insert one chunk; returns (inserted_count, rejects)."""
+    rejects = []
+    candidates = []
+    for line_no, row in chunk:
+        try:
+            candidates.append((line_no, validate_customer(columns, row)))
+        except ValueError as err:
+            rejects.append((line_no, row, str(err)))
+
+    # unique keys are checked for the whole chunk at once, not per row, and compared as unique_key()s.
+    existing = {
+        key: _existing_keys(conn, key, [data[key] for _, data in candidates if data[key] is not None])
+        for key in UNIQUE_COLUMNS
+    }
+
+    new_rows = []
+    for line_no, data in candidates:
+        keys = {key: unique_key(data[key]) for key in UNIQUE_COLUMNS}
+        duplicate = next(
+            (key for key, value in keys.items()
+             if value is not None and (value in existing[key] or value in seen[key])),
+            None
+        )
+        if duplicate:
+            rejects.append((line_no, data, f"duplicate {duplicate}"))
+            continue
+        for key, value in keys.items():
+            if value is not None:
+                seen[key].add(value)
+        new_rows.append((line_no, data))
+
+    keyed = [(line_no, data) for line_no, data in new_rows if data['mobile_no'] or data['email']]
+    unkeyed = [data for _, data in new_rows if not (data['mobile_no'] or data['email'])]
+
+    try:
+        with conn.begin_nested():
+            customer.add_batch(conn, [data for _, data in keyed])
+    except IntegrityError as err:
+        # a key the checks above couldn't see (e.g. a concurrent insert): only the clashing rows are rejected
+        logger.warning("Batch insert of %s customers failed, inserting them one by one: %s", len(keyed), err.orig)
+        customer_ids, duplicates = _insert_one_by_one(conn, keyed)
+        rejects += duplicates
+    else:
+        # map the batch back to its generated ids through the unique keys.
+        customer_ids = [row['customer_id'] for row in customer.get_many(
+            conn, 'mobile_no', [data['mobile_no'] for _, data in keyed if data['mobile_no']])]
+        customer_ids += [row['customer_id'] for row in customer.get_many(
+            conn, 'email', [data['email'] for _, data in keyed if not data['mobile_no']])]
+    customer_ids += [customer.add(conn, **data) for data in unkeyed]
+
+    loyalty_program.add_batch(conn, [
+        {"customer_id": customer_id, "total_points": NEWBIE_LOYALTY_POINTS, "tier_id": newbie_tier_id}
+        for customer_id in customer_ids
+    ])
+
+    return len(customer_ids), rejects
+
+
+def import_customers(path, chunk_size=IMPORT_CHUNK_SIZE, rejects_path=None) -> dict:
+    """Import customers and their loyalty_program rows from a CSV file, one transaction per chunk."""
+    columns = customer.table.columns
+    seen = {'email': set(), 'mobile_no': set()}
+    stats = {"read": 0, "inserted": 0, "rejected": 0, "seconds": 0.0}
+    rejects_file = open(rejects_path, 'w', newline='', encoding='utf-8') if rejects_path else None
+    rejects_writer = csv.writer(rejects_file) if rejects_file else None
+    if rejects_writer:
+        rejects_writer.writerow(['line_no', 'reason', 'row'])
+
+    started = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            with conn.begin():
+                newbie_tier_id = tier_for_points(loyalty_tiers.get_all(conn), NEWBIE_LOYALTY_POINTS)['tier_id']
+
+            for chunk in read_chunks(path, chunk_size):
+                with conn.begin():
+                    inserted, rejects = import_chunk(conn, columns, chunk, seen, newbie_tier_id)
+
+                stats["read"] += len(chunk)
+                stats["inserted"] += inserted
+                stats["rejected"] += len(rejects)
+                for line_no, row, reason in rejects:
+                    logger.warning("Import rejected line %s: %s", line_no, reason)
+                    if rejects_writer:
+                        rejects_writer.writerow([line_no, reason, dict(row)])
+
+                elapsed = time.perf_counter() - started
+                print(f"{stats['read']} rows read, {stats['inserted']} inserted, {stats['rejected']} rejected "
+                      f"({stats['read'] / elapsed:.0f} rows/s)")
+    finally:
+        if rejects_file:
+            rejects_file.close()
+
+    stats["seconds"] = round(time.perf_counter() - started, 3)
+    logger.info("Customer import from %s finished: %s", path, stats)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import customers from a CSV file.")
+    parser.add_argument('path', help="CSV file with name, email, mobile_no, date_of_birth columns")
+    parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+    parser.add_argument('--rejects', help="write rejected rows and reasons to this CSV file")
+    args = parser.parse_args(argv)
+
+    stats = import_customers(args.path, args.chunk_size, args.rejects)
+    print(f"Done: {stats['inserted']} customers imported, {stats['rejected']} rejected in {stats['seconds']}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Deferred imports for the CLI entry point.
+
+The till's first prompt needs nothing from the database, so the modules that pull in SQLAlchemy
+(controller, services, search, ...) are bound as lazy modules and loaded on first attribute access,
+after the cashier has answered it.
+"""
+import importlib.util
+import sys
+
+
+def lazy_import(name):
+    """Return module `name`, executed only when one of its attributes is first used.
+
+    Importing a submodule still imports its parent package; keep lazy names to src.* modules.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+class LazyCRUD:
+    """Stands in for BaseCRUD(table_name), creating it (and importing SQLAlchemy) on first use."""
+
+    def __init__(self, table_name):
+        self.table_name = table_name
+        self._crud = None
+
+    def __getattr__(self, name):
+        if self._crud is None:
+            from src.controller import BaseCRUD
+            self._crud = BaseCRUD(self.table_name)
+        return getattr(self._crud, name)
@@ -1,34 +1,105 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
 import os
-from colorama import init, Fore
-
-# Initialize colorama for Windows compatibility
-init(autoreset=True)
+import queue
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
+from src.settings import LOG_PATH, LOG_LEVEL, LOG_FORMAT, LOG_MAX_BYTES, LOG_BACKUP_COUNT, LOG_ROTATE_WHEN
 
 # Define log file path (ensuring it's in the project directory)
-log_file = os.path.join(os.path.dirname(__file__), "app.log")
-
-# Custom log formatter with color support (not needed for file logs)
-class ColoredFormatter(logging.Formatter):
-    COLORS = {
-        logging.DEBUG: Fore.CYAN,  # Cyan for debug
-        logging.INFO: Fore.GREEN,  # Green for info (success)
-        logging.WARNING: Fore.YELLOW,  # Yellow for warnings
-        logging.ERROR: Fore.RED,  # Red for errors
-        logging.CRITICAL: Fore.MAGENTA,  # Magenta for critical errors
-    }
+log_file = LOG_PATH or os.path.join(os.path.dirname(__file__), "app.log")
+
+# ids of the checkout being logged, attached to every record emitted inside log_context()
+_log_context = contextvars.ContextVar('log_context', default={})
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the log_context() ids as top-level keys."""
 
     def format(self, record):
-        log_message = super().format(record)
-        return log_message  # No colors for file logging
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **getattr(record, 'context', {}),
+        }
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Copy the caller's log_context() onto the record before it crosses to the listener thread."""
+
+    def filter(self, record):
+        record.context = _log_context.get()
+        return True
+
+
+class ContextQueueHandler(QueueHandler):
+    """QueueHandler that merges the message args and renders tracebacks, but leaves layout to the listener."""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
 
-# Configure logging (Only logs to file)
-log_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
 
-file_handler = logging.FileHandler(log_file)
+@contextmanager
+def log_context(**ids):
+    """Tag every record logged inside the block (in this thread or task) with ids, e.g. order_id=42."""
+    token = _log_context.set({**_log_context.get(), **ids})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+def bind_log_context(**ids):
+    """Add ids to the current log_context() once they are known, e.g. after the order is created."""
+    _log_context.set({**_log_context.get(), **ids})
+
+
+def transaction_log_context():
+    """log_context() for one checkout, tagged with a fresh transaction_id."""
+    return log_context(transaction_id=os.urandom(6).hex())
+
+
+def _file_handler():
+    if LOG_ROTATE_WHEN:
+        return TimedRotatingFileHandler(log_file, when=LOG_ROTATE_WHEN, backupCount=LOG_BACKUP_COUNT,
+                                        encoding='utf-8', delay=True)
+    return RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+                               encoding='utf-8', delay=True)
+
+
+# Configure logging (Only logs to file). Callers only put records on a queue; a background
+# listener thread does the formatting and disk I/O, with size (or time) based rotation.
+if LOG_FORMAT == 'json':
+    log_formatter = JsonFormatter()
+else:
+    log_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+
+file_handler = _file_handler()
 file_handler.setFormatter(log_formatter)
 
-logging.basicConfig(level=logging.INFO, handlers=[file_handler])  # No StreamHandler
+log_queue = queue.SimpleQueue()
+queue_handler = ContextQueueHandler(log_queue)
+queue_handler.addFilter(ContextFilter())
+log_listener = QueueListener(log_queue, file_handler)
+log_listener.start()
+# stop() drains the queue, so records logged just before exit still reach the file
+atexit.register(log_listener.stop)
+
+logging.basicConfig(level=LOG_LEVEL, handlers=[queue_handler])  # No StreamHandler
 
 # Create logger
 logger = logging.getLogger(__name__)
@@ -0,0 +1,66 @@
+"""Atomic loyalty balance changes.
+
+A balance change is one UPDATE that adds to total_points in the database and picks the matching
+tier in the same statement, instead of reading the balance, adding in Python and writing it back.
+Concurrent tills serving the same customer therefore can't lose each other's points, and a
+redemption is guarded by the balance in its WHERE clause, so it can't overdraw the account.
+The statements are plain Core, so sync sessions and AsyncConnections both execute them.
+"""
+from sqlalchemy import select, update, func, bindparam, Integer
+from src.controller import BaseCRUD
+from src.cache import invalidate_table
+
+loyalty_program = BaseCRUD('loyalty_program')
+loyalty_tiers = BaseCRUD('loyalty_tiers')
+
+
+def tier_for_points_clause(points):
+    """SQL twin of utils.tier_for_points: the first tier whose max_points exceeds points, else the top tier."""
+    tiers = loyalty_tiers.table
+    matching = (select(tiers.c.tier_id).where(tiers.c.max_points > points)
+                .order_by(tiers.c.max_points).limit(1).scalar_subquery())
+    top = select(tiers.c.tier_id).order_by(tiers.c.max_points.desc()).limit(1).scalar_subquery()
+    return func.coalesce(matching, top)
+
+
+def _build_points_update(key_column, guarded):
+    table = loyalty_program.table
+    new_total = table.c.total_points + bindparam('delta', type_=Integer)
+    stmt = update(table).where(table.c[key_column] == bindparam('key'))
+    if guarded:
+        stmt = stmt.where(new_total >= 0)
+    # MySQL evaluates SET assignments left to right against the updated row, so the tier has to be
+    # assigned before total_points for both to be computed from the old balance.
+    return stmt.ordered_values(
+        (table.c.tier_id, tier_for_points_clause(new_total)),
+        (table.c.total_points, new_total),
+    )
+
+
+def points_update(delta, guarded=False, **key):
+    """Statement and parameters that add delta to one loyalty account (by loyalty_id or customer_id).
+
+    guarded=True only matches while the new balance stays non-negative; check the rowcount.
+    """
+    (key_column, key_value), = key.items()
+    stmt = loyalty_program._cached(
+        ('points_update', key_column, guarded),
+        lambda: _build_points_update(key_column, guarded)
+    )
+    return stmt, {"key": key_value, "delta": delta}
+
+
+def credit_points(conn, points, **key) -> bool:
+    """Atomically add points to an account and move it to the matching tier; False if there is no account."""
+    stmt, params = points_update(points, **key)
+    result = conn.execute(stmt, params)
+    invalidate_table('loyalty_program')
+    return bool(result.rowcount)
+
+
+def debit_points(conn, points, **key) -> bool:
+    """Atomically spend points if the balance covers them; False (and nothing written) otherwise."""
+    stmt, params = points_update(-points, guarded=True, **key)
+    result = conn.execute(stmt, params)
+    invalidate_table('loyalty_program')
+    return bool(result.rowcount)
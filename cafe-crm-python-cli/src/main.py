@@ -1,37 +1,40 @@
-from src.controller import BaseCRUD
-from src.database import engine
-from rich.console import Console
-from rich.table import Table
-from src.utils import add_row, cls_decorator, render_as_table, apply_discount, points_to_cash, display_data
-from src.settings import NEWBIE_LOYALTY_POINTS, POINTS_CONVERSION_RATE
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import text
-import os
-import time
-from src.logger import logger
-
-console = Console()
-
-customer = BaseCRUD('customers')
-orders = BaseCRUD('orders')
-loyalty_program = BaseCRUD('loyalty_program')
-menu_items = BaseCRUD('menu_items')
-order_items = BaseCRUD('order_items')
-discounts = BaseCRUD('discounts')
-order_bills = BaseCRUD('order_bills')
-order_discounts = BaseCRUD('order_discounts')
-order_payments = BaseCRUD('order_payments')
-feedbacks = BaseCRUD('feedbacks')
-review_categories = BaseCRUD('review_categories')
-complaints = BaseCRUD('complaints')
-loyalty_points_logs = BaseCRUD('loyalty_points_logs')
+import threading
+from src.lazy import lazy_import, LazyCRUD
+from src.utils import (add_row, cls_decorator, render_as_table, points_to_cash, display_data, console, clear_screen,
+                       set_quiet)
+from src.settings import POINTS_CONVERSION_RATE, CUSTOMER_PAGE_SIZE, WRITE_BEHIND_ENABLED
+from src.logger import logger, transaction_log_context, bind_log_context
+from src.cache import reference_cache
+
+# These pull in SQLAlchemy, so they load on first use rather than before the first prompt.
+database = lazy_import('src.database')
+billing = lazy_import('src.billing')
+services = lazy_import('src.services')
+search = lazy_import('src.search')
+metrics = lazy_import('src.metrics')
+write_behind = lazy_import('src.write_behind')
+summaries = lazy_import('src.summaries')
+helper_classes = lazy_import('src.helper_classes')
+
+customer = LazyCRUD('customers')
+orders = LazyCRUD('orders')
+loyalty_program = LazyCRUD('loyalty_program')
+menu_items = LazyCRUD('menu_items')
+order_items = LazyCRUD('order_items')
+discounts = LazyCRUD('discounts')
+order_bills = LazyCRUD('order_bills')
+order_discounts = LazyCRUD('order_discounts')
+order_payments = LazyCRUD('order_payments')
+feedbacks = LazyCRUD('feedbacks')
+review_categories = LazyCRUD('review_categories')
+complaints = LazyCRUD('complaints')
+loyalty_points_logs = LazyCRUD('loyalty_points_logs')
 
 def get_identifier():
     identifier = handle_user_choices("Search By ",[
         ('ID', 'customer_id'),
         ('Mobile Number', 'mobile_no'),
-        ('Name (not recommended)', 'name')
+        ('Search (name, mobile or email)', 'search')
     ])
     match identifier:
         case 'customer_id':
@@ -40,66 +43,58 @@ def get_identifier():
         case 'mobile_no':
             value = int(input("Enter the value : "))
             return identifier, value
-        case 'name':
-            value = str(input("Enter the name : "))
+        case 'search':
+            value = str(input("Enter part of the name, mobile number or email : "))
             return identifier, value
         case _:
             return None, None
 
-def check_tier(points):
-    loyalty_tiers = BaseCRUD('loyalty_tiers')
-    with engine.begin() as conn:
-        tier_data = loyalty_tiers.get_all(conn)
-
-    for tier in tier_data:
-        if points < tier['max_points']:
-           return tier
-
-    return tier_data[len(tier_data)-1]
-
-def redirect_to_register():
+def redirect_to_register(session):
 
     if yes_or_no(info_text='Do you want to register or Not..,'):
-        return customer_register()
+        return customer_register(session)
     else:
-        return proceed_to()
-
-def customer_login():
-
-    with Session(engine) as session:
+        return proceed_to(session)
 
-        identifier_col, identifier_value = get_identifier()
-        if not identifier_col or not identifier_value:
-            print(f"the identifiers issue {identifier_value, identifier_col}")
-        customer_data = customer.get_one(session, **{identifier_col: identifier_value})
+def pick_customer(session, query):
+    candidates = search.search_customers(session, query)
+    if not candidates:
+        return None
 
-        if not customer_data:
-            print("Customer doesn't exist")
-            return redirect_to_register()
+    render_as_table("Matching Customers", [
+        {key: candidate[key] for key in ('customer_id', 'name', 'mobile_no', 'email')} for candidate in candidates
+    ])
+    customer_id = int(input("Enter the customer ID : "))
+    return customer.get_one(session, customer_id=customer_id)
 
-        return customer_data
+def customer_login(session):
 
-def customer_register():
-    try:
-        with Session(engine) as register_session:
-            data = add_row(customer.table.columns)
+    identifier_col, identifier_value = get_identifier()
+    if not identifier_col or not identifier_value:
+        print(f"the identifiers issue {identifier_value, identifier_col}")
+    if identifier_col == 'search':
+        customer_data = pick_customer(session, identifier_value)
+    else:
+        customer_data = customer.get_one(session, **{identifier_col: identifier_value})
 
-            customer_id = customer.add(register_session, **data)
+    if not customer_data:
+        print("Customer doesn't exist")
+        return redirect_to_register(session)
 
-            if not customer_id:
-                register_session.rollback()  # Rollback changes if customer_id is invalid
-                return None
+    return customer_data
 
-            customer_data = customer.get_one(register_session, customer_id=customer_id)
+def customer_register(register_session):
+    from sqlalchemy.exc import SQLAlchemyError
 
-            loyalty_id = loyalty_program.add(register_session, customer_id=customer_data['customer_id'], total_points=0,
-                                             tier_id=1)
+    try:
+        data = add_row(customer.table.columns)
 
-            add_points(register_session, loyalty_id, NEWBIE_LOYALTY_POINTS)
+        customer_data = services.register_customer(register_session, **data)
 
-            register_session.commit()  # Commit the transaction
+        # registration is kept even if the checkout that follows is abandoned.
+        register_session.commit()  # Commit the transaction
 
-            return customer_data
+        return customer_data
 
     except SQLAlchemyError as e:
         register_session.rollback()  # Ensure rollback on error
@@ -110,11 +105,12 @@ def customer_register():
         print(f"Unexpected error: {e}")
         return None
 
-def proceed_to():
+def proceed_to(session=None):
     return None
 
 def handle_user_choices(title, options):
     """Displays a menu and returns the selected function."""
+    from rich.table import Table
 
     table = Table(title=title)
     table.add_column("Choice", justify="right", style="cyan", no_wrap=True)
@@ -152,53 +148,39 @@ def yes_or_no(info_text):
         else:
             print('Enter a valid choice, either "Y" or "N".')
 
-def show_customers():
-    with Session(engine) as session:
-        render_as_table("Available Customers", customer.get_all(session))
+def show_customers(session):
+    # pages through the customers table instead of loading all of it, on the replica when it is fresh enough.
+    with customer.reading(session) as conn:
+        for page_no, page in enumerate(customer.iter_pages(conn, CUSTOMER_PAGE_SIZE), start=1):
+            render_as_table(f"Available Customers (page {page_no})", page)
+            if len(page) < CUSTOMER_PAGE_SIZE or not yes_or_no(info_text='Show more customers?'):
+                break
 
-def get_customer():
+def get_customer(session):
 
-    show_customers()
+    show_customers(session)
     function = handle_user_choices("Customer Menu", [
         ("Customer Login", customer_login),
         ("Customer Register", customer_register),
         ("Proceed to Order", proceed_to)
     ])
-    data = function()
+    data = function(session)
 
     return data
 
-def get_menu_list(session):
-    stmt = text(
-        '''
-        SELECT * FROM menu_items as m
-        INNER JOIN menu_categories as mc
-        ON m.category_id = mc.category_id ORDER BY m.item_id;
-        '''
-    )
-    result = session.execute(stmt).mappings().fetchall()
-
-    return [dict(row) for row in result] if result else []
-
-def create_order(session, customer_id=None):
+def create_order(session, customer_id=None, summary=None):
     """Creates a new order, with or without a customer ID, using session handling and rollbacks."""
 
     if not yes_or_no(info_text='Do you want to order something?'):
         return None
 
     # Create order (customer_id can be None)
-    order_id = orders.add(session, customer_id=customer_id)
-
-    if not order_id:
-        raise ValueError("Failed to create order.")
-
-    # Retrieve order details
-    order_data = orders.get_one(session, order_id=order_id)
-
-    return order_data
+    return services.create_order(session, customer_id, summary)
 
 def clean_up():
-    with Session(engine) as session:
+    from sqlalchemy.orm import Session
+
+    with Session(database.engine) as session:
         feedbacks.delete_all(session)
         complaints.delete_all(session)
         order_payments.delete_all(session)
@@ -210,152 +192,75 @@ def clean_up():
 
         session.commit()
 
-def add_points(session, loyalty_id, no_of_points):
-
-    # Fetch loyalty program data
-    loyalty_data = loyalty_program.get_one(session, loyalty_id=loyalty_id)
-    if not loyalty_data:
-        logger.error(f"Loyalty ID {loyalty_id} not found")
-        raise ValueError("Loyalty ID not found")  # Handle missing data
-
-    new_total_points = loyalty_data['total_points'] + no_of_points
-
-    # Get current tier based on new points
-    current_tier = check_tier(new_total_points)
-
-    # Update loyalty program
-    loyalty_program.update(session, "loyalty_id", loyalty_id,
-                           total_points=new_total_points,
-                           tier_id=current_tier['tier_id']
-                           )
-
-    # Re-fetch updated data
-    updated_loyalty_data = loyalty_program.get_one(session, loyalty_id=loyalty_id)
-
-    return dict(updated_loyalty_data)
-
 def add_items(session, order_id):
-    menu = get_menu_list(session)
+    menu = services.get_menu_list(session)
     while True:
         if not yes_or_no(info_text='Do you want to add items ? '):
             break
-        render_as_table("Menu", menu)
+        render_as_table("Menu", menu, cache=True)
         user_item_choice = int(input("Enter the item_id to add: "))
         quantity = int(input("How many items(Quantity): "))
-        order_items.add(session,
-                        order_id=order_id,
-                        item_id=user_item_choice,
-                        quantity=quantity)
-    os.system('cls')
+        # adding the same item again increases its quantity instead of failing on the primary key.
+        services.add_items(session, order_id, [helper_classes.OrderLine(user_item_choice, quantity)])
+    clear_screen()
     return order_items.get_all(session, order_id=order_id)
 
-def get_order_total_price(session, order_id):
-
-    ordered_items = order_items.get_all(session, order_id=order_id)
-
-    total_price = 0
-
-    for ot in ordered_items:
-        item = menu_items.get_one(session, item_id=ot['item_id'])
-        unit_price = item['item_price']
-        total_price += (ot['quantity']*unit_price)
-
-    return float(total_price)
-
-def get_loyalty_points(session, customer_id):
-    current_loyalty_data = loyalty_program.get_one(session, customer_id=customer_id)
-    cost_value = int(points_to_cash(current_loyalty_data['total_points'], POINTS_CONVERSION_RATE))
-    current_loyalty_data['cost_value']=cost_value
-
-    return current_loyalty_data
-
-def handle_loyalty_points_claim(session, order_id):
-    order = orders.get_one(session, order_id=order_id)
+def handle_loyalty_points_claim(session, order, pending=None):
     if not yes_or_no(info_text='Do you want to use your loyalty points? '):
         return
 
-    current_loyalty_data = get_loyalty_points(session, order['customer_id'])
+    current_loyalty_data = services.get_loyalty_points(session, order['customer_id'])
     render_as_table("Loyalty Points Data", [current_loyalty_data])
 
     while True:
         try:
             points_to_claim = int(input("Enter number of points to claim: "))
-
-            if points_to_claim > current_loyalty_data['total_points']:
-                print(f"Insufficient points. You only have {current_loyalty_data['total_points']}.")
-                if yes_or_no(info_text='Do you want to abort the claim? '):
-                    return None  # Abort
-
-            elif points_to_claim <= 50:
-                print("You must claim more than 50 points.")
-                if yes_or_no(info_text='Do you want to abort the claim? '):
-                    return None  # Abort
-
-            else:
-                cost_value = int(points_to_cash(points_to_claim, POINTS_CONVERSION_RATE))
-                if yes_or_no(info_text=f'The claim\'s cost value is {cost_value}. Do you confirm? '):
-                    order_discounts.add(session,
-                                        order_id=order['order_id'],
-                                        loyalty_points_used=points_to_claim,
-                                        discount_amount=cost_value
-                                        )
-
-                    # updating the total points after claiming.
-                    new_total_points = int(current_loyalty_data['total_points'] - points_to_claim)
-                    loyalty_program.update(session,
-                                           'customer_id', current_loyalty_data['customer_id'],
-                                           total_points=new_total_points)
-
-                    # logging loyalty points claiming.
-                    loyalty_points_logs.add(session,
-                                            customer_id=current_loyalty_data['customer_id'],
-                                            order_id=order_id,
-                                            points_redeemed=points_to_claim)
-
-                    print("loyalty points claim was successful.,")
-                else:
-                    print("Claim canceled. You can enter a new amount.")  # Allow re-entry
-
         except ValueError:
             print("Invalid input! Please enter a valid number.")
+            continue
+
+        cost_value = int(points_to_cash(points_to_claim, POINTS_CONVERSION_RATE))
+        if not yes_or_no(info_text=f'The claim\'s cost value is {cost_value}. Do you confirm? '):
+            print("Claim canceled. You can enter a new amount.")  # Allow re-entry
+            continue
+
+        try:
+            services.redeem_points(session, order, points_to_claim, pending)
+            print("loyalty points claim was successful.,")
+            return
+        except ValueError as err:
+            print(err)
+            if yes_or_no(info_text='Do you want to abort the claim? '):
+                return None  # Abort
+
+def handle_discounts(session, order, total_price):
+    clear_screen()
+    # the total doesn't change while discounts are picked, so eligibility is worked out once.
+    filtered_discounts = services.get_discount_engine(session).outcomes(total_price)
+    if not filtered_discounts:
+        return
+
+    best = services.best_discounts(session, total_price)
+    if best['discounts']:
+        render_as_table("Best discount combination", best['discounts'])
+        if yes_or_no(info_text=f"Apply it for a final price of {best['final_price']}? "):
+            for discount in best['discounts']:
+                services.apply_order_discount(session, order, total_price, discount['discount_id'],
+                                              discount['discount_amount'])
+            return
 
-def handle_discounts(session, order_id, total_price):
-    order = orders.get_one(session, order_id=order_id)
-    os.system('cls')
     while True:
         if not yes_or_no(info_text='Do you want to apply discounts ? '):
             break
 
-        # filtering discounts
-        filtered_discounts = filter_discounts(total_price=total_price)
-        render_as_table("Available discounts for the order", filtered_discounts)
+        render_as_table("Available discounts for the order", filtered_discounts, cache=True)
 
-        # selects discounts
+        # selects and applies a discount
         selected_discount_id = int(input("Enter the discount_id to add: "))
-        selected_discount = next(
-            (d for d in filtered_discounts if d['discount_id'] == selected_discount_id), None
-        )
-        if not selected_discount:
+        try:
+            services.apply_order_discount(session, order, total_price, selected_discount_id)
+        except ValueError:
             print("Invalid discount ID. Please try again.")
-            continue
-
-        # applying discount
-        final_price = int(apply_discount(
-            total_price,
-            float(selected_discount['discount_value']),
-            selected_discount['type_name']
-        ))
-
-        discount_amount = float(total_price - final_price)
-
-        order_discounts.add(session,
-                            order_id=order_id,
-                            discount_id=selected_discount['discount_id'],
-                            discount_amount=discount_amount)
-
-        # order_bills.update(session, 'order_id', order_id,
-        #                    discount_applied=discount_amount,
-        #                    final_price=final_price)
 
 def calculate_cumulative_discount(discounts_data):
     render_as_table("Applied discounts", discounts_data)
@@ -366,56 +271,24 @@ def calculate_cumulative_discount(discounts_data):
 
     return total_discount_amount
 
-def filter_discounts(**filters):
-    discounts = get_discounts()
-
-    eligible_discounts = [discount for discount in discounts
-                          if discount['min_order_value'] <= filters['total_price']]
-    return eligible_discounts
-
-def get_discounts():
-    with Session(engine) as session:
-        stmt = text(
-            '''
-            SELECT d.discount_id, d.discount_name, dt.type_name, d.discount_value, d.min_order_value
-            FROM discounts as d
-            INNER JOIN discount_types as dt
-            ON d.type_id = dt.type_id 
-            WHERE d.is_active = true;
-            '''
-        )
-        result = session.execute(stmt).mappings().fetchall()
-
-        discounts = [dict(row) for row in result] if result else []
+def get_review_categories(session):
+    return reference_cache.get_or_load('review_categories',
+                                       lambda: review_categories.get_all(session),
+                                       depends_on=('review_categories',))
 
-    return discounts
+def generate_bill(session, order_id, pending=None, summary=None):
 
-def generate_bill(session, order_id):
-
-    order = orders.get_one(session, order_id=order_id)
     # update the order_status upfront.
-    orders.update(session,
-                  'order_id', order_id,
-                  order_status='completed')
-
-    total_price = get_order_total_price(session, order_id)
-    order_bills.add(session,
-                    order_id=order_id,
-                    total_price=total_price,
-                    discount_applied=0.0,
-                    final_price=total_price)
+    order = services.complete_order(session, order_id)
+    pricing = billing.price_order(session, order_id)
 
     if order['customer_id']:
-        handle_loyalty_points_claim(session, order_id)
-        handle_discounts(session, order_id, total_price)
+        handle_loyalty_points_claim(session, order, pending)
+        handle_discounts(session, order, pricing['total_price'])
+        calculate_cumulative_discount(order_discounts.get_all(session, order_id=order_id))
 
-        orders_discount_data = order_discounts.get_all(session, order_id=order_id)
-        total_discount_applied = calculate_cumulative_discount(orders_discount_data)
-
-        final_price=int(total_price-int(total_discount_applied))
-        order_bills.update(session, 'order_id', order_id,
-                           discount_applied=total_discount_applied,
-                           final_price=final_price)
+    # the bill is written once, after discounts are known.
+    services.write_bill(session, order, pricing, summary=summary)
     return [order_bills.get_one(session, order_id=order_id)]
 
 def initiate_payment(session, order_id):
@@ -423,35 +296,12 @@ def initiate_payment(session, order_id):
     # Collect input payment data
     input_data = add_row(order_payments.table.columns, skip_columns=['order_id'])
 
-    # Fetch order bill details
-    order_bill = order_bills.get_one(session, order_id=order_id)
-
-    amount_paid = int(input_data['amount_paid'])
-    final_price = int(order_bill['final_price'])
-
-    # Validate payment amount
-    if amount_paid < 0:
-        raise ValueError("Amount paid cannot be negative.")
-
-    if amount_paid > final_price:
-        raise ValueError(f"Overpayment not allowed! Maximum allowed: {final_price}, but received: {amount_paid}.")
-
-    # Determine payment status
-    payment_status = 'pending'
-    if 0 < amount_paid < final_price:
-        payment_status = 'partially_paid'
-    elif amount_paid == final_price:
-        payment_status = 'paid'
-
-    # Update order bill payment status
-    order_bills.update(session, 'order_id', order_id, payment_status=payment_status)
-
-    # Add payment record
-    order_payments.add(session, order_id=order_id, **input_data)
+    # validates the amount against the bill and updates its payment status
+    services.pay_order(session, order_id, input_data['amount_paid'], input_data.get('payment_type'))
 
     return order_payments.get_all(session, order_id=order_id)
 
-def get_feedback(session, customer_id=None, order_id=None, item_id=None):
+def get_feedback(session, customer_id=None, order_id=None, item_id=None, pending=None):
     skip_columns = ['customer_id', 'order_id', 'item_id', 'category_id', 'created_at']
     # if not customer_id:
     #     skip_columns.append('customer_id')
@@ -464,7 +314,7 @@ def get_feedback(session, customer_id=None, order_id=None, item_id=None):
 
     input_data = add_row(feedbacks.table.columns, skip_columns=skip_columns)
 
-    render_as_table("Feedback Categories", review_categories.get_all(session))
+    render_as_table("Feedback Categories", get_review_categories(session))
     selected_category_id = int(input("Enter the category_id : "))
 
     input_data['category_id'] = selected_category_id
@@ -472,14 +322,17 @@ def get_feedback(session, customer_id=None, order_id=None, item_id=None):
     input_data['order_id']=order_id
     input_data['item_id']= item_id
 
-    feedbacks.add(session, **input_data)
+    if pending is not None:
+        pending.add('feedbacks', **input_data)
+    else:
+        feedbacks.add(session, **input_data)
 
-def get_complaint(session, customer_id=None, order_id=None, item_id=None):
+def get_complaint(session, customer_id=None, order_id=None, item_id=None, pending=None):
     skip_columns = ['customer_id', 'order_id', 'item_id', 'category_id', 'created_at']
 
     input_data = add_row(complaints.table.columns, skip_columns=skip_columns)
 
-    render_as_table("Complaints Categories", review_categories.get_all(session))
+    render_as_table("Complaints Categories", get_review_categories(session))
     selected_category_id = int(input("Enter the category_id : "))
 
     input_data['category_id'] = selected_category_id
@@ -487,77 +340,61 @@ def get_complaint(session, customer_id=None, order_id=None, item_id=None):
     input_data['order_id']=order_id
     input_data['item_id']= item_id
 
-    complaints.add(session, **input_data)
-
-def get_reward_points(purchase_amount, earn_rate):
-    return int(purchase_amount*earn_rate)
-
-def update_reward_points(session, order, customer):
-    order_bill = order_bills.get_one(session, order_id=order['order_id'])
-    total_price = int(order_bill['total_price'])
-    logger.info(order_bill)
-    if order_bill['payment_status'] == 'paid' and total_price > 10:
-        points_earned = get_reward_points(total_price, POINTS_CONVERSION_RATE)
-        logger.info(f"Customer {customer['customer_id']} earned {points_earned} points for order {order['order_id']}.")
-
-        existing_log = loyalty_points_logs.get_one(session, order_id=order['order_id'])
-
-        # updating the total points in the loyalty program table.
-        loyalty_data = loyalty_program.get_one(session, customer_id=customer['customer_id'])
-        new_total_points = int(loyalty_data['total_points']) + points_earned
-        loyalty_program.update(session,
-                               'customer_id', customer['customer_id'],
-                               total_points=new_total_points)
-
-        # logging the points transaction
-        if existing_log:
-            loyalty_points_logs.update(session, 'order_id', order['order_id'], points_earned=points_earned)
-            logger.info(f"Updated reward points for order {order['order_id']} to {points_earned}.")
-        else:
-
-            loyalty_points_logs.add(session,
-                                    customer_id=customer['customer_id'],
-                                    order_id=order['order_id'],
-                                    points_earned=points_earned)
-            logger.info(f"Added new reward points log for order {order['order_id']}, customer {customer['customer_id']}.")
+    if pending is not None:
+        pending.add('complaints', **input_data)
+    else:
+        complaints.add(session, **input_data)
 
+def update_reward_points(session, order, customer, pending=None):
+    points_earned = services.award_points(session, order, pending=pending)
+    if points_earned:
         return f"You have earned {points_earned} points at this transactions ."
 
     return ""
 
-def get_complaints(session, customer, order):
+def get_complaints(session, customer, order, pending=None):
     if yes_or_no(info_text="Do you want to have any complaint for this order ? "):
-        get_complaint(session, customer_id=customer['customer_id'], order_id=order['order_id'])
+        get_complaint(session, customer_id=customer['customer_id'], order_id=order['order_id'], pending=pending)
 
     if yes_or_no(info_text="Do you want to have any personal complaint ? "):
-        get_complaint(session, customer_id=customer['customer_id'])
+        get_complaint(session, customer_id=customer['customer_id'], pending=pending)
 
     if yes_or_no(info_text="Do you want to leave a anonymous complaint ? "):
-        get_complaint(session)
+        get_complaint(session, pending=pending)
 
-def get_feedbacks(session, customer, order):
+def get_feedbacks(session, customer, order, pending=None):
     if yes_or_no(info_text="Do you want to leave a feedback for this order ? "):
-        get_feedback(session, customer_id=customer['customer_id'], order_id=order['order_id'])
+        get_feedback(session, customer_id=customer['customer_id'], order_id=order['order_id'], pending=pending)
 
     if yes_or_no(info_text="Do you want to leave a personal feedback ? "):
-        get_feedback(session, customer_id=customer['customer_id'])
+        get_feedback(session, customer_id=customer['customer_id'], pending=pending)
 
     if yes_or_no(info_text="Do you want to leave a anonymous feedback ? "):
-        get_feedback(session)
+        get_feedback(session, pending=pending)
 
 def start_transaction():
-
-    # Main Session
-    with Session(engine) as session:
+    from sqlalchemy.orm import Session
+
+    # One pooled connection serves the whole checkout; the session commits on it but never hands it back early.
+    with database.engine.connect() as connection, Session(bind=connection) as session, metrics.stage('checkout'), \
+            transaction_log_context():
+        # feedbacks, complaints and points logs are queued once the checkout has committed
+        pending = write_behind.PendingWrites() if WRITE_BEHIND_ENABLED else None
+        # the summary rows are shared by every till, so they are only bumped after the commit
+        summary = summaries.SummaryUpdates()
         try:
-            logger.info(f"Session Started sucessfully {session}")
+            logger.info("Session Started sucessfully %s", session)
             # Get Customer
-            customer = get_customer()
+            with metrics.stage('customer_lookup'):
+                customer = get_customer(session)
 
             display_data(customer)
 
             # Create Order
-            order = create_order(session, customer['customer_id'] if customer else None)
+            with metrics.stage('create_order'):
+                order = create_order(session, customer['customer_id'] if customer else None, summary)
+            if order:
+                bind_log_context(order_id=order['order_id'])
 
             display_data(customer, order)
 
@@ -566,38 +403,59 @@ def start_transaction():
                 raise Exception("Transaction Aborted")
 
             # add items to the order
-            items = add_items(session, order['order_id'])
+            with metrics.stage('add_items'):
+                items = add_items(session, order['order_id'])
 
 
 
             display_data(customer, order, items)
 
             # prepare bill
-            bill=generate_bill(session, order['order_id'])
+            with metrics.stage('generate_bill'):
+                bill=generate_bill(session, order['order_id'], pending, summary)
             display_data(customer, order, items, bill)
 
             # do payment
-            payment_details=initiate_payment(session, order['order_id'])
+            with metrics.stage('initiate_payment'):
+                payment_details=initiate_payment(session, order['order_id'])
             display_data(customer, order, items, bill, payment_details)
 
             # now reward points for order
-            reward=update_reward_points(session, order, customer)
+            with metrics.stage('update_reward_points'):
+                reward=update_reward_points(session, order, customer, pending)
             display_data(customer, order, items, bill, reward)
 
-            get_feedbacks(session, customer, order)
+            get_feedbacks(session, customer, order, pending)
 
-            get_complaints(session, customer, order)
+            get_complaints(session, customer, order, pending)
 
-            session.commit()
+            with metrics.stage('commit'):
+                session.commit()
+            summary.apply(session)
+            if pending:
+                write_behind.get_write_behind().submit(pending)
         except Exception as e:
             session.rollback()
             print(f'Error occured {e}')
 
-while True:
-    os.system("cls")
-    if not yes_or_no(info_text="Do you want to continue"):
-        break
-    start_transaction()
+def main(argv=None):
+    """Run the till: one checkout per "continue", until the cashier says no."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cafe CRM till.")
+    parser.add_argument('--quiet', action='store_true', help="don't render tables or clear the screen")
+    args = parser.parse_args(argv)
+    if args.quiet:
+        set_quiet()
+    # build the customer search index while the first prompt is up; importing SQLAlchemy happens on that thread too
+    threading.Thread(target=lambda: search.warm_up(), name='search-warm-up', daemon=True).start()
 
+    while True:
+        clear_screen()
+        if not yes_or_no(info_text="Do you want to continue"):
+            break
+        start_transaction()
 
 
+if __name__ == '__main__':
+    main()
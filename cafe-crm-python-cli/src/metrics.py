@@ -0,0 +1,261 @@
+"""Latency histograms for SQL statements, checkout stages and connection-pool waits.
+
+Usage: python -m src.metrics <metrics.json> [--kind sql|stage|pool]
+"""
+import argparse
+import atexit
+import json
+import re
+import signal
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from sqlalchemy import event
+from src.logger import logger
+from src.settings import METRICS_ENABLED, METRICS_MAX_SAMPLES, METRICS_SLOW_QUERY_MS, METRICS_DUMP_PATH
+
+# EXPLAIN prefix per dialect for the slow-query log; other dialects are logged without a plan.
+EXPLAIN_PREFIXES = {
+    'mysql': 'EXPLAIN ',
+    'postgresql': 'EXPLAIN ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+
+_whitespace = re.compile(r"\s+")
+# expanding IN lists render a different number of placeholders per call; fold them into one shape.
+_placeholder_list = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+
+
+def _nearest_rank(ordered, pct) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))]
+
+
+class Histogram:
+    """Latency samples for one metric; percentiles come from the most recent max_samples observations."""
+
+    def __init__(self, max_samples=METRICS_MAX_SAMPLES):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+
+    def observe(self, seconds, rows=None):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if rows is not None and rows >= 0:
+            self.rows += rows
+
+    def percentile(self, pct) -> float:
+        return _nearest_rank(sorted(self.samples), pct)
+
+    def summary(self) -> dict:
+        ordered = sorted(self.samples)
+        return {
+            "count": self.count,
+            "rows": self.rows,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(_nearest_rank(ordered, 50) * 1000, 3),
+            "p95_ms": round(_nearest_rank(ordered, 95) * 1000, 3),
+            "p99_ms": round(_nearest_rank(ordered, 99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class MetricsRegistry:
+    """Named histograms grouped by kind: 'sql' statements, checkout 'stage's and 'pool' waits."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def gauge(self, name, read):
+        """Register a callable sampled whenever counters are read (e.g. the pool's checked-out count)."""
+        self._gauges[name] = read
+
+    def counters(self) -> dict:
+        with self._lock:
+            values = dict(self._counters)
+        values.update({name: read() for name, read in self._gauges.items()})
+        return values
+
+    def observe(self, kind, name, seconds, rows=None):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            histogram = self._histograms.get((kind, name))
+            if histogram is None:
+                histogram = self._histograms[(kind, name)] = Histogram()
+            histogram.observe(seconds, rows)
+
+    def snapshot(self) -> list[dict]:
+        """One row per metric, slowest p95 first within each kind."""
+        with self._lock:
+            rows = [{"kind": kind, "name": name, **histogram.summary()}
+                    for (kind, name), histogram in self._histograms.items()]
+        return sorted(rows, key=lambda row: (row['kind'], -row['p95_ms']))
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def dump(self, path):
+        """Write the current histograms to path as JSON."""
+        with open(path, 'w', encoding='utf-8') as metrics_file:
+            json.dump({"generated_at": time.strftime('%Y-%m-%dT%H:%M:%S'), "metrics": self.snapshot(),
+                       "counters": self.counters()},
+                      metrics_file, indent=2)
+
+    def print_report(self, kind=None):
+        from src.utils import render_as_table
+
+        rows = [row for row in self.snapshot() if kind is None or row['kind'] == kind]
+        render_as_table("Latency (ms)", rows)
+        render_as_table("Counters", [self.counters()])
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def stage(name):
+    """Time a block of work (e.g. one step of a checkout) into the 'stage' histograms."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe('stage', name, time.perf_counter() - started)
+
+
+def statement_shape(statement) -> str:
+    """Normalise SQL text so every execution of the same statement lands in one histogram."""
+    return _placeholder_list.sub('(?)', _whitespace.sub(' ', statement).strip())[:200]
+
+
+def _explain(conn, statement, parameters):
+    prefix = EXPLAIN_PREFIXES.get(conn.dialect.name)
+    if prefix is None or not statement.lstrip().upper().startswith('SELECT'):
+        return None
+    # a raw DB-API cursor keeps the EXPLAIN itself out of the engine events and the histograms.
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [tuple(row) for row in cursor.fetchall()]
+    except Exception as err:
+        return [f"EXPLAIN failed: {err}"]
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # kept on the statement's own context rather than a stack on conn.info, so a statement
+    # that raises (and never reaches after_cursor_execute) leaves nothing behind.
+    context.metrics_started = time.perf_counter()
+
+
+def _statement_timer(name):
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context.metrics_started
+        shape = statement_shape(statement)
+        registry.observe('sql', f'[{name}] {shape}', elapsed, cursor.rowcount)
+
+        if METRICS_SLOW_QUERY_MS and elapsed * 1000 >= METRICS_SLOW_QUERY_MS:
+            plan = None if executemany else _explain(conn, statement, parameters)
+            logger.warning("Slow query on %s (%.1f ms, %s rows): %s params=%r plan=%r",
+                           name, elapsed * 1000, cursor.rowcount, shape, parameters, plan)
+
+    return _after_cursor_execute
+
+
+def _timed_pool_connect(pool, name):
+    connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            registry.observe('pool', f'[{name}] checkout wait', time.perf_counter() - started)
+
+    pool.connect = timed_connect
+
+
+def instrument_pool(pool, name='primary'):
+    """Pool checkout wait and hold time, new/invalidated connection counts and live pool gauges.
+
+    Every key carries the engine's name, so the primary's and the replica's pools are reported side by side.
+    """
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info['metrics_checked_out_at'] = time.perf_counter()
+        registry.increment(f'{name}_pool_checkouts')
+
+    def on_checkin(dbapi_connection, connection_record):
+        checked_out_at = connection_record.info.pop('metrics_checked_out_at', None)
+        if checked_out_at is not None:
+            registry.observe('pool', f'[{name}] connection held', time.perf_counter() - checked_out_at)
+
+    _timed_pool_connect(pool, name)
+    event.listen(pool, 'checkout', on_checkout)
+    event.listen(pool, 'checkin', on_checkin)
+    event.listen(pool, 'connect', lambda *_: registry.increment(f'{name}_pool_connections_opened'))
+    # raised by pre-ping or by a disconnect error; a steady climb means recycle is too long.
+    event.listen(pool, 'invalidate', lambda *_: registry.increment(f'{name}_pool_connections_invalidated'))
+    for attr in ('size', 'checkedout', 'overflow', 'checkedin'):
+        # QueuePool exposes these as methods; SingletonThreadPool's size is a plain int.
+        if callable(getattr(pool, attr, None)):
+            registry.gauge(f'{name}_pool_{attr}', getattr(pool, attr))
+
+
+def instrument_engine(engine, name='primary'):
+    """Hook statement timing, row counts, the slow-query log and pool metrics onto engine, keyed by name."""
+    if not METRICS_ENABLED:
+        return
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _statement_timer(name))
+    instrument_pool(engine.pool, name)
+
+
+def _dump_to_configured_path(*_):
+    try:
+        registry.dump(METRICS_DUMP_PATH)
+    except OSError as err:
+        logger.error("Could not write metrics to %s: %s", METRICS_DUMP_PATH, err)
+
+
+if METRICS_ENABLED and METRICS_DUMP_PATH:
+    # dumped when the till exits, and on demand with `kill -USR1 <pid>` where signals allow it.
+    atexit.register(_dump_to_configured_path)
+    if hasattr(signal, 'SIGUSR1') and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, _dump_to_configured_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print a metrics dump written via METRICS_DUMP_PATH.")
+    parser.add_argument('path')
+    parser.add_argument('--kind', choices=('sql', 'stage', 'pool'))
+    args = parser.parse_args(argv)
+
+    from src.utils import render_as_table
+
+    with open(args.path, encoding='utf-8') as metrics_file:
+        dumped = json.load(metrics_file)
+    rows = [row for row in dumped['metrics'] if args.kind is None or row['kind'] == args.kind]
+    render_as_table(f"Latency (ms) at {dumped['generated_at']}", rows)
+    if dumped.get('counters'):
+        render_as_table("Counters", [dumped['counters']])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,373 @@
+"""The Get* analytics procedures from the DDL script, runnable from Python.
+
+run_reports() runs any set of them concurrently on a thread pool, each on its own connection (on
+the read replica when src.routing allows it). A report still running REPORT_TIMEOUT_SECONDS after
+it started is cancelled on the database and returned as timed out, without holding up the others;
+one that finishes but took longer than that counts as timed out too.
+
+Results are cached per procedure and arguments in report_cache. Like the reference cache, an
+entry is dropped as soon as BaseCRUD writes one of the tables the report reads in this process,
+and after REPORT_CACHE_TTL seconds for writes made elsewhere. A result is not cached at all if
+such a write happened while the report was running.
+
+On MySQL the stored procedures themselves are CALLed; other databases (the SQLite files used
+for development) run an equivalent query over the same hot + archived history.
+
+Usage: python -m src.reports [GetMonthlyRevenue ...] [--result-count 10] [--min-orders 2]
+                             [--timeout 30] [--workers 4] [--repeat 1] [--list]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
+from typing import Callable
+from sqlalchemy import select, text, func, desc, extract, literal_column
+from src.archive import ARCHIVED_TABLES, union_table
+from src.cache import TTLCache
+from src.controller import BaseCRUD
+from src.logger import logger
+from src.metrics import registry
+from src.routing import router, REPORT
+from src.settings import REPORT_WORKERS, REPORT_TIMEOUT_SECONDS, REPORT_CACHE_TTL, REPORT_CACHE_MAXSIZE
+from src.utils import render_as_table
+
+# (procedure, argument values) -> rows
+report_cache = TTLCache(ttl=REPORT_CACHE_TTL, maxsize=REPORT_CACHE_MAXSIZE)
+
+customers = BaseCRUD('customers')
+menu_items = BaseCRUD('menu_items')
+menu_categories = BaseCRUD('menu_categories')
+review_categories = BaseCRUD('review_categories')
+complaints = BaseCRUD('complaints')
+feedbacks = BaseCRUD('feedbacks')
+
+
+@dataclass(frozen=True)
+class Report:
+    procedure: str
+    # tables the procedure reads; their archives are added by depends_on
+    tables: tuple
+    # builds the portable equivalent of the procedure from its arguments
+    query: Callable
+    # (name, default) of each IN parameter, in CALL order
+    params: tuple = ()
+
+    @property
+    def depends_on(self) -> tuple:
+        return self.tables + tuple(f"{table_name}_archive" for table_name in self.tables
+                                   if table_name in ARCHIVED_TABLES)
+
+    def bind(self, args) -> dict:
+        """This report's arguments from args, with defaults for the ones not given."""
+        return {name: args.get(name, default) for name, default in self.params}
+
+    def call_statement(self):
+        placeholders = ', '.join(f":{name}" for name, _ in self.params)
+        return text(f"CALL {self.procedure}({placeholders})")
+
+
+def _customer_order_counts():
+    c, o = customers.table, union_table('orders')
+    return (
+        select(c.c.name, c.c.email, c.c.date_of_birth, c.c.mobile_no,
+               func.count(o.c.customer_id).label('total_no_of_orders'))
+        .select_from(c.join(o, o.c.customer_id == c.c.customer_id))
+        .group_by(c.c.customer_id)
+    )
+
+
+def _top_spending_customers(result_count):
+    o, ob, c = union_table('orders'), union_table('order_bills'), customers.table
+    total_spent = func.sum(ob.c.total_price).label('total_spent')
+    return (
+        select(c.c.name, total_spent)
+        .select_from(o.join(ob, o.c.order_id == ob.c.order_id).join(c, o.c.customer_id == c.c.customer_id))
+        .group_by(c.c.customer_id)
+        .order_by(desc(total_spent))
+        .limit(result_count)
+    )
+
+
+def _monthly_revenue():
+    o, ob = union_table('orders'), union_table('order_bills')
+    month = extract('month', o.c.created_at)
+    return (
+        select(month.label('month'),
+               func.sum(ob.c.total_price).label('total_potential_revenue'),
+               func.sum(ob.c.final_price).label('total_collected_revenue'))
+        .select_from(o.join(ob, o.c.order_id == ob.c.order_id))
+        .group_by(month)
+    )
+
+
+def _customer_average_spending():
+    o, ob, c = union_table('orders'), union_table('order_bills'), customers.table
+    return (
+        select(c.c.name, func.avg(ob.c.total_price).label('average_order_value'))
+        .select_from(o.join(ob, o.c.order_id == ob.c.order_id).join(c, c.c.customer_id == o.c.customer_id))
+        .group_by(c.c.customer_id)
+    )
+
+
+def _peak_order_hours():
+    o = union_table('orders')
+    hour = extract('hour', o.c.created_at)
+    order_count = func.count(o.c.order_id).label('order_count')
+    return select(hour.label('order_hour'), order_count).group_by(hour).order_by(desc(order_count))
+
+
+def _redeemed_points_percentage():
+    lpl = union_table('loyalty_points_logs')
+    redeemed = select(func.count(lpl.c.order_id)).where(lpl.c.points_redeemed.is_not(None)).scalar_subquery()
+    logged = select(func.count(lpl.c.order_id)).scalar_subquery()
+    return select((redeemed * literal_column('100.0') / func.nullif(logged, 0)).label('Percentage'))
+
+
+def _most_ordered_menu_items():
+    m, oi = menu_items.table, union_table('order_items')
+    total_orders = func.count(oi.c.order_id).label('total_orders')
+    return (
+        select(*m.c, total_orders)
+        .select_from(m.join(oi, m.c.item_id == oi.c.item_id))
+        .group_by(m.c.item_id)
+        .order_by(desc(total_orders))
+    )
+
+
+def _complaint_category_counts():
+    c, rc = complaints.table, review_categories.table
+    no_of_complaints = func.count(c.c.category_id).label('no_of_complaints')
+    return (
+        select(rc.c.category_name, no_of_complaints)
+        .select_from(c.join(rc, c.c.category_id == rc.c.category_id))
+        .group_by(rc.c.category_id)
+        .order_by(desc(no_of_complaints))
+    )
+
+
+def _menu_item_average_ratings():
+    f, mi = feedbacks.table, menu_items.table
+    avg_rating = func.avg(f.c.rating).label('avg_rating')
+    return (
+        select(mi.c.item_name, avg_rating)
+        .select_from(f.join(mi, f.c.item_id == mi.c.item_id))
+        .group_by(mi.c.item_name)
+        .order_by(desc(avg_rating))
+    )
+
+
+def _frequent_customers(min_orders):
+    c, o = customers.table, union_table('orders')
+    return (
+        select(*c.c, func.count(o.c.order_id).label('order_count'))
+        .select_from(c.join(o, c.c.customer_id == o.c.customer_id))
+        .group_by(c.c.customer_id)
+        .having(func.count(o.c.order_id) > min_orders)
+    )
+
+
+def _total_revenue_by_menu_category():
+    mi, mc, oi = menu_items.table, menu_categories.table, union_table('order_items')
+    res = (
+        select(mi.c.item_id, mi.c.category_id, (func.sum(oi.c.quantity) * mi.c.item_price).label('total_revenue'))
+        .select_from(mi.join(mc, mi.c.category_id == mc.c.category_id).join(oi, mi.c.item_id == oi.c.item_id))
+        .group_by(mi.c.item_id, mi.c.category_id)
+        .subquery('res')
+    )
+    return (
+        select(mc.c.category_name, func.sum(res.c.total_revenue).label('total_revenue'))
+        .select_from(mc.join(res, mc.c.category_id == res.c.category_id))
+        .group_by(mc.c.category_id)
+    )
+
+
+# In the order of the DDL script.
+REPORTS = {report.procedure: report for report in (
+    Report('GetCustomerOrderCounts', ('customers', 'orders'), _customer_order_counts),
+    Report('GetTopSpendingCustomers', ('orders', 'order_bills', 'customers'), _top_spending_customers,
+           (('result_count', 10),)),
+    Report('GetMonthlyRevenue', ('orders', 'order_bills'), _monthly_revenue),
+    Report('GetCustomerAverageSpending', ('orders', 'order_bills', 'customers'), _customer_average_spending),
+    Report('GetPeakOrderHours', ('orders',), _peak_order_hours),
+    Report('GetRedeemedPointsPercentage', ('loyalty_points_logs',), _redeemed_points_percentage),
+    Report('GetMostOrderedMenuItems', ('menu_items', 'order_items'), _most_ordered_menu_items),
+    Report('GetComplaintCategoryCounts', ('complaints', 'review_categories'), _complaint_category_counts),
+    Report('GetMenuItemAverageRatings', ('feedbacks', 'menu_items'), _menu_item_average_ratings),
+    Report('GetFrequentCustomers', ('customers', 'orders'), _frequent_customers, (('min_orders', 2),)),
+    Report('GetTotalRevenueByMenuCategory', ('menu_categories', 'menu_items', 'order_items'),
+           _total_revenue_by_menu_category),
+)}
+
+
+def get_report(name) -> Report:
+    """Report by procedure name, case-insensitively."""
+    for procedure, report in REPORTS.items():
+        if procedure.lower() == name.lower():
+            return report
+    raise ValueError(f"Unknown report: {name}. Choose from {', '.join(REPORTS)}.")
+
+
+def _backend_id(conn):
+    """Server-side id of conn's session, used to cancel its statement from another connection."""
+    match conn.dialect.name:
+        case 'mysql' | 'mariadb':
+            return conn.execute(text("SELECT CONNECTION_ID()")).scalar()
+        case 'postgresql':
+            return conn.execute(text("SELECT pg_backend_pid()")).scalar()
+    return None
+
+
+def _cancel(state):
+    """Stop the statement a timed-out report is running; its worker then fails and exits."""
+    conn = state.get('conn')
+    if conn is None:
+        return
+    try:
+        match conn.dialect.name:
+            case 'mysql' | 'mariadb':
+                with conn.engine.connect() as killer:
+                    killer.execute(text(f"KILL QUERY {int(state['backend_id'])}"))
+            case 'postgresql':
+                with conn.engine.connect() as killer:
+                    killer.execute(text("SELECT pg_cancel_backend(:pid)"), {"pid": state['backend_id']})
+            case 'sqlite':
+                state['dbapi_connection'].interrupt()
+    except Exception as err:
+        logger.warning("Could not cancel timed-out report %s: %s", state.get('procedure'), err)
+
+
+def _execute(report, values, state) -> list[dict]:
+    """Run one report on its own connection; state lets the caller cancel it."""
+    state['started'] = time.monotonic()
+    with router.connect(REPORT, tables=report.depends_on) as conn:
+        if state.get('timed_out'):
+            return []
+        state['backend_id'] = _backend_id(conn)
+        state['dbapi_connection'] = conn.connection.dbapi_connection
+        state['conn'] = conn
+
+        if conn.dialect.name in ('mysql', 'mariadb'):
+            result = conn.execute(report.call_statement(), values)
+        else:
+            result = conn.execute(report.query(**values))
+        rows = [dict(row) for row in result.mappings()]
+        state['finished'] = time.monotonic()
+        return rows
+
+
+def _result(report, values, rows=None, seconds=0.0, cached=False, error=None) -> dict:
+    return {"report": report.procedure, "args": values, "rows": rows, "seconds": round(seconds, 3),
+            "cached": cached, "error": error}
+
+
+def run_reports(names=None, args=None, timeout=REPORT_TIMEOUT_SECONDS, workers=REPORT_WORKERS,
+                use_cache=True) -> list[dict]:
+    """Run the named reports (all by default) concurrently; one result dict per report, in order.
+
+    args holds procedure arguments by name (result_count, min_orders); each report takes the ones
+    it declares. A failed or timed-out report has rows=None and the reason in error.
+    """
+    reports = list(dict.fromkeys(get_report(name) for name in (names or REPORTS)))
+    args = args or {}
+    results = {}
+    jobs = {}
+
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report')
+    try:
+        for report in reports:
+            values = report.bind(args)
+            key = (report.procedure, tuple(values.values()))
+            rows = report_cache.get(key) if use_cache else None
+            if rows is not None:
+                results[report.procedure] = _result(report, values, rows, cached=True)
+                continue
+            # taken before the report runs, so a write made while it runs keeps its rows out of the cache
+            state = {'procedure': report.procedure, 'generation': report_cache.generation(report.depends_on)}
+            jobs[executor.submit(_execute, report, values, state)] = (report, values, key, state)
+
+        pending = set(jobs)
+        while pending:
+            now = time.monotonic()
+            deadlines = [jobs[future][3]['started'] + timeout for future in pending if 'started' in jobs[future][3]]
+            done, pending = wait(pending, timeout=max(min(deadlines, default=now + 0.1) - now, 0),
+                                 return_when=FIRST_COMPLETED)
+
+            for future in done:
+                report, values, key, state = jobs[future]
+                seconds = time.monotonic() - state['started']
+                try:
+                    rows = future.result()
+                except Exception as err:
+                    logger.warning("Report %s failed after %.2fs: %s", report.procedure, seconds, err)
+                    results[report.procedure] = _result(report, values, seconds=seconds, error=str(err))
+                    continue
+                seconds = state['finished'] - state['started']
+                if seconds > timeout:
+                    logger.warning("Report %s took %.2fs, over its %ss timeout", report.procedure, seconds, timeout)
+                    results[report.procedure] = _result(report, values, seconds=seconds,
+                                                        error=f"timed out after {timeout}s")
+                    continue
+                registry.observe('report', report.procedure, seconds, len(rows))
+                report_cache.set(key, rows, depends_on=report.depends_on, generation=state['generation'])
+                results[report.procedure] = _result(report, values, rows, seconds)
+
+            now = time.monotonic()
+            for future in list(pending):
+                report, values, key, state = jobs[future]
+                if 'started' in state and now - state['started'] > timeout:
+                    state['timed_out'] = True
+                    _cancel(state)
+                    pending.discard(future)
+                    logger.warning("Report %s timed out after %ss", report.procedure, timeout)
+                    results[report.procedure] = _result(report, values, seconds=now - state['started'],
+                                                        error=f"timed out after {timeout}s")
+    finally:
+        # timed-out workers finish (with an error) in the background once their statement is cancelled
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return [results[report.procedure] for report in reports]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Get* analytics reports concurrently.")
+    parser.add_argument('reports', nargs='*', help="procedure names (default: all of them)")
+    parser.add_argument('--result-count', type=int, default=10, help="for GetTopSpendingCustomers")
+    parser.add_argument('--min-orders', type=int, default=2, help="for GetFrequentCustomers")
+    parser.add_argument('--timeout', type=float, default=REPORT_TIMEOUT_SECONDS, help="seconds per report")
+    parser.add_argument('--workers', type=int, default=REPORT_WORKERS)
+    parser.add_argument('--repeat', type=int, default=1, help="run the set this many times (later runs hit the cache)")
+    parser.add_argument('--list', action='store_true', help="list the reports and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for report in REPORTS.values():
+            params = ', '.join(f"{name}={default}" for name, default in report.params)
+            print(f"{report.procedure}({params})  reads {', '.join(report.depends_on)}")
+        return
+
+    for name in args.reports:
+        try:
+            get_report(name)
+        except ValueError as err:
+            parser.error(str(err))
+
+    report_args = {"result_count": args.result_count, "min_orders": args.min_orders}
+    for run in range(args.repeat):
+        started = time.perf_counter()
+        results = run_reports(args.reports, report_args, args.timeout, args.workers)
+        elapsed = time.perf_counter() - started
+
+        if run == 0:
+            for result in results:
+                if result['error']:
+                    print(f"{result['report']}: {result['error']}")
+                else:
+                    render_as_table(f"{result['report']} ({result['seconds']}s)", result['rows'])
+
+        cached = sum(result['cached'] for result in results)
+        failed = sum(result['error'] is not None for result in results)
+        print(f"Run {run + 1}: {len(results)} reports in {elapsed:.3f}s ({cached} cached, {failed} failed)")
+
+
+if __name__ == '__main__':
+    main()
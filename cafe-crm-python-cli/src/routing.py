@@ -0,0 +1,120 @@
+"""Primary / replica routing for reads.
+
+Checkouts keep their one primary connection for every read and write. Listings (the customer
+picker, the menu) and reports can instead go to DB_REPLICA_URL, as long as:
+
+- the replica is no more than REPLICA_MAX_LAG_SECONDS behind (measured at most every
+  REPLICA_LAG_CHECK_SECONDS; an unreachable replica counts as too far behind), and
+- this process hasn't written any of the tables being read in the last
+  REPLICA_READ_YOUR_WRITES_SECONDS, so a till sees the customer it just registered.
+
+Otherwise the read stays on the primary. To try it locally point DB_URL and DB_REPLICA_URL at
+two SQLite files (one copied from the other).
+"""
+import threading
+import time
+from contextlib import contextmanager
+from sqlalchemy import text
+from src.cache import register_invalidation_listener
+from src.database import engine, replica_engine
+from src.logger import logger
+from src.settings import REPLICA_MAX_LAG_SECONDS, REPLICA_READ_YOUR_WRITES_SECONDS, REPLICA_LAG_CHECK_SECONDS
+
+# What a connection is for: WRITE always gets the primary; READ and REPORT may get the replica.
+WRITE, READ, REPORT = 'write', 'read', 'report'
+
+
+def measure_lag(conn) -> float:
+    """Seconds the server behind conn is behind its source; 0 when it isn't replicating."""
+    match conn.dialect.name:
+        case 'mysql' | 'mariadb':
+            try:
+                row = conn.execute(text("SHOW REPLICA STATUS")).mappings().fetchone()
+            except Exception:
+                # MySQL before 8.0.22 and MariaDB before 10.5.1
+                row = conn.execute(text("SHOW SLAVE STATUS")).mappings().fetchone()
+            if row is None:
+                return 0.0
+            lag = row.get('Seconds_Behind_Source', row.get('Seconds_Behind_Master'))
+            # NULL means the replication threads are stopped
+            return float('inf') if lag is None else float(lag)
+        case 'postgresql':
+            lag = conn.execute(text(
+                "SELECT CASE WHEN pg_is_in_recovery() "
+                "THEN EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) ELSE 0 END"
+            )).scalar()
+            return float('inf') if lag is None else float(lag)
+        case _:
+            # e.g. a copied SQLite file: there is no replication stream to lag behind
+            return 0.0
+
+
+class EngineRouter:
+    """Picks the primary or the replica engine for each read; see the module docstring."""
+
+    def __init__(self, primary, replica=None, max_lag_seconds=REPLICA_MAX_LAG_SECONDS,
+                 read_your_writes_seconds=REPLICA_READ_YOUR_WRITES_SECONDS,
+                 lag_check_seconds=REPLICA_LAG_CHECK_SECONDS):
+        self.primary = primary
+        self.replica = replica
+        self.max_lag_seconds = max_lag_seconds
+        self.read_your_writes_seconds = read_your_writes_seconds
+        self.lag_check_seconds = lag_check_seconds
+        self.routed = {'primary': 0, 'replica': 0}
+        self._written_at = {}
+        self._lag = None
+        self._lag_checked_at = None
+        self._lock = threading.Lock()
+        register_invalidation_listener(self)
+
+    def invalidate_table(self, table_name):
+        """Invalidation hook called by BaseCRUD writes: pins reads of table_name to the primary for a while."""
+        self._written_at[table_name] = time.monotonic()
+
+    def replica_lag(self) -> float:
+        """The replica's lag in seconds, re-measured when the last reading is older than lag_check_seconds."""
+        with self._lock:
+            now = time.monotonic()
+            if self._lag_checked_at is not None and now - self._lag_checked_at < self.lag_check_seconds:
+                return self._lag
+            try:
+                with self.replica.connect() as conn:
+                    self._lag = measure_lag(conn)
+            except Exception as err:
+                logger.warning("Replica lag check failed, reading from the primary: %s", err)
+                self._lag = float('inf')
+            self._lag_checked_at = now
+            return self._lag
+
+    def _recently_written(self, tables) -> bool:
+        cutoff = time.monotonic() - self.read_your_writes_seconds
+        return any(self._written_at.get(table_name, cutoff) > cutoff for table_name in tables)
+
+    def engine_for(self, intent=READ, tables=()):
+        """The engine a connection for intent, reading tables, should use."""
+        use_replica = (intent != WRITE and self.replica is not None
+                       and not self._recently_written(tables)
+                       and self.replica_lag() <= self.max_lag_seconds)
+        self.routed['replica' if use_replica else 'primary'] += 1
+        return self.replica if use_replica else self.primary
+
+    def connect(self, intent=READ, tables=()):
+        """A new connection for intent; use as `with router.connect(REPORT) as conn:`."""
+        return self.engine_for(intent, tables).connect()
+
+    @contextmanager
+    def reading(self, conn=None, tables=(), intent=READ):
+        """Connection for a read of tables: the replica when allowed, otherwise conn (e.g. the checkout's).
+
+        Without conn, a primary read gets a connection of its own.
+        """
+        target = self.engine_for(intent, tables)
+        if target is self.primary and conn is not None:
+            yield conn
+            return
+        with target.connect() as routed_conn:
+            yield routed_conn
+
+
+# Process-wide router over the DB_URL and DB_REPLICA_URL engines.
+router = EngineRouter(engine, replica_engine)
@@ -0,0 +1,206 @@
+"""Portable mirror of mysql-scripts/cafe_crm_ddl_script.sql.
+
+The application reflects its tables from the live database; these definitions only exist to
+create the same tables on databases the MySQL script can't run against (a local SQLite file for
+development and load tests). Stored procedures are not mirrored. Keep in step with the DDL script.
+"""
+import re
+from sqlalchemy import (MetaData, Table, Column, ForeignKey, PrimaryKeyConstraint, CheckConstraint, Index,
+                        Integer, SmallInteger, String, Text, Date, DateTime, Numeric, Boolean, Enum, func, text)
+
+schema_metadata = MetaData()
+
+Table('customers', schema_metadata,
+      Column('customer_id', Integer, primary_key=True, autoincrement=True),
+      Column('name', String(256), nullable=False),
+      Column('email', String(256), unique=True),
+      Column('mobile_no', String(15), unique=True),
+      Column('date_of_birth', Date))
+
+Table('menu_categories', schema_metadata,
+      Column('category_id', Integer, primary_key=True, autoincrement=True),
+      Column('category_name', String(256), unique=True))
+
+Table('menu_items', schema_metadata,
+      Column('item_id', Integer, primary_key=True, autoincrement=True),
+      Column('item_name', String(256), nullable=False, unique=True),
+      Column('category_id', Integer, ForeignKey('menu_categories.category_id', ondelete='CASCADE'), nullable=False),
+      Column('item_price', Numeric(10, 2), nullable=False))
+
+Table('discount_types', schema_metadata,
+      Column('type_id', Integer, primary_key=True, autoincrement=True),
+      Column('type_name', String(30), nullable=False))
+
+Table('discounts', schema_metadata,
+      Column('discount_id', Integer, primary_key=True, autoincrement=True),
+      Column('discount_name', String(256), nullable=False),
+      Column('type_id', Integer, ForeignKey('discount_types.type_id', ondelete='CASCADE'), nullable=False),
+      Column('discount_value', Numeric(10, 2), nullable=False),
+      Column('min_order_value', Numeric(10, 2), server_default=text('0')),
+      Column('is_active', Boolean, server_default=text('1')))
+
+Table('orders', schema_metadata,
+      Column('order_id', Integer, primary_key=True, autoincrement=True),
+      Column('customer_id', Integer, ForeignKey('customers.customer_id', ondelete='SET NULL')),
+      Column('order_status', Enum('new', 'preparing', 'completed', 'cancelled', name='order_status'),
+             server_default='new'),
+      Column('created_at', DateTime, server_default=func.current_timestamp()),
+      Column('updated_at', DateTime, server_default=func.current_timestamp()))
+
+Table('order_items', schema_metadata,
+      Column('order_id', Integer, ForeignKey('orders.order_id')),
+      Column('item_id', Integer, ForeignKey('menu_items.item_id')),
+      Column('quantity', Integer, nullable=False, server_default=text('1')),
+      PrimaryKeyConstraint('order_id', 'item_id'))
+
+Table('order_payments', schema_metadata,
+      Column('payment_id', Integer, primary_key=True, autoincrement=True),
+      Column('order_id', Integer, ForeignKey('orders.order_id', ondelete='CASCADE'), nullable=False),
+      Column('payment_type', Enum('cash', 'card', 'upi', 'paypal', name='payment_type'), server_default='cash'),
+      Column('amount_paid', Numeric(10, 2), nullable=False, server_default=text('0.0')))
+
+Table('order_bills', schema_metadata,
+      Column('order_id', Integer, ForeignKey('orders.order_id', ondelete='CASCADE'), primary_key=True,
+             autoincrement=False),
+      Column('total_price', Numeric(10, 2), nullable=False, server_default=text('0.0')),
+      Column('discount_applied', Numeric(10, 2), nullable=False, server_default=text('0.0')),
+      Column('final_price', Numeric(10, 2), nullable=False, server_default=text('0.0')),
+      Column('payment_status', Enum('pending', 'partially_paid', 'paid', 'failed', name='payment_status'),
+             server_default='pending'))
+
+Table('order_discounts', schema_metadata,
+      Column('order_discount_id', Integer, primary_key=True, autoincrement=True),
+      Column('order_id', Integer, ForeignKey('orders.order_id', ondelete='CASCADE'), nullable=False),
+      Column('discount_id', Integer, ForeignKey('discounts.discount_id', ondelete='SET NULL')),
+      Column('loyalty_points_used', Integer, CheckConstraint('loyalty_points_used >= 0'), server_default=text('0')),
+      Column('discount_amount', Numeric(10, 2), nullable=False))
+
+Table('loyalty_tiers', schema_metadata,
+      Column('tier_id', Integer, primary_key=True, autoincrement=True),
+      Column('tier_name', String(30), nullable=False),
+      Column('min_points', Integer, nullable=False),
+      Column('max_points', Integer, nullable=False))
+
+Table('loyalty_program', schema_metadata,
+      Column('loyalty_id', Integer, primary_key=True, autoincrement=True),
+      Column('customer_id', Integer, ForeignKey('customers.customer_id', ondelete='CASCADE'), nullable=False),
+      Column('total_points', Integer, CheckConstraint('total_points >= 0'), server_default=text('0')),
+      Column('tier_id', Integer, ForeignKey('loyalty_tiers.tier_id', ondelete='CASCADE'), nullable=False))
+
+Table('loyalty_points_logs', schema_metadata,
+      Column('log_id', Integer, primary_key=True, autoincrement=True),
+      Column('customer_id', Integer, ForeignKey('customers.customer_id', ondelete='CASCADE'), nullable=False),
+      Column('order_id', Integer, ForeignKey('orders.order_id', ondelete='SET NULL')),
+      Column('points_earned', Integer),
+      Column('points_redeemed', Integer),
+      Column('created_at', DateTime, server_default=func.current_timestamp()),
+      Column('updated_at', DateTime, server_default=func.current_timestamp()))
+
+# Archive: completed, fully paid orders moved out of the hot tables by src/archive.py.
+Table('orders_archive', schema_metadata,
+      Column('order_id', Integer, primary_key=True, autoincrement=False),
+      Column('customer_id', Integer, ForeignKey('customers.customer_id', ondelete='SET NULL')),
+      Column('order_status', Enum('new', 'preparing', 'completed', 'cancelled', name='order_status'),
+             server_default='new'),
+      Column('created_at', DateTime),
+      Column('updated_at', DateTime),
+      Index('idx_orders_archive_created_at', 'created_at'))
+
+Table('order_items_archive', schema_metadata,
+      Column('order_id', Integer, ForeignKey('orders_archive.order_id')),
+      Column('item_id', Integer, ForeignKey('menu_items.item_id')),
+      Column('quantity', Integer, nullable=False, server_default=text('1')),
+      PrimaryKeyConstraint('order_id', 'item_id'))
+
+Table('order_payments_archive', schema_metadata,
+      Column('payment_id', Integer, primary_key=True, autoincrement=False),
+      Column('order_id', Integer, ForeignKey('orders_archive.order_id', ondelete='CASCADE'), nullable=False),
+      Column('payment_type', Enum('cash', 'card', 'upi', 'paypal', name='payment_type'), server_default='cash'),
+      Column('amount_paid', Numeric(10, 2), nullable=False, server_default=text('0.0')))
+
+Table('order_bills_archive', schema_metadata,
+      Column('order_id', Integer, ForeignKey('orders_archive.order_id', ondelete='CASCADE'), primary_key=True,
+             autoincrement=False),
+      Column('total_price', Numeric(10, 2), nullable=False, server_default=text('0.0')),
+      Column('discount_applied', Numeric(10, 2), nullable=False, server_default=text('0.0')),
+      Column('final_price', Numeric(10, 2), nullable=False, server_default=text('0.0')),
+      Column('payment_status', Enum('pending', 'partially_paid', 'paid', 'failed', name='payment_status'),
+             server_default='pending'))
+
+Table('order_discounts_archive', schema_metadata,
+      Column('order_discount_id', Integer, primary_key=True, autoincrement=False),
+      Column('order_id', Integer, ForeignKey('orders_archive.order_id', ondelete='CASCADE'), nullable=False),
+      Column('discount_id', Integer, ForeignKey('discounts.discount_id', ondelete='SET NULL')),
+      Column('loyalty_points_used', Integer, CheckConstraint('loyalty_points_used >= 0'), server_default=text('0')),
+      Column('discount_amount', Numeric(10, 2), nullable=False))
+
+Table('loyalty_points_logs_archive', schema_metadata,
+      Column('log_id', Integer, primary_key=True, autoincrement=False),
+      Column('customer_id', Integer, ForeignKey('customers.customer_id', ondelete='CASCADE'), nullable=False),
+      Column('order_id', Integer, ForeignKey('orders_archive.order_id', ondelete='SET NULL')),
+      Column('points_earned', Integer),
+      Column('points_redeemed', Integer),
+      Column('created_at', DateTime),
+      Column('updated_at', DateTime))
+
+Table('review_categories', schema_metadata,
+      Column('category_id', Integer, primary_key=True, autoincrement=True),
+      Column('category_name', String(30), nullable=False))
+
+Table('feedbacks', schema_metadata,
+      Column('feedback_id', Integer, primary_key=True, autoincrement=True),
+      Column('customer_id', Integer, ForeignKey('customers.customer_id', ondelete='SET NULL')),
+      Column('order_id', Integer, ForeignKey('orders.order_id', ondelete='SET NULL')),
+      Column('item_id', Integer, ForeignKey('menu_items.item_id', ondelete='SET NULL')),
+      Column('category_id', Integer, ForeignKey('review_categories.category_id', ondelete='CASCADE'), nullable=False),
+      Column('rating', SmallInteger, CheckConstraint('rating BETWEEN 1 AND 10'), nullable=False),
+      Column('comments', Text),
+      Column('created_at', DateTime, server_default=func.current_timestamp()),
+      # order_id moves here when the order is archived
+      Column('archived_order_id', Integer, ForeignKey('orders_archive.order_id', ondelete='SET NULL')))
+
+Table('complaints', schema_metadata,
+      Column('complaint_id', Integer, primary_key=True, autoincrement=True),
+      Column('customer_id', Integer, ForeignKey('customers.customer_id', ondelete='SET NULL')),
+      Column('order_id', Integer, ForeignKey('orders.order_id', ondelete='SET NULL')),
+      Column('category_id', Integer, ForeignKey('review_categories.category_id', ondelete='CASCADE'), nullable=False),
+      Column('item_id', Integer),
+      Column('comments', Text, nullable=False),
+      Column('status', Enum('pending', 'resolved', 'in_progress', 'dismissed', name='complaint_status'),
+             server_default='pending'),
+      Column('created_at', DateTime, server_default=func.current_timestamp()),
+      Column('archived_order_id', Integer, ForeignKey('orders_archive.order_id', ondelete='SET NULL')))
+
+Table('summary_monthly_revenue', schema_metadata,
+      Column('revenue_year', Integer, nullable=False),
+      Column('revenue_month', SmallInteger, nullable=False),
+      Column('billed_orders', Integer, nullable=False, server_default=text('0')),
+      Column('total_potential_revenue', Numeric(14, 2), nullable=False, server_default=text('0.0')),
+      Column('total_collected_revenue', Numeric(14, 2), nullable=False, server_default=text('0.0')),
+      PrimaryKeyConstraint('revenue_year', 'revenue_month'))
+
+Table('summary_customer_spending', schema_metadata,
+      Column('customer_id', Integer, ForeignKey('customers.customer_id', ondelete='CASCADE'), primary_key=True,
+             autoincrement=False),
+      Column('order_count', Integer, nullable=False, server_default=text('0')),
+      Column('billed_orders', Integer, nullable=False, server_default=text('0')),
+      Column('total_spent', Numeric(14, 2), nullable=False, server_default=text('0.0')),
+      Index('idx_summary_customer_total_spent', 'total_spent'))
+
+Table('summary_order_hours', schema_metadata,
+      Column('order_hour', SmallInteger, primary_key=True, autoincrement=False),
+      Column('order_count', Integer, nullable=False, server_default=text('0')))
+
+
+def create_schema(conn):
+    """Create any missing cafe_crm tables on conn's database."""
+    schema_metadata.create_all(conn, checkfirst=True)
+
+
+def prefill_statements(path) -> list[str]:
+    """INSERT statements from the pre-filling script, with comments and the `use` line dropped."""
+    with open(path, encoding='utf-8') as script:
+        lines = [line for line in script if not line.lstrip().startswith('--')]
+    statements = [statement.strip() for statement in ''.join(lines).split(';')]
+    return [statement for statement in statements
+            if statement and not re.match(r'(?i)use\s', statement)]
@@ -0,0 +1,269 @@
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from sqlalchemy import select, or_, case, func, bindparam, literal
+from src.controller import BaseCRUD
+from src.database import engine
+from src.settings import SEARCH_INDEX_REBUILD_SECONDS, SEARCH_RESULT_LIMIT, SEARCH_INDEX_RESCAN_WINDOW
+
+customer = BaseCRUD('customers')
+
+# Ranking: exact matches first, then prefixes of a whole field, then word prefixes, then fuzzy (< 1).
+EXACT_SCORE = 4.0
+FIELD_PREFIX_SCORE = 3.0
+WORD_PREFIX_SCORE = 2.0
+FUZZY_MIN_SIMILARITY = 0.4
+
+_word_split = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text) -> str:
+    return str(text).strip().lower() if text is not None else ''
+
+
+def words(text) -> list[str]:
+    return [word for word in _word_split.split(text) if word]
+
+
+def trigrams(text) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _IndexData:
+    """One generation of the index; rebuilt off to the side and swapped in."""
+
+    def __init__(self):
+        self.customers = {}
+        self.field_keys = []      # sorted (key, customer_id): full name, mobile_no, email
+        self.word_keys = []       # sorted (word, customer_id): name words, email local-part words
+        self.vocabulary = {}      # distinct name word -> trigram count
+        self.word_trigrams = {}   # trigram -> set of distinct name words
+        self.last_id = None
+
+    def add(self, row, bulk=False):
+        customer_id = row['customer_id']
+        if not bulk and customer_id in self.customers:
+            return
+        name = normalize(row['name'])
+        email = normalize(row['email'])
+        self.customers[customer_id] = row
+
+        field_keys = {key for key in (name, normalize(row['mobile_no']), email) if key}
+        name_words = set(words(name))
+        word_keys = name_words | set(words(email.split('@')[0]))
+
+        for keys, entries in ((field_keys, self.field_keys), (word_keys, self.word_keys)):
+            for key in keys:
+                if bulk:
+                    entries.append((key, customer_id))
+                else:
+                    insort(entries, (key, customer_id))
+
+        for word in name_words:
+            if word not in self.vocabulary:
+                grams = trigrams(word)
+                self.vocabulary[word] = len(grams)
+                for gram in grams:
+                    self.word_trigrams.setdefault(gram, set()).add(word)
+
+        if self.last_id is None or customer_id > self.last_id:
+            self.last_id = customer_id
+
+    def finish_bulk(self):
+        self.field_keys.sort()
+        self.word_keys.sort()
+
+
+def _scan(entries, query, limit):
+    """Up to limit exact and limit prefix customer ids for query, via two bisects."""
+    start = bisect_left(entries, (query,))
+    exact_end = bisect_right(entries, (query, float('inf')), lo=start)
+    exact = [customer_id for _, customer_id in entries[start:min(exact_end, start + limit)]]
+
+    prefix = []
+    position = exact_end
+    while position < len(entries) and len(prefix) < limit:
+        key, customer_id = entries[position]
+        if not key.startswith(query):
+            break
+        prefix.append(customer_id)
+        position += 1
+    return exact, prefix
+
+
+class CustomerSearchIndex:
+    """In-process prefix and fuzzy index over customer name, mobile_no and email.
+
+    Prefix lookups are bisects over sorted key lists and stop after `limit` hits per rank.
+    Fuzzy lookups compare query words against the distinct name-word vocabulary by trigram
+    similarity. New customers are added incrementally (keyed on customer_id): every refresh re-reads
+    everything above the highest indexed id less rescan_window, so customers registered at another
+    till are picked up, as is a lower id that commits after a higher one. Edits and deletes are
+    picked up by a periodic full rebuild that runs in the background.
+    """
+
+    def __init__(self, rebuild_seconds=SEARCH_INDEX_REBUILD_SECONDS, rescan_window=SEARCH_INDEX_RESCAN_WINDOW):
+        self.rebuild_seconds = rebuild_seconds
+        self.rescan_window = rescan_window
+        self._data = None
+        self._built_at = None
+        self._rebuilding = False
+        self._lock = threading.RLock()
+
+    @property
+    def ready(self) -> bool:
+        return self._data is not None
+
+    def rebuild(self, conn):
+        """Load the whole customers table into a fresh index generation and swap it in.
+
+        Customers that commit while it loads are picked up by the next refresh's rescan.
+        """
+        data = _IndexData()
+        for row in customer.iter_all(conn):
+            data.add(row, bulk=True)
+        data.finish_bulk()
+
+        with self._lock:
+            self._data = data
+            self._built_at = time.monotonic()
+
+    def _rebuild_in_background(self):
+        try:
+            with engine.connect() as conn:
+                self.rebuild(conn)
+        finally:
+            self._rebuilding = False
+
+    def build_in_background(self) -> bool:
+        """Start a full rebuild on a daemon thread unless one is already running; True if it started one."""
+        with self._lock:
+            if self._rebuilding:
+                return False
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild_in_background, name='search-index', daemon=True).start()
+        return True
+
+    def refresh(self, conn):
+        """Bring the index up to date: incremental for new customers, full rebuild when it is old.
+
+        The rescan is one bounded range read on the customers primary key, so it runs on every
+        refresh rather than only after this process's own writes.
+        """
+        if self._data is None:
+            self.rebuild(conn)
+            return
+
+        if time.monotonic() - self._built_at > self.rebuild_seconds:
+            self.build_in_background()
+
+        with self._lock:
+            data = self._data
+            after = (data.last_id - self.rescan_window,) if data.last_id is not None else None
+            for row in customer.iter_all(conn, after=after):
+                data.add(row)
+
+    def _fuzzy_matches(self, data, query, limit):
+        """Customers whose name words are similar to the query words, scored by average similarity."""
+        query_words = words(query)
+        scores = {}
+        for query_word in query_words:
+            query_grams = trigrams(query_word)
+            shared_counts = {}
+            for gram in query_grams:
+                for word in data.word_trigrams.get(gram, ()):
+                    shared_counts[word] = shared_counts.get(word, 0) + 1
+
+            best = {}
+            for word, shared in shared_counts.items():
+                similarity = shared / (len(query_grams) + data.vocabulary[word] - shared)
+                if similarity >= FUZZY_MIN_SIMILARITY:
+                    for customer_id in _scan(data.word_keys, word, limit)[0]:
+                        best[customer_id] = max(similarity, best.get(customer_id, 0))
+
+            for customer_id, similarity in best.items():
+                scores[customer_id] = scores.get(customer_id, 0) + similarity / len(query_words)
+        return scores
+
+    def search(self, query, limit=SEARCH_RESULT_LIMIT) -> list[dict]:
+        """Return up to limit customers ranked by how well they match query."""
+        query = normalize(query)
+        with self._lock:
+            data = self._data
+        if not query or data is None:
+            return []
+
+        scores = {}
+        field_exact, field_prefix = _scan(data.field_keys, query, limit)
+        word_exact, word_prefix = _scan(data.word_keys, query, limit)
+        for customer_ids, score in ((field_exact, EXACT_SCORE), (word_exact, EXACT_SCORE),
+                                    (field_prefix, FIELD_PREFIX_SCORE), (word_prefix, WORD_PREFIX_SCORE)):
+            for customer_id in customer_ids:
+                scores.setdefault(customer_id, score)
+
+        if len(scores) < limit:
+            for customer_id, score in self._fuzzy_matches(data, query, limit).items():
+                scores.setdefault(customer_id, score)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [{**data.customers[customer_id], "score": round(score, 3)} for customer_id, score in ranked]
+
+
+customer_index = CustomerSearchIndex()
+
+
+def _like_escape(text) -> str:
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _like_statement():
+    c = customer.table
+    name, email = func.lower(c.c.name), func.lower(c.c.email)
+    # padded with spaces so a whole word or a word's start can be matched anywhere in the name
+    padded_name = literal(' ') + name + literal(' ')
+    query, prefix = bindparam('query'), bindparam('prefix')
+    exact = or_(name == query, c.c.mobile_no == query, email == query,
+                padded_name.like(bindparam('word'), escape='\\'))
+    field_prefix = or_(name.like(prefix, escape='\\'), c.c.mobile_no.like(prefix, escape='\\'),
+                       email.like(prefix, escape='\\'))
+    word_prefix = padded_name.like(bindparam('word_prefix'), escape='\\')
+    score = case((exact, literal(EXACT_SCORE)), (field_prefix, literal(FIELD_PREFIX_SCORE)),
+                 else_=literal(WORD_PREFIX_SCORE)).label('score')
+    return (
+        select(*c.c, score)
+        .where(or_(field_prefix, word_prefix))
+        .order_by(score.desc(), c.c.customer_id)
+        .limit(bindparam('limit'))
+    )
+
+
+def like_search(conn, query, limit=SEARCH_RESULT_LIMIT) -> list[dict]:
+    """Exact and prefix matches straight from the database, ranked like the index (no fuzzy matches)."""
+    query = normalize(query)
+    if not query:
+        return []
+    stmt = customer._cached(('search_like',), _like_statement)
+    escaped = _like_escape(query)
+    rows = conn.execute(stmt, {"query": query, "prefix": f"{escaped}%", "word": f"% {escaped} %",
+                               "word_prefix": f"% {escaped}%", "limit": limit}).mappings()
+    return [dict(row) for row in rows]
+
+
+def warm_up():
+    """Start building the index in the background, e.g. while the till shows its first prompt."""
+    if not customer_index.ready:
+        customer_index.build_in_background()
+
+
+def search_customers(conn, query, limit=SEARCH_RESULT_LIMIT) -> list[dict]:
+    """Ranked customer candidates for a partial name, mobile number or email.
+
+    Until the index has finished its first build this falls back to like_search.
+    """
+    if not customer_index.ready:
+        warm_up()
+        return like_search(conn, query, limit)
+    customer_index.refresh(conn)
+    return customer_index.search(query, limit)
@@ -0,0 +1,462 @@
+"""Headless order service: the checkout flow without prompts.
+
+Every function takes an open session (or connection) plus structured arguments and returns
+rows as dicts; nothing here reads input or prints. OrderService.checkout runs a whole
+CheckoutRequest in one transaction, and the interactive CLI in main.py is built on the same
+functions.
+
+Usage: python -m src.services [--orders 500] [--items 3] [--with-customers]  (throughput benchmark)
+"""
+import argparse
+import random
+import time
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from src.controller import BaseCRUD
+from src.database import engine
+from src.cache import reference_cache
+from src.routing import router
+from src.billing import price_order, build_bill
+from src.summaries import SummaryUpdates, record_order, record_bill
+from src.loyalty import credit_points, debit_points
+from src.discounts import DiscountEngine, discount_amount
+from src.helper_classes import OrderLine, Payment, CheckoutRequest, CheckoutResult
+from src.metrics import stage
+from src.settings import NEWBIE_LOYALTY_POINTS, POINTS_CONVERSION_RATE, WRITE_BEHIND_ENABLED, MAX_STACKED_DISCOUNTS
+from src.write_behind import PendingWrites, get_write_behind
+from src.utils import points_to_cash, tier_for_points
+from src.logger import logger, transaction_log_context, bind_log_context
+
+MIN_POINTS_TO_REDEEM = 50
+MIN_BILL_FOR_REWARDS = 10
+
+customer = BaseCRUD('customers')
+orders = BaseCRUD('orders')
+loyalty_program = BaseCRUD('loyalty_program')
+order_items = BaseCRUD('order_items')
+order_bills = BaseCRUD('order_bills')
+order_discounts = BaseCRUD('order_discounts')
+order_payments = BaseCRUD('order_payments')
+loyalty_points_logs = BaseCRUD('loyalty_points_logs')
+loyalty_tiers = BaseCRUD('loyalty_tiers')
+
+
+# Reference data
+
+def get_loyalty_tiers(session):
+    return reference_cache.get_or_load('loyalty_tiers',
+                                       lambda: loyalty_tiers.get_all(session),
+                                       depends_on=('loyalty_tiers',))
+
+
+def check_tier(session, points):
+    return tier_for_points(get_loyalty_tiers(session), points)
+
+
+def get_menu_list(session):
+    def load():
+        stmt = text(
+            '''
+            SELECT * FROM menu_items as m
+            INNER JOIN menu_categories as mc
+            ON m.category_id = mc.category_id ORDER BY m.item_id;
+            '''
+        )
+        # a listing, so it may come from the replica
+        with router.reading(session, ('menu_items', 'menu_categories')) as conn:
+            result = conn.execute(stmt).mappings().fetchall()
+
+        return [dict(row) for row in result] if result else []
+
+    return reference_cache.get_or_load('menu_list', load, depends_on=('menu_items', 'menu_categories'))
+
+
+def get_discounts(session):
+    def load():
+        stmt = text(
+            '''
+            SELECT d.discount_id, d.discount_name, dt.type_name, d.discount_value, d.min_order_value
+            FROM discounts as d
+            INNER JOIN discount_types as dt
+            ON d.type_id = dt.type_id
+            WHERE d.is_active = true;
+            '''
+        )
+        result = session.execute(stmt).mappings().fetchall()
+
+        return [dict(row) for row in result] if result else []
+
+    return reference_cache.get_or_load('active_discounts', load, depends_on=('discounts', 'discount_types'))
+
+
+def get_discount_engine(session) -> DiscountEngine:
+    """DiscountEngine over the active discounts, rebuilt whenever the discounts tables change."""
+    return reference_cache.get_or_load('discount_engine',
+                                       lambda: DiscountEngine(get_discounts(session)),
+                                       depends_on=('discounts', 'discount_types'))
+
+
+def filter_discounts(session, **filters):
+    return get_discount_engine(session).eligible(filters['total_price'])
+
+
+def best_discounts(session, total_price, customer_id=None) -> dict:
+    """The best stack of eligible discounts for total_price, plus the customer's points to redeem on top."""
+    points_balance = 0
+    if customer_id:
+        loyalty_data = loyalty_program.get_one(session, customer_id=customer_id)
+        points_balance = loyalty_data['total_points'] if loyalty_data else 0
+    return get_discount_engine(session).best(total_price, MAX_STACKED_DISCOUNTS, points_balance,
+                                             POINTS_CONVERSION_RATE, MIN_POINTS_TO_REDEEM)
+
+
+# Customers and loyalty
+
+def resolve_customer(session, **lookup) -> dict | None:
+    """Find a customer by any one column, e.g. customer_id=3 or mobile_no='98...'."""
+    return customer.get_one(session, **lookup)
+
+
+def add_points(session, loyalty_id, no_of_points):
+    """Add points to a loyalty account and move it to the matching tier, in one atomic update."""
+    if not credit_points(session, no_of_points, loyalty_id=loyalty_id):
+        logger.error("Loyalty ID %s not found", loyalty_id)
+        raise ValueError("Loyalty ID not found")
+
+    return loyalty_program.get_one(session, loyalty_id=loyalty_id)
+
+
+def register_customer(session, **data) -> dict:
+    """Create a customer with a loyalty account holding the newbie points."""
+    customer_id = customer.add(session, **data)
+    if not customer_id:
+        raise ValueError("Failed to register customer.")
+
+    customer_data = customer.get_one(session, customer_id=customer_id)
+    loyalty_program.add(session, customer_id=customer_id, total_points=NEWBIE_LOYALTY_POINTS,
+                        tier_id=check_tier(session, NEWBIE_LOYALTY_POINTS)['tier_id'])
+    return customer_data
+
+
+def get_loyalty_points(session, customer_id):
+    current_loyalty_data = loyalty_program.get_one(session, customer_id=customer_id)
+    cost_value = int(points_to_cash(current_loyalty_data['total_points'], POINTS_CONVERSION_RATE))
+    current_loyalty_data['cost_value'] = cost_value
+
+    return current_loyalty_data
+
+
+# Orders
+
+def create_order(session, customer_id=None, summary=None) -> dict:
+    """Create a new order, with or without a customer.
+
+    With a SummaryUpdates, the summary increments wait for it instead of being written here.
+    """
+    order_id = orders.add(session, customer_id=customer_id)
+    if not order_id:
+        raise ValueError("Failed to create order.")
+
+    order_data = orders.get_one(session, order_id=order_id)
+    if summary is not None:
+        summary.add_order(order_data)
+    else:
+        record_order(session, order_data)
+    return order_data
+
+
+def check_checkout_request(request: CheckoutRequest):
+    """Reject a request that can't be checked out, before anything is written."""
+    if not request.items:
+        raise ValueError("A checkout needs at least one item.")
+    repeated = sorted({discount_id for discount_id in request.discount_ids
+                       if request.discount_ids.count(discount_id) > 1})
+    if repeated:
+        raise ValueError(f"Discounts can only be applied once per order; repeated: {repeated}.")
+
+
+def merge_lines(lines) -> list[OrderLine]:
+    """Fold repeated items into one line each, keeping first-seen order."""
+    merged = {}
+    for line in lines:
+        if line.quantity <= 0:
+            raise ValueError(f"Quantity for item {line.item_id} must be positive.")
+        merged[line.item_id] = merged.get(line.item_id, 0) + line.quantity
+    return [OrderLine(item_id, quantity) for item_id, quantity in merged.items()]
+
+
+def add_items(session, order_id, lines, new_order=False) -> list[dict]:
+    """Add lines to an order; repeated items increase the existing quantity.
+
+    new_order=True skips the per-line upsert and writes every line in one batch insert.
+    """
+    rows = [{"order_id": order_id, "item_id": line.item_id, "quantity": line.quantity}
+            for line in merge_lines(lines)]
+    if new_order:
+        order_items.add_batch(session, rows)
+    else:
+        for row in rows:
+            order_items.add_or_increment(session, **row)
+    return rows
+
+
+def complete_order(session, order_id) -> dict:
+    """Mark the order completed before it is billed."""
+    return orders.update(session, 'order_id', order_id, order_status='completed')
+
+
+def redeem_points(session, order, points_to_claim, pending=None) -> dict:
+    """Spend a customer's loyalty points as a discount on order; returns the order_discounts row.
+
+    With a PendingWrites, the points log row is deferred to the write-behind queue.
+    """
+    if not order['customer_id']:
+        raise ValueError("Loyalty points can only be used on a customer's order.")
+
+    if points_to_claim <= MIN_POINTS_TO_REDEEM:
+        raise ValueError(f"You must claim more than {MIN_POINTS_TO_REDEEM} points.")
+
+    # the balance check is part of the update, so two tills can't both spend the same points.
+    if not debit_points(session, points_to_claim, customer_id=order['customer_id']):
+        current_loyalty_data = loyalty_program.get_one(session, customer_id=order['customer_id'])
+        raise ValueError(f"Insufficient points. You only have {current_loyalty_data['total_points']}.")
+
+    cost_value = int(points_to_cash(points_to_claim, POINTS_CONVERSION_RATE))
+    discount = {"order_id": order['order_id'], "loyalty_points_used": points_to_claim, "discount_amount": cost_value}
+    order_discounts.add(session, **discount)
+    log_row = {"customer_id": order['customer_id'], "order_id": order['order_id'], "points_redeemed": points_to_claim}
+    if pending is not None:
+        pending.add('loyalty_points_logs', **log_row)
+    else:
+        loyalty_points_logs.add(session, **log_row)
+    return discount
+
+
+def apply_order_discount(session, order, total_price, discount_id, amount=None) -> dict:
+    """Apply one active, eligible discount to order; returns the order_discounts row.
+
+    amount records less than the discount's full amount (e.g. the last of a DiscountEngine.best
+    stack, trimmed to what is left of the total); it is never more.
+    """
+    if not order['customer_id']:
+        raise ValueError("Discounts can only be applied to a customer's order.")
+
+    selected_discount = get_discount_engine(session).get_eligible(discount_id, total_price)
+    if not selected_discount:
+        raise ValueError(f"Discount {discount_id} is not available for this order.")
+
+    full_amount = discount_amount(total_price, selected_discount)
+    discount = {"order_id": order['order_id'], "discount_id": discount_id,
+                "discount_amount": full_amount if amount is None else min(amount, full_amount)}
+    order_discounts.add(session, **discount)
+    return discount
+
+
+def write_bill(session, order, pricing, applied_discounts=None, summary=None) -> dict:
+    """Write the order's bill once every discount is known.
+
+    applied_discounts are the order_discounts rows added for this order; when omitted they are read back.
+    With a SummaryUpdates, the summary increments wait for it instead of being written here.
+    """
+    if applied_discounts is None:
+        applied_discounts = order_discounts.get_all(session, order_id=order['order_id'])
+    total_discount_applied = sum(discount['discount_amount'] for discount in applied_discounts)
+
+    # a stack of discounts never takes the bill below zero
+    bill = build_bill(pricing, min(total_discount_applied, pricing['total_price']))
+    order_bills.add(session, **bill)
+    if summary is not None:
+        summary.add_bill(order, bill)
+    else:
+        record_bill(session, order, bill)
+    return {**bill, "payment_status": 'pending'}
+
+
+def payment_status_for(amount_paid, final_price) -> str:
+    if amount_paid < 0:
+        raise ValueError("Amount paid cannot be negative.")
+    if amount_paid > final_price:
+        raise ValueError(f"Overpayment not allowed! Maximum allowed: {final_price}, but received: {amount_paid}.")
+
+    if 0 < amount_paid < final_price:
+        return 'partially_paid'
+    if amount_paid == final_price:
+        return 'paid'
+    return 'pending'
+
+
+def pay_order(session, order_id, amount_paid, payment_type='cash', bill=None) -> dict:
+    """Record a payment against the order's bill; returns the order_payments row with the new status."""
+    if bill is None:
+        bill = order_bills.get_one(session, order_id=order_id)
+    payment_status = payment_status_for(int(amount_paid), int(bill['final_price']))
+
+    order_bills.update(session, 'order_id', order_id, return_row=False, payment_status=payment_status)
+    payment = {"order_id": order_id, "payment_type": payment_type, "amount_paid": amount_paid}
+    payment_id = order_payments.add(session, **payment)
+    return {"payment_id": payment_id, **payment, "payment_status": payment_status}
+
+
+def get_reward_points(purchase_amount, earn_rate):
+    return int(purchase_amount * earn_rate)
+
+
+def award_points(session, order, bill=None, pending=None) -> int:
+    """Credit loyalty points for a paid order; returns the points earned (0 when not eligible).
+
+    With a PendingWrites, the points log row is deferred to the write-behind queue.
+    """
+    if not order['customer_id']:
+        return 0
+    if bill is None:
+        bill = order_bills.get_one(session, order_id=order['order_id'])
+
+    total_price = int(bill['total_price'])
+    if bill['payment_status'] != 'paid' or total_price <= MIN_BILL_FOR_REWARDS:
+        return 0
+
+    points_earned = get_reward_points(total_price, POINTS_CONVERSION_RATE)
+    credit_points(session, points_earned, customer_id=order['customer_id'])
+
+    # updates the order's log row, or adds one if there is none.
+    log_row = {"customer_id": order['customer_id'], "order_id": order['order_id'], "points_earned": points_earned}
+    if pending is not None:
+        pending.merge('loyalty_points_logs', ['order_id'], **log_row)
+        log_message = "Deferred"
+    else:
+        log_message = loyalty_points_logs.upsert(session, ['order_id'], **log_row)['message']
+    logger.info("Customer %s earned %s points for order %s: %s", order['customer_id'], points_earned,
+                order['order_id'], log_message)
+    return points_earned
+
+
+class OrderService:
+    """Runs whole checkouts from CheckoutRequests, each in a single transaction on one connection.
+
+    The summary increments follow in a short transaction of their own once the checkout has committed.
+    """
+
+    def __init__(self, bind=engine, write_behind=None):
+        self.bind = bind
+        # loyalty log rows go through this WriteBehindQueue after commit (default: when WRITE_BEHIND_ENABLED)
+        self.write_behind = write_behind or (get_write_behind() if WRITE_BEHIND_ENABLED else None)
+
+    def checkout(self, request: CheckoutRequest, session=None) -> CheckoutResult:
+        """Run request end to end and commit; any error rolls the whole checkout back and is re-raised.
+
+        Pass an open session to reuse its connection across many checkouts (e.g. a batch job).
+        """
+        if session is not None:
+            return self._checkout_and_commit(session, request)
+
+        with self.bind.connect() as connection, Session(bind=connection) as session:
+            return self._checkout_and_commit(session, request)
+
+    def _checkout_and_commit(self, session, request):
+        pending = PendingWrites() if self.write_behind else None
+        summary = SummaryUpdates()
+        try:
+            with stage('service_checkout'), transaction_log_context():
+                result = self._checkout(session, request, pending, summary)
+                session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        summary.apply(session)
+        if pending:
+            self.write_behind.submit(pending)
+        return result
+
+    def _checkout(self, session, request, pending=None, summary=None):
+        check_checkout_request(request)
+
+        if request.customer_id is not None:
+            customer_data = resolve_customer(session, customer_id=request.customer_id)
+            if not customer_data:
+                raise ValueError(f"Customer {request.customer_id} doesn't exist.")
+        elif request.new_customer:
+            customer_data = register_customer(session, **request.new_customer)
+        else:
+            customer_data = None
+
+        order = create_order(session, customer_data['customer_id'] if customer_data else None, summary)
+        bind_log_context(order_id=order['order_id'])
+        items = add_items(session, order['order_id'], request.items, new_order=True)
+
+        order = complete_order(session, order['order_id'])
+        pricing = price_order(session, order['order_id'])
+
+        discount_ids, points_to_redeem = request.discount_ids, request.points_to_redeem
+        amounts = {}
+        # discounts and points only apply to a customer's order
+        if request.apply_best_offer and order['customer_id']:
+            best = best_discounts(session, pricing['total_price'], order['customer_id'])
+            discount_ids = [discount['discount_id'] for discount in best['discounts']]
+            amounts = {discount['discount_id']: discount['discount_amount'] for discount in best['discounts']}
+            points_to_redeem = best['points_to_redeem']
+
+        applied_discounts = []
+        if points_to_redeem:
+            applied_discounts.append(redeem_points(session, order, points_to_redeem, pending))
+        for discount_id in discount_ids:
+            applied_discounts.append(apply_order_discount(session, order, pricing['total_price'], discount_id,
+                                                          amounts.get(discount_id)))
+        bill = write_bill(session, order, pricing, applied_discounts, summary)
+
+        payment_request = request.payment or Payment(amount_paid=bill['final_price'])
+        payment = pay_order(session, order['order_id'], payment_request.amount_paid,
+                            payment_request.payment_type, bill=bill)
+        bill['payment_status'] = payment['payment_status']
+
+        points_earned = award_points(session, order, bill, pending)
+        return CheckoutResult(customer=customer_data, order=order, items=items, bill=bill,
+                              payments=[payment], points_earned=points_earned)
+
+
+def run_benchmark(order_count, items_per_order, with_customers=False) -> dict:
+    """Push order_count random checkouts through OrderService on one connection; returns throughput."""
+    service = OrderService()
+    with engine.connect() as connection, Session(bind=connection) as session:
+        menu = [item['item_id'] for item in get_menu_list(session)]
+        customer_ids = [row['customer_id'] for row in customer.iter_all(session, limit=1000)] if with_customers else []
+        session.commit()
+        if not menu:
+            raise ValueError("The menu is empty; nothing to order.")
+
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(order_count):
+            request = CheckoutRequest(
+                items=[OrderLine(item_id, random.randint(1, 3))
+                       for item_id in random.sample(menu, min(items_per_order, len(menu)))],
+                customer_id=random.choice(customer_ids) if customer_ids else None,
+            )
+            checkout_started = time.perf_counter()
+            service.checkout(request, session=session)
+            latencies.append(time.perf_counter() - checkout_started)
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "orders": order_count,
+        "seconds": round(elapsed, 3),
+        "orders_per_second": round(order_count / elapsed, 1),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure headless checkout throughput.")
+    parser.add_argument('--orders', type=int, default=500)
+    parser.add_argument('--items', type=int, default=3, help="distinct menu items per order")
+    parser.add_argument('--with-customers', action='store_true', help="attach existing customers to the orders")
+    args = parser.parse_args(argv)
+
+    stats = run_benchmark(args.orders, args.items, args.with_customers)
+    print(f"{stats['orders']} orders in {stats['seconds']}s: {stats['orders_per_second']} orders/s "
+          f"(p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms)")
+
+
+if __name__ == '__main__':
+    main()
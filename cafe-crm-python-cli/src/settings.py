@@ -1,2 +1,107 @@
+import os
+
+
+def _find_dotenv(directory=os.path.dirname(os.path.abspath(__file__))):
+    """The .env load_dotenv() would pick up: the nearest one in this package's directory or above it."""
+    while True:
+        candidate = os.path.join(directory, '.env')
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+# python-dotenv takes ~35 ms to import, so it is only loaded when there is a .env file to read
+_dotenv_path = _find_dotenv()
+if _dotenv_path:
+    from dotenv import load_dotenv
+
+    load_dotenv(_dotenv_path)
+
 NEWBIE_LOYALTY_POINTS = 30
-POINTS_CONVERSION_RATE = 0.1
\ No newline at end of file
+POINTS_CONVERSION_RATE = 0.1
+
+# Customers shown per page in the customer picker
+CUSTOMER_PAGE_SIZE = int(os.getenv('CUSTOMER_PAGE_SIZE', 20))
+
+# Reference data (menu, discounts, tiers, review categories) cache
+REFERENCE_CACHE_TTL = float(os.getenv('REFERENCE_CACHE_TTL', 300))
+REFERENCE_CACHE_MAXSIZE = int(os.getenv('REFERENCE_CACHE_MAXSIZE', 256))
+
+# Customer search index
+SEARCH_INDEX_REBUILD_SECONDS = float(os.getenv('SEARCH_INDEX_REBUILD_SECONDS', 600))
+SEARCH_RESULT_LIMIT = int(os.getenv('SEARCH_RESULT_LIMIT', 10))
+# an incremental refresh re-reads this many ids below the highest indexed one, for inserts that committed out of order
+SEARCH_INDEX_RESCAN_WINDOW = int(os.getenv('SEARCH_INDEX_RESCAN_WINDOW', 200))
+
+# Latency metrics: per-statement, per-checkout-stage and pool-wait histograms
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '1') not in ('0', 'false', 'False')
+METRICS_MAX_SAMPLES = int(os.getenv('METRICS_MAX_SAMPLES', 10000))
+# statements slower than this are logged with their EXPLAIN plan; 0 disables the slow-query log
+METRICS_SLOW_QUERY_MS = float(os.getenv('METRICS_SLOW_QUERY_MS', 0))
+# when set, histograms are written here as JSON on exit (and on SIGUSR1)
+METRICS_DUMP_PATH = os.getenv('METRICS_DUMP_PATH')
+
+# Connection pool (QueuePool); every till holds one connection per checkout
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30))
+# MySQL drops idle connections after wait_timeout (8h by default); recycle well before that
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', '1') not in ('0', 'false', 'False')
+
+# Read replica for listings and reports; unset sends everything to DB_URL
+DB_REPLICA_URL = os.getenv('DB_REPLICA_URL')
+# reads fall back to the primary while the replica is further behind than this (or unreachable)
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', 5))
+# how long after this process writes a table its reads stay on the primary (read-your-writes)
+REPLICA_READ_YOUR_WRITES_SECONDS = float(os.getenv('REPLICA_READ_YOUR_WRITES_SECONDS', 5))
+# how often the replica's lag is measured
+REPLICA_LAG_CHECK_SECONDS = float(os.getenv('REPLICA_LAG_CHECK_SECONDS', 1))
+
+# asyncio engine for AsyncBaseCRUD; derived from DB_URL (aiomysql / aiosqlite / asyncpg) when unset
+ASYNC_DB_URL = os.getenv('ASYNC_DB_URL')
+
+# Write-behind queue for feedbacks, complaints and loyalty point logs (written after the checkout commits)
+WRITE_BEHIND_ENABLED = os.getenv('WRITE_BEHIND_ENABLED', '0') not in ('0', 'false', 'False')
+WRITE_BEHIND_QUEUE_SIZE = int(os.getenv('WRITE_BEHIND_QUEUE_SIZE', 10000))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', 500))
+WRITE_BEHIND_FLUSH_SECONDS = float(os.getenv('WRITE_BEHIND_FLUSH_SECONDS', 1.0))
+# rows that can't be queued or written are appended here and replayed later
+WRITE_BEHIND_SPILL_PATH = os.getenv('WRITE_BEHIND_SPILL_PATH')
+# rows the database rejected even when written alone are kept here, with the error, for someone to look at
+WRITE_BEHIND_QUARANTINE_PATH = os.getenv('WRITE_BEHIND_QUARANTINE_PATH')
+
+# Logging: records are queued and written by a background thread to a rotating file
+LOG_PATH = os.getenv('LOG_PATH')
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# 'text' (the classic "time - level - message" lines) or 'json' (one object per line, with checkout ids)
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', 5))
+# rotate on time instead of size, e.g. 'midnight' or 'H' (see TimedRotatingFileHandler)
+LOG_ROTATE_WHEN = os.getenv('LOG_ROTATE_WHEN')
+
+# Skip table rendering and screen clears in the CLI (same as --quiet)
+CLI_QUIET = os.getenv('CLI_QUIET', '0') not in ('0', 'false', 'False')
+
+# Budget for `python -m src.startup`: median import time of the CLI entry point
+STARTUP_BUDGET_MS = float(os.getenv('STARTUP_BUDGET_MS', 100))
+
+# Most discounts the best-combination suggestion stacks on one order (loyalty points come on top)
+MAX_STACKED_DISCOUNTS = int(os.getenv('MAX_STACKED_DISCOUNTS', 1))
+
+# Archival of completed, fully paid orders into the *_archive tables (python -m src.archive)
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 90))
+# orders moved per transaction; keeps each chunk's locks short
+ARCHIVE_CHUNK_SIZE = int(os.getenv('ARCHIVE_CHUNK_SIZE', 1000))
+
+# Reports (python -m src.reports): the Get* procedures, run concurrently with cached results
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', 4))
+# a report still running after this long is cancelled on the database and reported as timed out
+REPORT_TIMEOUT_SECONDS = float(os.getenv('REPORT_TIMEOUT_SECONDS', 30))
+# results are also dropped as soon as this process writes a table the report reads
+REPORT_CACHE_TTL = float(os.getenv('REPORT_CACHE_TTL', 300))
+REPORT_CACHE_MAXSIZE = int(os.getenv('REPORT_CACHE_MAXSIZE', 128))
@@ -0,0 +1,307 @@
+"""Columnar snapshot export of order history for offline analytics.
+
+Each exported table becomes a directory of flat, native-endian binary column files
+(<column>.bin, plus <column>.null for nullable columns) described by manifest.json,
+so they can be memory-mapped with numpy.memmap or mmap + memoryview.cast.
+
+Rows are only appended, so an order is exported once it can no longer change: cancelled, or
+completed with its bill paid (orders still open after the overlap window are exported as they
+stand). Ids are handed out when a row is inserted but become visible when it commits, so each key
+keeps a floor below which everything has been exported; rows above it are re-scanned on every run
+and the keys already exported are skipped.
+
+Usage: python -m src.snapshot <output_dir> [--batch-size 10000] [--overlap-hours 24]
+"""
+import argparse
+import json
+import mmap
+import os
+import sys
+import time
+from array import array
+from datetime import datetime, timedelta
+from sqlalchemy import (select, func, or_, and_, bindparam, Boolean, Date, DateTime, Enum, Float, Integer, Numeric,
+                        String, Text)
+from src.controller import BaseCRUD
+from src.routing import router, REPORT
+from src.logger import logger
+
+SNAPSHOT_BATCH_SIZE = 10000
+# rows newer than this are re-checked on the next run; longer than any transaction stays open
+SNAPSHOT_OVERLAP_HOURS = 24
+MANIFEST_NAME = 'manifest.json'
+
+# key column -> (table holding the key, tables exported for the same keys). Order tables follow orders.
+SNAPSHOT_KEYS = {
+    'order_id': ('orders', ('orders', 'order_items', 'order_bills', 'order_discounts')),
+    'log_id': ('loyalty_points_logs', ('loyalty_points_logs',)),
+}
+SNAPSHOT_TABLES = tuple(table_name for _, table_names in SNAPSHOT_KEYS.values() for table_name in table_names)
+
+orders = BaseCRUD('orders')
+order_bills = BaseCRUD('order_bills')
+loyalty_points_logs = BaseCRUD('loyalty_points_logs')
+
+
+def column_encoding(col) -> tuple[str, str]:
+    """Map a SQL column to (array typecode, encoding) for its column file."""
+    col_type = col.type
+    if isinstance(col_type, (Enum, String, Text)):
+        return 'i', 'dictionary'
+    if isinstance(col_type, Boolean):
+        return 'B', 'plain'
+    if isinstance(col_type, (DateTime, Date)):
+        return 'q', 'epoch_seconds'
+    if isinstance(col_type, (Numeric, Float)):
+        return 'd', 'float'
+    if isinstance(col_type, Integer):
+        return 'q', 'plain'
+    return 'i', 'dictionary'
+
+
+def _encode(value, encoding, dictionary, dictionary_index):
+    if value is None:
+        return 0
+    match encoding:
+        case 'dictionary':
+            key = str(value)
+            code = dictionary_index.get(key)
+            if code is None:
+                code = dictionary_index[key] = len(dictionary)
+                dictionary.append(key)
+            return code
+        case 'epoch_seconds':
+            if not isinstance(value, datetime):
+                value = datetime(value.year, value.month, value.day)
+            return int(value.timestamp())
+        case 'float':
+            return float(value)
+        case _:
+            return int(value)
+
+
+class ColumnWriter:
+    """Buffers one column in an array and appends it to its file on flush."""
+
+    def __init__(self, table_dir, col, spec, committed_rows):
+        self.name = col.name
+        self.nullable = col.nullable
+        self.typecode = spec['typecode']
+        self.encoding = spec['encoding']
+        self.dictionary = spec.setdefault('dictionary', []) if self.encoding == 'dictionary' else None
+        self.dictionary_index = {key: code for code, key in enumerate(self.dictionary or [])}
+        self.path = os.path.join(table_dir, f"{col.name}.bin")
+        self.null_path = os.path.join(table_dir, f"{col.name}.null")
+        self.values = array(self.typecode)
+        self.nulls = array('B')
+        self._discard_uncommitted(committed_rows)
+
+    def _discard_uncommitted(self, committed_rows):
+        """Cut off rows appended by an export that died before its manifest was saved."""
+        for path, itemsize in ((self.path, self.values.itemsize), (self.null_path, 1)):
+            if os.path.exists(path) and os.path.getsize(path) > committed_rows * itemsize:
+                os.truncate(path, committed_rows * itemsize)
+
+    def append(self, value):
+        self.values.append(_encode(value, self.encoding, self.dictionary, self.dictionary_index))
+        if self.nullable:
+            self.nulls.append(value is None)
+
+    def flush(self):
+        with open(self.path, 'ab') as column_file:
+            self.values.tofile(column_file)
+        if self.nullable:
+            with open(self.null_path, 'ab') as null_file:
+                self.nulls.tofile(null_file)
+        self.values = array(self.typecode)
+        self.nulls = array('B')
+
+
+def load_manifest(output_dir) -> dict:
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"byteorder": sys.byteorder, "tables": {}}
+    with open(path, encoding='utf-8') as manifest_file:
+        return json.load(manifest_file)
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(tmp_path, path)
+
+
+def export_table(conn, output_dir, manifest, crud, key_column, keys, batch_size):
+    """Append the rows whose key_column is in keys (sorted) to the table's column files."""
+    table = crud.table
+    table_dir = os.path.join(output_dir, table.name)
+    os.makedirs(table_dir, exist_ok=True)
+
+    table_manifest = manifest['tables'].setdefault(table.name, {"rows": 0, "columns": {}})
+    writers = []
+    for col in table.columns:
+        typecode, encoding = column_encoding(col)
+        spec = table_manifest['columns'].setdefault(
+            col.name, {"typecode": typecode, "encoding": encoding, "nullable": bool(col.nullable)}
+        )
+        writers.append(ColumnWriter(table_dir, col, spec, table_manifest['rows']))
+
+    stmt = (
+        select(table)
+        .where(table.c[key_column].in_(bindparam('keys', expanding=True)))
+        .order_by(*table.primary_key.columns)
+    )
+
+    exported = 0
+    for start in range(0, len(keys), batch_size):
+        partition = conn.execute(stmt, {"keys": keys[start:start + batch_size]}).fetchall()
+        for row in partition:
+            for writer, value in zip(writers, row):
+                writer.append(value)
+        for writer in writers:
+            writer.flush()
+        exported += len(partition)
+
+    table_manifest['rows'] += exported
+    return exported
+
+
+def exported_keys(output_dir, manifest, table_name, key_column, floor) -> set:
+    """Keys above floor already in the table's key column file (only its committed rows)."""
+    table_manifest = manifest['tables'].get(table_name)
+    if not table_manifest or not table_manifest['rows']:
+        return set()
+    values = array(table_manifest['columns'][key_column]['typecode'])
+    with open(os.path.join(output_dir, table_name, f"{key_column}.bin"), 'rb') as column_file:
+        values.fromfile(column_file, table_manifest['rows'])
+    return {value for value in values if floor is None or value > floor}
+
+
+def _settled_order_keys(conn, floor, cutoff) -> list:
+    """order_ids above floor that won't change any more, or are older than cutoff."""
+    o, ob = orders.table, order_bills.table
+    settled = or_(o.c.order_status == 'cancelled',
+                  and_(o.c.order_status == 'completed', ob.c.payment_status == 'paid'))
+    stmt = (
+        select(o.c.order_id)
+        .select_from(o.outerjoin(ob, o.c.order_id == ob.c.order_id))
+        .where(or_(settled, o.c.created_at < cutoff))
+    )
+    if floor is not None:
+        stmt = stmt.where(o.c.order_id > floor)
+    return conn.execute(stmt).scalars().all()
+
+
+def _log_keys(conn, floor, cutoff) -> list:
+    """log_ids above floor; points logs are never updated, so every committed one can go.
+
+    cutoff only matters for rows that can still change, so it is accepted for CANDIDATE_KEYS and ignored.
+    """
+    lpl = loyalty_points_logs.table
+    stmt = select(lpl.c.log_id)
+    if floor is not None:
+        stmt = stmt.where(lpl.c.log_id > floor)
+    return conn.execute(stmt).scalars().all()
+
+
+def _next_floor(conn, crud, key_column, floor, cutoff):
+    """The highest key such that every row at or below it was created before cutoff (and so exported)."""
+    table = crud.table
+    key = table.c[key_column]
+    recent = select(func.min(key)).where(table.c.created_at >= cutoff)
+    if floor is not None:
+        recent = recent.where(key > floor)
+    first_recent = conn.execute(recent).scalar()
+    if first_recent is not None:
+        return max(first_recent - 1, floor) if floor is not None else first_recent - 1
+    highest = conn.execute(select(func.max(key))).scalar()
+    return highest if highest is not None else floor
+
+
+# key column -> fn(conn, floor, cutoff) listing the keys that are ready to export.
+CANDIDATE_KEYS = {'order_id': _settled_order_keys, 'log_id': _log_keys}
+
+
+def export_snapshot(output_dir, batch_size=SNAPSHOT_BATCH_SIZE, overlap_hours=SNAPSHOT_OVERLAP_HOURS) -> dict:
+    """Export new order history since the last run into output_dir; returns rows exported per table."""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    exported = {}
+    started = time.perf_counter()
+
+    # manifests from before floors were kept re-check every key (duplicates are still skipped)
+    floors = manifest.setdefault('floors', {})
+
+    with router.connect(REPORT, tables=SNAPSHOT_TABLES) as conn:
+        # the database's clock, since created_at is set by it
+        cutoff = conn.execute(select(func.current_timestamp())).scalar() - timedelta(hours=overlap_hours)
+
+        for key_column, (key_table, table_names) in SNAPSHOT_KEYS.items():
+            floor = floors.get(key_column)
+            done = exported_keys(output_dir, manifest, key_table, key_column, floor)
+            keys = sorted(key for key in CANDIDATE_KEYS[key_column](conn, floor, cutoff) if key not in done)
+
+            for table_name in table_names:
+                exported[table_name] = export_table(conn, output_dir, manifest, BaseCRUD(table_name),
+                                                    key_column, keys, batch_size) if keys else 0
+            floors[key_column] = _next_floor(conn, BaseCRUD(key_table), key_column, floor, cutoff)
+
+    manifest['exported_at'] = datetime.now().isoformat(timespec='seconds')
+    save_manifest(output_dir, manifest)
+    logger.info("Snapshot exported to %s in %.2fs: %s", output_dir, time.perf_counter() - started, exported)
+    return exported
+
+
+def load_column(output_dir, table_name, column_name, decode=False):
+    """Memory-map one exported column; returns (values, nulls) as numpy arrays when available.
+
+    Without numpy the values are memoryviews over the mapped file. decode=True turns dictionary
+    codes back into strings (materialized as a list).
+    """
+    manifest = load_manifest(output_dir)
+    spec = manifest['tables'][table_name]['columns'][column_name]
+    table_dir = os.path.join(output_dir, table_name)
+
+    values = _map_file(os.path.join(table_dir, f"{column_name}.bin"), spec['typecode'])
+    nulls = _map_file(os.path.join(table_dir, f"{column_name}.null"), 'B') if spec['nullable'] else None
+
+    if decode and spec['encoding'] == 'dictionary':
+        dictionary = spec['dictionary']
+        values = [None if nulls is not None and nulls[i] else dictionary[code] for i, code in enumerate(values)]
+    return values, nulls
+
+
+def _map_file(path, typecode):
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+
+    if numpy is not None:
+        if os.path.getsize(path) == 0:
+            return numpy.empty(0, dtype=typecode)
+        return numpy.memmap(path, dtype=numpy.dtype(typecode), mode='r')
+
+    if os.path.getsize(path) == 0:
+        return memoryview(array(typecode))
+    with open(path, 'rb') as column_file:
+        return memoryview(mmap.mmap(column_file.fileno(), 0, access=mmap.ACCESS_READ)).cast(typecode)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export order history into a columnar snapshot.")
+    parser.add_argument('output_dir')
+    parser.add_argument('--batch-size', type=int, default=SNAPSHOT_BATCH_SIZE)
+    parser.add_argument('--overlap-hours', type=float, default=SNAPSHOT_OVERLAP_HOURS,
+                        help="how long an unfinished order may wait before it is exported as it stands")
+    args = parser.parse_args(argv)
+
+    exported = export_snapshot(args.output_dir, args.batch_size, args.overlap_hours)
+    for table_name, rows in exported.items():
+        print(f"{table_name}: {rows} rows")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Startup-time check for the CLI entry point, from `python -X importtime`.
+
+Imports the module in a fresh interpreter a few times and takes the median cumulative import
+time. Exits non-zero when that exceeds the budget or when a module that should stay lazy (e.g.
+SQLAlchemy, which loads only once a checkout starts) was imported at startup, so it can gate CI.
+
+Usage: python -m src.startup [--module src.main] [--budget-ms 100] [--runs 5] [--top 10]
+                             [--forbid sqlalchemy ...]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from src.settings import STARTUP_BUDGET_MS
+
+# Loaded on first use by the till; importing any of these at startup is a regression.
+LAZY_MODULES = ('sqlalchemy', 'src.controller', 'src.database', 'src.services')
+
+
+def parse_importtime(output) -> list[dict]:
+    """Rows of `-X importtime` stderr as {module, self_us, cumulative_us, depth}."""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append({
+            "module": name.strip(),
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+        })
+    return rows
+
+
+def measure(module, runs=5) -> list[list[dict]]:
+    """Import module `runs` times, each in a fresh interpreter; returns the parsed rows per run."""
+    measured = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                capture_output=True, text=True, stdin=subprocess.DEVNULL)
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+        measured.append(parse_importtime(result.stderr))
+    return measured
+
+
+def check(module='src.main', budget_ms=STARTUP_BUDGET_MS, runs=5, forbidden=LAZY_MODULES) -> dict:
+    """Median import time of module against budget_ms, plus any forbidden modules it loaded."""
+    measured = measure(module, runs)
+    totals = [next(row['cumulative_us'] for row in rows if row['module'] == module) for rows in measured]
+    median_ms = statistics.median(totals) / 1000
+
+    imported = {row['module'] for row in measured[0]}
+    loaded_lazy = sorted(name for name in forbidden
+                         if name in imported or any(other.startswith(name + '.') for other in imported))
+    median_run = measured[totals.index(sorted(totals)[len(totals) // 2])]
+    return {
+        "module": module,
+        "median_ms": round(median_ms, 1),
+        "budget_ms": budget_ms,
+        "runs_ms": [round(total / 1000, 1) for total in totals],
+        "loaded_lazy_modules": loaded_lazy,
+        "slowest": sorted(median_run, key=lambda row: row['self_us'], reverse=True),
+        "ok": median_ms <= budget_ms and not loaded_lazy,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail if CLI startup import time regresses.")
+    parser.add_argument('--module', default='src.main')
+    parser.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help="slowest imports to list (by self time)")
+    parser.add_argument('--forbid', nargs='*', default=list(LAZY_MODULES),
+                        help="modules that must not be imported at startup")
+    args = parser.parse_args(argv)
+
+    result = check(args.module, args.budget_ms, args.runs, args.forbid)
+    print(f"import {result['module']}: median {result['median_ms']} ms over {args.runs} runs "
+          f"{result['runs_ms']} (budget {result['budget_ms']} ms)")
+    for row in result['slowest'][:args.top]:
+        print(f"  {row['self_us'] / 1000:8.1f} ms self {row['cumulative_us'] / 1000:8.1f} ms total  {row['module']}")
+    if result['loaded_lazy_modules']:
+        print(f"Loaded at startup but should be lazy: {', '.join(result['loaded_lazy_modules'])}")
+    if not result['ok']:
+        print("Startup budget exceeded.")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""Incrementally maintained reporting summaries.
+
+The summary_* tables hold per-month revenue, per-customer spend/order counts and per-hour order
+counts. Checkouts collect their increments in a SummaryUpdates and apply them right after they
+commit, in a short transaction of their own, so the shared summary rows are never locked for a
+whole checkout. The dashboard accessors below read a handful of rows instead of re-scanning orders
+and order_bills like the Get* procedures. An increment lost to a failure after the commit is put
+right by the next --rebuild.
+
+Usage: python -m src.summaries [--rebuild]
+"""
+import argparse
+from sqlalchemy import select, insert, func, extract, desc
+from src.controller import BaseCRUD
+from src.database import engine
+from src.routing import router, REPORT
+from src.archive import union_table
+from src.logger import logger
+from src.metrics import registry
+from src.utils import render_as_table
+
+monthly_revenue = BaseCRUD('summary_monthly_revenue')
+customer_spending = BaseCRUD('summary_customer_spending')
+order_hours = BaseCRUD('summary_order_hours')
+customers = BaseCRUD('customers')
+orders = BaseCRUD('orders')
+order_bills = BaseCRUD('order_bills')
+
+
+def record_order(conn, order):
+    """Count a newly created order towards the peak-hours and per-customer order counts."""
+    order_hours.add_or_increment(conn, increment_columns=('order_count',),
+                                 order_hour=order['created_at'].hour, order_count=1)
+    if order['customer_id']:
+        customer_spending.add_or_increment(conn, increment_columns=('order_count', 'billed_orders', 'total_spent'),
+                                           customer_id=order['customer_id'], order_count=1,
+                                           billed_orders=0, total_spent=0)
+
+
+def record_bill(conn, order, bill):
+    """Add a newly written bill to the monthly revenue and the customer's spend."""
+    created_at = order['created_at']
+    monthly_revenue.add_or_increment(conn,
+                                     increment_columns=('billed_orders', 'total_potential_revenue',
+                                                        'total_collected_revenue'),
+                                     revenue_year=created_at.year, revenue_month=created_at.month,
+                                     billed_orders=1,
+                                     total_potential_revenue=bill['total_price'],
+                                     total_collected_revenue=bill['final_price'])
+    if order['customer_id']:
+        customer_spending.add_or_increment(conn, increment_columns=('order_count', 'billed_orders', 'total_spent'),
+                                           customer_id=order['customer_id'], order_count=0,
+                                           billed_orders=1, total_spent=bill['total_price'])
+
+
+class SummaryUpdates:
+    """Orders and bills a checkout has written, whose summary increments wait for it to commit."""
+
+    def __init__(self):
+        self.orders = []
+        self.bills = []
+
+    def add_order(self, order):
+        self.orders.append(order)
+
+    def add_bill(self, order, bill):
+        self.bills.append((order, bill))
+
+    def write(self, conn):
+        """Apply the increments on conn, in the caller's transaction."""
+        for order in self.orders:
+            record_order(conn, order)
+        for order, bill in self.bills:
+            record_bill(conn, order, bill)
+
+    def apply(self, conn) -> bool:
+        """Apply the increments on conn (a Session or Connection) and commit them; False if that failed.
+
+        The checkout has already committed by now, so a failure is logged rather than raised.
+        """
+        if not self:
+            return True
+        try:
+            self.write(conn)
+            conn.commit()
+        except Exception as err:
+            conn.rollback()
+            logger.error("Summary update for %s orders and %s bills failed; run `python -m src.summaries "
+                         "--rebuild` to reconcile: %s", len(self.orders), len(self.bills), err)
+            registry.increment('summary_updates_failed')
+            return False
+        return True
+
+    def __len__(self):
+        return len(self.orders) + len(self.bills)
+
+
+def rebuild_summaries(conn):
+    """Recompute every summary table from orders and order_bills, archived ones included (full scan; run off-peak)."""
+    o = union_table('orders')
+    ob = union_table('order_bills')
+
+    for crud in (monthly_revenue, customer_spending, order_hours):
+        crud.delete_all(conn)
+
+    year = extract('year', o.c.created_at)
+    month = extract('month', o.c.created_at)
+    conn.execute(insert(monthly_revenue.table).from_select(
+        ['revenue_year', 'revenue_month', 'billed_orders', 'total_potential_revenue', 'total_collected_revenue'],
+        select(year, month, func.count(ob.c.order_id), func.sum(ob.c.total_price), func.sum(ob.c.final_price))
+        .select_from(o.join(ob, o.c.order_id == ob.c.order_id))
+        .group_by(year, month)
+    ))
+
+    conn.execute(insert(customer_spending.table).from_select(
+        ['customer_id', 'order_count', 'billed_orders', 'total_spent'],
+        select(o.c.customer_id, func.count(o.c.order_id), func.count(ob.c.order_id),
+               func.coalesce(func.sum(ob.c.total_price), 0))
+        .select_from(o.outerjoin(ob, o.c.order_id == ob.c.order_id))
+        .where(o.c.customer_id.is_not(None))
+        .group_by(o.c.customer_id)
+    ))
+
+    hour = extract('hour', o.c.created_at)
+    conn.execute(insert(order_hours.table).from_select(
+        ['order_hour', 'order_count'],
+        select(hour, func.count(o.c.order_id)).group_by(hour)
+    ))
+
+
+def get_monthly_revenue(conn) -> list[dict]:
+    """Summary-backed GetMonthlyRevenue: revenue per calendar month."""
+    mr = monthly_revenue.table
+    stmt = (
+        select(mr.c.revenue_month.label('month'),
+               func.sum(mr.c.total_potential_revenue).label('total_potential_revenue'),
+               func.sum(mr.c.total_collected_revenue).label('total_collected_revenue'))
+        .group_by(mr.c.revenue_month)
+        .order_by(mr.c.revenue_month)
+    )
+    return [dict(row) for row in conn.execute(stmt).mappings()]
+
+
+def get_top_spending_customers(conn, result_count=10) -> list[dict]:
+    """Summary-backed GetTopSpendingCustomers."""
+    cs = customer_spending.table
+    c = customers.table
+    stmt = (
+        select(c.c.name, cs.c.total_spent)
+        .select_from(cs.join(c, cs.c.customer_id == c.c.customer_id))
+        .where(cs.c.billed_orders > 0)
+        .order_by(desc(cs.c.total_spent))
+        .limit(result_count)
+    )
+    return [dict(row) for row in conn.execute(stmt).mappings()]
+
+
+def get_customer_average_spending(conn) -> list[dict]:
+    """Summary-backed GetCustomerAverageSpending."""
+    cs = customer_spending.table
+    c = customers.table
+    stmt = (
+        select(c.c.name, (cs.c.total_spent / cs.c.billed_orders).label('average_order_value'))
+        .select_from(cs.join(c, cs.c.customer_id == c.c.customer_id))
+        .where(cs.c.billed_orders > 0)
+    )
+    return [dict(row) for row in conn.execute(stmt).mappings()]
+
+
+def get_peak_order_hours(conn) -> list[dict]:
+    """Summary-backed GetPeakOrderHours."""
+    oh = order_hours.table
+    stmt = select(oh.c.order_hour, oh.c.order_count).order_by(desc(oh.c.order_count))
+    return [dict(row) for row in conn.execute(stmt).mappings()]
+
+
+def get_customer_order_counts(conn) -> list[dict]:
+    """Summary-backed GetCustomerOrderCounts."""
+    cs = customer_spending.table
+    c = customers.table
+    stmt = (
+        select(c.c.name, c.c.email, c.c.date_of_birth, c.c.mobile_no,
+               cs.c.order_count.label('total_no_of_orders'))
+        .select_from(cs.join(c, cs.c.customer_id == c.c.customer_id))
+        .where(cs.c.order_count > 0)
+    )
+    return [dict(row) for row in conn.execute(stmt).mappings()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show or rebuild the reporting summary tables.")
+    parser.add_argument('--rebuild', action='store_true', help="recompute the summaries from scratch first")
+    args = parser.parse_args(argv)
+
+    if args.rebuild:
+        with engine.begin() as conn:
+            rebuild_summaries(conn)
+        print("Summaries rebuilt.")
+
+    with router.connect(REPORT, tables=(monthly_revenue.table_name, customer_spending.table_name,
+                                        order_hours.table_name)) as conn:
+        render_as_table("Monthly Revenue", get_monthly_revenue(conn))
+        render_as_table("Top Spending Customers", get_top_spending_customers(conn))
+        render_as_table("Peak Order Hours", get_peak_order_hours(conn))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Concurrent till simulator for the async checkout flow.
+
+Runs N simulated tills on one event loop, each pushing its own stream of random checkouts through
+AsyncOrderService, and reports throughput and checkout latency. Point DB_URL (or ASYNC_DB_URL) at a
+scratch database: a local SQLite file works with aiosqlite installed, MySQL needs aiomysql.
+
+Usage: python -m src.till_sim [--tills 8] [--orders-per-till 50] [--items 3] [--with-customers]
+                              [--seed 7] [--create-schema]
+"""
+import argparse
+import asyncio
+import random
+import time
+from sqlalchemy.exc import OperationalError
+from src.async_controller import get_async_engine
+from src.async_services import AsyncOrderService, customer
+from src.helper_classes import OrderLine, CheckoutRequest
+from src.schema import create_schema
+from src.services import get_menu_list
+from src.logger import logger
+
+# SQLite allows one writer at a time; a till that hits "database is locked" backs off and retries.
+MAX_RETRIES = 5
+RETRY_BACKOFF_SECONDS = 0.05
+
+
+async def run_till(service, till_no, order_count, menu, customer_ids, items_per_order, rng, latencies):
+    """One till: order_count checkouts back to back; returns how many had to be retried."""
+    retries = 0
+    for _ in range(order_count):
+        request = CheckoutRequest(
+            items=[OrderLine(item_id, rng.randint(1, 3))
+                   for item_id in rng.sample(menu, min(items_per_order, len(menu)))],
+            customer_id=rng.choice(customer_ids) if customer_ids else None,
+        )
+        started = time.perf_counter()
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                await service.checkout(request)
+                break
+            except OperationalError:
+                if attempt == MAX_RETRIES:
+                    raise
+                retries += 1
+                logger.warning("Till %s: checkout retry %s after a lock timeout", till_no, attempt + 1)
+                await asyncio.sleep(RETRY_BACKOFF_SECONDS * (attempt + 1))
+        latencies.append(time.perf_counter() - started)
+    return retries
+
+
+async def simulate(till_count, orders_per_till, items_per_order=3, with_customers=False, seed=7,
+                   create_tables=False) -> dict:
+    """Run till_count tills concurrently; returns throughput and latency percentiles."""
+    engine = get_async_engine()
+    async with engine.begin() as conn:
+        if create_tables:
+            await conn.run_sync(create_schema)
+        menu = [item['item_id'] for item in await conn.run_sync(get_menu_list)]
+        customer_ids = []
+        if with_customers:
+            customer_ids = [row['customer_id'] async for row in customer.iter_all(conn, limit=1000)]
+    if not menu:
+        raise ValueError("The menu is empty; load the pre-filling script or run src.generator first.")
+
+    service = AsyncOrderService(engine)
+    latencies = []
+    started = time.perf_counter()
+    retries = await asyncio.gather(*(
+        run_till(service, till_no, orders_per_till, menu, customer_ids, items_per_order,
+                 random.Random(seed + till_no), latencies)
+        for till_no in range(till_count)
+    ))
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+
+    latencies.sort()
+    order_count = len(latencies)
+    return {
+        "tills": till_count,
+        "orders": order_count,
+        "retries": sum(retries),
+        "seconds": round(elapsed, 3),
+        "orders_per_second": round(order_count / elapsed, 1),
+        "p50_ms": round(latencies[order_count // 2] * 1000, 2),
+        "p95_ms": round(latencies[min(order_count - 1, int(order_count * 0.95))] * 1000, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run concurrent simulated tills against the async checkout flow.")
+    parser.add_argument('--tills', type=int, default=8)
+    parser.add_argument('--orders-per-till', type=int, default=50)
+    parser.add_argument('--items', type=int, default=3, help="distinct menu items per order")
+    parser.add_argument('--with-customers', action='store_true', help="attach existing customers to the orders")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--create-schema', action='store_true', help="create missing tables first (SQLite)")
+    args = parser.parse_args(argv)
+
+    stats = asyncio.run(simulate(args.tills, args.orders_per_till, args.items, args.with_customers,
+                                 args.seed, args.create_schema))
+    print(f"{stats['tills']} tills, {stats['orders']} orders in {stats['seconds']}s: "
+          f"{stats['orders_per_second']} orders/s (p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms, "
+          f"{stats['retries']} retries)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,25 @@
-from sqlalchemy import Enum
-from src.data_handler import DataHandler
-import os
-import time
-from rich.console import Console
-from rich.table import Table
+from src.settings import CLI_QUIET
+from rich.console import Console, Group
+from rich.text import Text
 
+# one console for the whole session; building a Console per table re-detects the terminal every time
 console = Console()
+_quiet = CLI_QUIET
+# title -> (source data, Table) for renderables reused while their data is unchanged
+_table_cache = {}
 
+# column type -> DataHandler prompt method; looked up in add_row, so importing utils doesn't load SQLAlchemy
 helpers_map = {
-        "VARCHAR": DataHandler.get_string,
-        "DATE": DataHandler.get_date,
-        "INTEGER": DataHandler.get_int,
-        "BOOLEAN": DataHandler.get_bool,
-        "ENUM": DataHandler.get_enum,
-        "DECIMAL": DataHandler.get_float,
-        "TIMESTAMP": DataHandler.get_timestamp,
-        "DATETIME": DataHandler.get_timestamp,
-        "TEXT": DataHandler.get_string,
-        "TINYINT": DataHandler.get_int
+        "VARCHAR": "get_string",
+        "DATE": "get_date",
+        "INTEGER": "get_int",
+        "BOOLEAN": "get_bool",
+        "ENUM": "get_enum",
+        "DECIMAL": "get_float",
+        "TIMESTAMP": "get_timestamp",
+        "DATETIME": "get_timestamp",
+        "TEXT": "get_string",
+        "TINYINT": "get_int"
 }
 
 def is_junction_table(cols):
@@ -30,17 +32,26 @@ def is_junction_table(cols):
             pk_counter += 1
     return False
 
+def set_quiet(quiet=True):
+    """Quiet mode skips all table rendering and screen clearing (scripted or piped tills)."""
+    global _quiet
+    _quiet = quiet
+
+def clear_screen():
+    """Clear the terminal with ANSI codes instead of spawning cls/clear."""
+    if not _quiet:
+        console.clear()
+
 def cls_decorator(func):
     def wrapper(*args, **kwargs):
         func(*args, **kwargs)
-        os.system('cls')
+        clear_screen()
     return wrapper
 
-def render_as_table(title, data):
-    """Renders a list of dictionaries as a formatted table using rich."""
-    if not data:
-        print("No data available to display.")
-        return
+def build_table(title, data):
+    """Build the rich Table for a list of dictionaries."""
+    # rich.table costs ~55 ms to import, so it loads with the first table rather than at startup
+    from rich.table import Table
 
     table = Table(title=title)
 
@@ -52,9 +63,28 @@ def render_as_table(title, data):
     for dt in data:
         table.add_row(*[str(value) for value in dt.values()])
 
-    # Render the table
-    console = Console()
-    console.print(table)
+    return table
+
+def cached_table(title, data, source=None):
+    """build_table, reused while `source` (default: data itself) is the same object as last time."""
+    source = data if source is None else source
+    cached = _table_cache.get(title)
+    if cached is None or cached[0] is not source:
+        cached = _table_cache[title] = (source, build_table(title, data))
+    return cached[1]
+
+def render_as_table(title, data, cache=False):
+    """Renders a list of dictionaries as a formatted table using rich.
+
+    cache=True reuses the table built for the same data object, e.g. the reference-cached menu.
+    """
+    if _quiet:
+        return
+    if not data:
+        print("No data available to display.")
+        return
+
+    console.print(cached_table(title, data) if cache else build_table(title, data))
 
 def apply_discount(total_price, discount_value, discount_type):
     try:
@@ -78,6 +108,9 @@ def apply_discount(total_price, discount_value, discount_type):
         raise err
 
 def add_row(cols, skip_columns=None):
+    from sqlalchemy import Enum
+    from src.data_handler import DataHandler
+
     if skip_columns is None:
         skip_columns = []
 
@@ -99,15 +132,23 @@ def add_row(cols, skip_columns=None):
             input_data[col.name] = DataHandler.get_enum(prompt, col.type)
         else:
             # Find the corresponding helper function in helpers_map
-            for key, func in helpers_map.items():
+            for key, helper_name in helpers_map.items():
                 if key in col_type:
-                    input_data[col.name] = func(prompt)
+                    input_data[col.name] = getattr(DataHandler, helper_name)(prompt)
                     break
             else:
                 print(f"Unsupported data type: {col.type}")
 
     return input_data
 
+def tier_for_points(tier_data, points):
+    """Pick the loyalty tier for a points balance from the loyalty_tiers rows."""
+    for tier in tier_data:
+        if points < tier['max_points']:
+           return tier
+
+    return tier_data[len(tier_data)-1]
+
 # To convert points to cash
 def points_to_cash(points, conversion_rate):
     try:
@@ -122,25 +163,30 @@ def points_to_cash(points, conversion_rate):
         raise err
 
 def display_data(customer=None, order=None, order_items=None, order_bill=None, rewards=None):
-    """Dynamically updates CLI to show transaction progress"""
-    os.system('cls' if os.name == 'nt' else 'clear')  # Clear CLI screen
+    """Redraws the transaction progress in place: one ANSI clear and one write per step.
+
+    Tables for sections whose data hasn't changed since the previous step are reused.
+    """
+    if _quiet:
+        return
 
-    print("\n========= TRANSACTION DETAILS =========")
+    renderables = [Text("\n========= TRANSACTION DETAILS =========")]
 
     if customer:
-        render_as_table("Customer Data", [customer])
+        renderables.append(cached_table("Customer Data", [customer], source=customer))
 
     if order:
-        render_as_table("Order Details", [order])
+        renderables.append(cached_table("Order Details", [order], source=order))
 
     if order_items:
-        render_as_table("Item Details", order_items)
+        renderables.append(cached_table("Item Details", order_items))
 
     if order_bill:
-        render_as_table("Order Bill", order_bill)
+        renderables.append(cached_table("Order Bill", order_bill))
 
     if rewards:
-        print(f"Rewards : {rewards}")
+        renderables.append(Text(f"Rewards : {rewards}"))
 
-    print("\n=======================================")
-    time.sleep(1)
\ No newline at end of file
+    renderables.append(Text("\n======================================="))
+    console.clear()
+    console.print(Group(*renderables))
\ No newline at end of file
@@ -0,0 +1,263 @@
+"""Write-behind queue for inserts nobody waits on: feedbacks, complaints and loyalty point logs.
+
+A checkout collects these rows in a PendingWrites while it runs and hands them to the queue once
+it has committed, so they never sit on the customer-facing path and never outlive a rolled-back
+order. A background worker drains the bounded queue and writes each table's rows with one
+BaseCRUD.add_batch per flush. When a batch fails its rows are retried one by one, so one bad row
+doesn't take the rest with it. Rows that can't be queued (queue full) or written because the
+database is down or slow are appended to a local JSON-lines spill file and replayed on the next
+start or successful flush. A row the database rejects on its own (a constraint or data error) goes
+to the quarantine file with the error instead; it is never replayed automatically. The queue is
+flushed on interpreter exit.
+"""
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from sqlalchemy.exc import DBAPIError, OperationalError
+from src.controller import BaseCRUD
+from src.database import engine
+from src.metrics import registry
+from src.settings import (WRITE_BEHIND_QUEUE_SIZE, WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_FLUSH_SECONDS,
+                          WRITE_BEHIND_SPILL_PATH, WRITE_BEHIND_QUARANTINE_PATH)
+from src.logger import logger
+
+DEFAULT_SPILL_PATH = os.path.join(os.path.dirname(__file__), '.write_behind_spill.jsonl')
+DEFAULT_QUARANTINE_PATH = os.path.join(os.path.dirname(__file__), '.write_behind_quarantine.jsonl')
+# how long close() waits for the worker to drain the queue at shutdown
+SHUTDOWN_TIMEOUT_SECONDS = 10
+
+
+class PendingWrites:
+    """Rows a checkout defers until it commits, as (table_name, row) pairs in submission order."""
+
+    def __init__(self):
+        self.rows = []
+
+    def add(self, table_name, **row):
+        self.rows.append((table_name, row))
+
+    def merge(self, table_name, key_columns, **row):
+        """Fold row into a pending row with the same key_columns values, like BaseCRUD.upsert would."""
+        for pending_table, pending_row in self.rows:
+            if pending_table == table_name and all(pending_row.get(column) == row[column] for column in key_columns):
+                pending_row.update(row)
+                return
+        self.add(table_name, **row)
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class WriteBehindQueue:
+    """Bounded in-process queue with a background batch writer; see the module docstring."""
+
+    def __init__(self, bind=engine, maxsize=WRITE_BEHIND_QUEUE_SIZE, batch_size=WRITE_BEHIND_BATCH_SIZE,
+                 flush_seconds=WRITE_BEHIND_FLUSH_SECONDS, spill_path=WRITE_BEHIND_SPILL_PATH or DEFAULT_SPILL_PATH,
+                 quarantine_path=WRITE_BEHIND_QUARANTINE_PATH or DEFAULT_QUARANTINE_PATH):
+        self.bind = bind
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.spill_path = spill_path
+        self.quarantine_path = quarantine_path
+        self._queue = queue.Queue(maxsize)
+        self._cruds = {}
+        self._spill_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._worker = None
+        self._stopping = threading.Event()
+        registry.gauge('write_behind_depth', self._queue.qsize)
+
+    def submit(self, pending: PendingWrites):
+        """Queue a committed checkout's deferred rows; never blocks, spilling to disk when the queue is full."""
+        self._ensure_started()
+        for entry in pending.rows:
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                registry.increment('write_behind_queue_full')
+                self._spill([entry])
+        registry.increment('write_behind_submitted', len(pending))
+
+    def flush(self, timeout=None) -> bool:
+        """Wait until everything submitted so far has been written (or spilled); False on timeout."""
+        if self._worker is None or not self._worker.is_alive():
+            self._drain()
+            return True
+        marker = threading.Event()
+        self._queue.put(marker)
+        return marker.wait(timeout)
+
+    def close(self, timeout=SHUTDOWN_TIMEOUT_SECONDS):
+        """Stop the worker after it drains the queue; whatever it can't write in time is spilled."""
+        self._stopping.set()
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.put(threading.Event())
+            self._worker.join(timeout)
+        if self._worker is None or not self._worker.is_alive():
+            self._drain()
+        else:
+            self._spill(self._take_all())
+
+    def replay_spill(self) -> int:
+        """Write rows left in the spill file by earlier failures; returns how many were written."""
+        replay_path = self.spill_path + '.replay'
+        with self._spill_lock:
+            if not os.path.exists(self.spill_path):
+                return 0
+            os.replace(self.spill_path, replay_path)
+        with open(replay_path, encoding='utf-8') as spill:
+            entries = [tuple(json.loads(line)) for line in spill if line.strip()]
+        os.remove(replay_path)
+
+        replayed = 0
+        for start in range(0, len(entries), self.batch_size):
+            replayed += self._write(entries[start:start + self.batch_size])
+        if replayed:
+            logger.info("Replayed %s of %s spilled write-behind rows", replayed, len(entries))
+            registry.increment('write_behind_replayed', replayed)
+        return replayed
+
+    def _ensure_started(self):
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                self._worker.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        self.replay_spill()
+        while not self._stopping.is_set():
+            batch, markers = self._take_batch()
+            if batch and self._write(batch) and os.path.exists(self.spill_path):
+                self.replay_spill()
+            for marker in markers:
+                marker.set()
+
+    def _take_batch(self):
+        """Block for the first entry, then gather until batch_size rows or flush_seconds have passed."""
+        batch, markers = [], []
+        deadline = None
+        while len(batch) < self.batch_size:
+            timeout = self.flush_seconds if deadline is None else deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if isinstance(entry, threading.Event):
+                # a flush or close is waiting: write what we have now
+                markers.append(entry)
+                break
+            batch.append(entry)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_seconds
+        return batch, markers
+
+    def _take_all(self):
+        entries = []
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                return entries
+            if isinstance(entry, threading.Event):
+                entry.set()
+            else:
+                entries.append(entry)
+
+    def _drain(self):
+        entries = self._take_all()
+        for start in range(0, len(entries), self.batch_size):
+            self._write(entries[start:start + self.batch_size])
+
+    def _crud(self, table_name):
+        crud = self._cruds.get(table_name)
+        if crud is None:
+            crud = self._cruds[table_name] = BaseCRUD(table_name)
+        return crud
+
+    def _write(self, entries) -> int:
+        """Insert entries with one add_batch per table in a single transaction; returns how many were written.
+
+        If the batch fails, each row is retried in a transaction of its own (see _write_rows).
+        """
+        by_table = {}
+        for table_name, row in entries:
+            by_table.setdefault(table_name, []).append(row)
+
+        started = time.perf_counter()
+        try:
+            with self.bind.begin() as conn:
+                for table_name, rows in by_table.items():
+                    self._crud(table_name).add_batch(conn, rows)
+        except Exception as err:
+            if _database_unavailable(err):
+                logger.error("Write-behind flush of %s rows failed, spilling to %s: %s",
+                             len(entries), self.spill_path, err)
+                self._spill(entries)
+                return 0
+            logger.warning("Write-behind flush of %s rows failed, retrying them one by one: %s", len(entries), err)
+            return self._write_rows(entries)
+
+        registry.observe('write_behind', 'flush', time.perf_counter() - started, len(entries))
+        registry.increment('write_behind_written', len(entries))
+        return len(entries)
+
+    def _write_rows(self, entries) -> int:
+        """Insert entries one per transaction. Rejected rows are quarantined; if the database goes away
+        the row and everything after it is spilled. Returns how many were written."""
+        written = 0
+        for position, (table_name, row) in enumerate(entries):
+            try:
+                with self.bind.begin() as conn:
+                    self._crud(table_name).add_batch(conn, [row])
+            except Exception as err:
+                if _database_unavailable(err):
+                    logger.error("Write-behind retry failed, spilling %s rows to %s: %s",
+                                 len(entries) - position, self.spill_path, err)
+                    self._spill(entries[position:])
+                    break
+                self._quarantine(table_name, row, err)
+            else:
+                written += 1
+        registry.increment('write_behind_written', written)
+        return written
+
+    def _quarantine(self, table_name, row, err):
+        logger.error("Write-behind row for %s rejected, quarantined in %s: %s", table_name, self.quarantine_path, err)
+        record = {"table": table_name, "row": row, "error": str(err), "failed_at": datetime.now().isoformat()}
+        with self._spill_lock, open(self.quarantine_path, 'a', encoding='utf-8') as quarantine:
+            quarantine.write(json.dumps(record, default=str) + '\n')
+        registry.increment('write_behind_quarantined')
+
+    def _spill(self, entries):
+        if not entries:
+            return
+        with self._spill_lock, open(self.spill_path, 'a', encoding='utf-8') as spill:
+            for entry in entries:
+                spill.write(json.dumps(entry, default=str) + '\n')
+        registry.increment('write_behind_spilled', len(entries))
+
+
+def _database_unavailable(err) -> bool:
+    """Whether err means the database couldn't take any row right now (down, timed out, locked) rather
+    than rejecting this one."""
+    return isinstance(err, OperationalError) or (isinstance(err, DBAPIError) and err.connection_invalidated)
+
+
+_write_behind = None
+
+
+def get_write_behind() -> WriteBehindQueue:
+    """The process-wide queue, created on first use."""
+    global _write_behind
+    if _write_behind is None:
+        _write_behind = WriteBehindQueue()
+    return _write_behind
@@ -0,0 +1,61 @@
+"""Shared fixtures: every test runs against a throwaway SQLite file with the cafe_crm schema.
+
+The environment is set before anything from src is imported, because src.database builds its
+engine from DB_URL at import time. Foreign keys are switched on so SQLite enforces them like MySQL.
+"""
+import os
+import tempfile
+
+_tmp_dir = tempfile.mkdtemp(prefix='cafe_crm_tests_')
+os.environ['DB_URL'] = f"sqlite:///{os.path.join(_tmp_dir, 'cafe_crm.db')}"
+os.environ['SCHEMA_CACHE_PATH'] = os.path.join(_tmp_dir, 'schema.pickle')
+os.environ['LOG_PATH'] = os.path.join(_tmp_dir, 'app.log')
+os.environ['WRITE_BEHIND_ENABLED'] = '0'
+os.environ.pop('DB_REPLICA_URL', None)
+
+import pytest
+from sqlalchemy import event, delete
+from src.cache import reference_cache
+from src.database import engine
+from src.generator import ensure_reference_data
+from src.helper_classes import CheckoutRequest, OrderLine
+from src.schema import schema_metadata, create_schema
+from src.services import OrderService
+
+# Loaded once by the pre-filling script and left alone by the tests.
+REFERENCE_TABLES = {'menu_categories', 'menu_items', 'discount_types', 'discounts', 'loyalty_tiers',
+                    'review_categories'}
+
+
+@event.listens_for(engine, 'connect')
+def _enable_foreign_keys(dbapi_connection, connection_record):
+    dbapi_connection.execute('PRAGMA foreign_keys = ON')
+
+
+@pytest.fixture(scope='session', autouse=True)
+def database():
+    with engine.begin() as conn:
+        create_schema(conn)
+        ensure_reference_data(conn)
+    yield engine
+
+
+@pytest.fixture(autouse=True)
+def clean_tables(database):
+    """Empty every non-reference table after each test, children first."""
+    yield
+    with engine.begin() as conn:
+        for table in reversed(schema_metadata.sorted_tables):
+            if table.name not in REFERENCE_TABLES:
+                conn.execute(delete(table))
+    reference_cache.invalidate()
+
+
+@pytest.fixture
+def checkout():
+    """checkout(items=[(item_id, quantity)], **request) runs one OrderService checkout and returns its result."""
+    service = OrderService(engine)
+
+    def run(items=((1, 2), (2, 1)), **request):
+        return service.checkout(CheckoutRequest(items=[OrderLine(*line) for line in items], **request))
+    return run
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from src.archive import archive_chunk, archive_orders, hot_tables, archive_tables, reference_tables, ARCHIVED_TABLES
+from src.database import engine
+from src.helper_classes import Payment
+
+
+def order_ids(crud):
+    with engine.connect() as conn:
+        return sorted(conn.execute(select(crud.table.c.order_id)).scalars())
+
+
+def age(order_ids, days):
+    orders = hot_tables['orders'].table
+    with engine.begin() as conn:
+        conn.execute(update(orders).where(orders.c.order_id.in_(order_ids))
+                     .values(created_at=datetime.now() - timedelta(days=days)))
+
+
+def test_archive_chunk_moves_an_order_and_everything_hanging_off_it(checkout):
+    archived = checkout(new_customer={"name": "Ann"}).order['order_id']
+    kept = checkout().order['order_id']
+    with engine.begin() as conn:
+        reference_tables['feedbacks'].add(conn, order_id=archived, category_id=1, rating=8)
+        hot_rows = {table_name: len(hot_tables[table_name].get_all(conn, order_id=archived))
+                    for table_name in ARCHIVED_TABLES}
+        moved = archive_chunk(conn, [archived])
+
+    assert moved == hot_rows
+    assert order_ids(hot_tables['orders']) == [kept]
+    assert order_ids(archive_tables['orders']) == [archived]
+    assert order_ids(archive_tables['order_items']) == [archived] * hot_rows['order_items']
+    assert archived not in order_ids(hot_tables['order_bills'])
+    with engine.connect() as conn:
+        feedback, = reference_tables['feedbacks'].get_all(conn)
+    assert (feedback['order_id'], feedback['archived_order_id']) == (None, archived)
+
+
+def test_archive_orders_moves_only_old_paid_orders(checkout):
+    old = [checkout().order['order_id'] for _ in range(3)]
+    recent = checkout().order['order_id']
+    partly_paid = checkout(items=[(2, 3)], payment=Payment(amount_paid=1)).order['order_id']
+    age(old + [partly_paid], days=400)
+
+    result = archive_orders(engine, cutoff=datetime.now() - timedelta(days=90), chunk_size=2)
+
+    assert result['chunks'] == 2
+    assert result['moved']['orders'] == 3
+    assert order_ids(archive_tables['orders']) == old
+    assert order_ids(hot_tables['orders']) == [recent, partly_paid]
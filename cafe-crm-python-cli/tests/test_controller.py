@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy.orm import Session
+from src.controller import BaseCRUD
+from src.database import engine
+
+customers = BaseCRUD('customers')
+order_hours = BaseCRUD('summary_order_hours')
+
+
+@pytest.fixture(params=['native', 'fallback'])
+def upsert_path(request, monkeypatch):
+    """Runs a test once with ON CONFLICT upserts and once with the update-then-insert fallback."""
+    if request.param == 'fallback':
+        monkeypatch.setattr(BaseCRUD, '_supports_native_upsert', lambda self, conn, conflict_columns: False)
+    return request.param
+
+
+@pytest.fixture
+def conn():
+    with engine.begin() as conn:
+        yield conn
+
+
+def test_add_or_increment_inserts_then_adds(conn, upsert_path):
+    assert order_hours.add_or_increment(conn, ('order_count',), order_hour=9, order_count=2)['message'] in (
+        "Merged successfully", "Inserted successfully")
+    order_hours.add_or_increment(conn, ('order_count',), order_hour=9, order_count=3)
+    order_hours.add_or_increment(conn, ('order_count',), order_hour=10, order_count=1)
+
+    assert order_hours.get_all(conn) == [{"order_hour": 9, "order_count": 5}, {"order_hour": 10, "order_count": 1}]
+
+
+def test_upsert_inserts_then_replaces(conn, upsert_path):
+    order_hours.upsert(conn, ['order_hour'], order_hour=9, order_count=2)
+    message = order_hours.upsert(conn, ['order_hour'], order_hour=9, order_count=7)['message']
+
+    assert message == ("Upserted successfully" if upsert_path == 'native' else "Updated successfully")
+    assert order_hours.get_all(conn) == [{"order_hour": 9, "order_count": 7}]
+
+
+def test_upsert_on_columns_without_a_unique_key_falls_back(conn):
+    with Session(bind=conn) as session:
+        assert customers.upsert(session, ['name'], name="Ann", email="ann@example.com")['message'] == \
+            "Inserted successfully"
+        assert customers.upsert(session, ['name'], name="Ann", email="ann@new.example.com")['message'] == \
+            "Updated successfully"
+        assert [row['email'] for row in customers.get_all(session)] == ["ann@new.example.com"]
+
+
+def test_get_page_walks_the_table_by_primary_key(conn):
+    customers.add_batch(conn, [{"name": f"Customer {number}"} for number in range(25)])
+    ids = [row['customer_id'] for row in customers.get_all(conn)]
+
+    first, after = customers.get_page(conn, limit=10)
+    second, after = customers.get_page(conn, limit=10, after=after)
+    last, end = customers.get_page(conn, limit=10, after=after)
+
+    assert [row['customer_id'] for row in first + second + last] == ids
+    assert (len(last), end) == (5, None)
+    assert customers.get_page(conn, limit=10, name="Customer 3") == (
+        [row for row in first if row['name'] == "Customer 3"], None)
+
+
+def test_iter_all_streams_every_row_with_after_and_limit(conn):
+    customers.add_batch(conn, [{"name": f"Customer {number}"} for number in range(25)])
+    ids = [row['customer_id'] for row in customers.get_all(conn)]
+
+    assert [row['customer_id'] for row in customers.iter_all(conn, page_size=7)] == ids
+    assert [row['customer_id'] for row in customers.iter_all(conn, page_size=7, after=(ids[9],))] == ids[10:]
+    assert [row['customer_id'] for row in customers.iter_all(conn, page_size=7, limit=8)] == ids[:8]
+    assert list(customers.iter_all(conn, name="nobody")) == []
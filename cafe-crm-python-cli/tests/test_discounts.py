@@ -0,0 +1,68 @@
+import random
+from itertools import combinations
+import pytest
+from src.discounts import DiscountEngine, discount_amount
+
+
+def random_discounts(rng, count):
+    discounts = []
+    for discount_id in range(1, count + 1):
+        type_name = rng.choice(('flat', 'percentage'))
+        discounts.append({
+            "discount_id": discount_id,
+            "type_name": type_name,
+            "discount_value": rng.randint(1, 100) if type_name == 'percentage' else rng.randint(1, 600),
+            "min_order_value": rng.choice((0, 50, 100, 250, 500, 1000)),
+        })
+    return discounts
+
+
+def brute_force_best(discounts, total_price, max_stacked):
+    """Largest total any stack of up to max_stacked eligible discounts can take off."""
+    eligible = [discount for discount in discounts if discount['min_order_value'] <= total_price]
+    best = 0
+    for size in range(1, min(max_stacked, len(eligible)) + 1):
+        for stack in combinations(eligible, size):
+            best = max(best, min(sum(discount_amount(total_price, discount) for discount in stack), total_price))
+    return best
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_best_matches_brute_force(seed):
+    rng = random.Random(seed)
+    discounts = random_discounts(rng, rng.randint(0, 9))
+    engine = DiscountEngine(discounts)
+
+    for total_price in [rng.randint(1, 1500) for _ in range(10)] + [0, 50, 1000]:
+        for max_stacked in (1, 2, 3):
+            best = engine.best(total_price, max_stacked)
+            assert best['discount_applied'] == brute_force_best(discounts, total_price, max_stacked)
+            assert len(best['discounts']) <= max_stacked
+            assert all(discount['min_order_value'] <= total_price for discount in best['discounts'])
+            assert best['final_price'] == total_price - best['discount_applied']
+            assert sum(discount['discount_amount'] for discount in best['discounts']) == best['discount_applied']
+
+
+def test_points_top_up_what_the_discounts_leave():
+    engine = DiscountEngine([{"discount_id": 1, "type_name": 'flat', "discount_value": 30, "min_order_value": 0}])
+
+    best = engine.best(100, points_balance=10000, conversion_rate=0.1, min_points_to_redeem=50)
+    assert (best['points_to_redeem'], best['points_value'], best['final_price']) == (700, 70, 0)
+
+    # not enough points to clear the redemption minimum
+    assert engine.best(100, points_balance=40, conversion_rate=0.1, min_points_to_redeem=50)['points_to_redeem'] == 0
+
+
+def test_a_stacked_flat_discount_is_trimmed_to_what_is_left_of_the_total():
+    engine = DiscountEngine([
+        {"discount_id": 1, "type_name": 'flat', "discount_value": 80, "min_order_value": 0},
+        {"discount_id": 2, "type_name": 'flat', "discount_value": 60, "min_order_value": 0},
+        {"discount_id": 3, "type_name": 'flat', "discount_value": 10, "min_order_value": 0},
+    ])
+
+    best = engine.best(100, max_stacked=3)
+
+    stack = [(discount['discount_id'], discount['discount_amount']) for discount in best['discounts']]
+    assert stack == [(1, 80), (2, 20)]
+    assert sum(discount['discount_amount'] for discount in best['discounts']) == best['discount_applied'] == 100
+    assert best['final_price'] == 0
@@ -0,0 +1,63 @@
+import csv
+from sqlalchemy import select
+from src import importer
+from src.database import engine
+from src.importer import import_customers, unique_key
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=importer.CUSTOMER_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+def customer_emails():
+    table = importer.customer.table
+    with engine.connect() as conn:
+        return conn.execute(select(table.c.email).order_by(table.c.customer_id)).scalars().all()
+
+
+def loyalty_accounts():
+    table = importer.loyalty_program.table
+    with engine.connect() as conn:
+        return conn.execute(select(table.c.customer_id)).scalars().all()
+
+
+def test_unique_key_ignores_case_and_surrounding_spaces():
+    assert unique_key(" Ann@Example.COM ") == unique_key("ann@example.com")
+    assert unique_key(None) is None
+
+
+def test_emails_differing_only_in_case_are_duplicates(tmp_path):
+    path = write_csv(tmp_path / 'customers.csv', [
+        {"name": "Ann", "email": "ann@example.com", "mobile_no": "5550001"},
+        {"name": "Ann again", "email": "ANN@Example.com", "mobile_no": "5550002"},
+        {"name": "Bob", "email": "bob@example.com", "mobile_no": ""},
+    ])
+
+    stats = import_customers(path, chunk_size=2)
+
+    assert (stats['inserted'], stats['rejected']) == (2, 1)
+    assert customer_emails() == ["ann@example.com", "bob@example.com"]
+    assert len(loyalty_accounts()) == 2
+
+
+def test_a_clash_the_checks_missed_rejects_only_that_row(tmp_path, monkeypatch):
+    write_csv(tmp_path / 'first.csv', [{"name": "Ann", "email": "ann@example.com", "mobile_no": "5550001"}])
+    import_customers(tmp_path / 'first.csv')
+    # as if another till registered Ann between the lookup and the insert
+    monkeypatch.setattr(importer, '_existing_keys', lambda conn, column, values: set())
+    path = write_csv(tmp_path / 'second.csv', [
+        {"name": "Cat", "email": "cat@example.com", "mobile_no": "5550003"},
+        {"name": "Ann", "email": "ann@example.com", "mobile_no": "5550001"},
+        {"name": "Dan", "email": "dan@example.com", "mobile_no": ""},
+    ])
+
+    stats = import_customers(path, rejects_path=tmp_path / 'rejects.csv')
+
+    assert (stats['inserted'], stats['rejected']) == (2, 1)
+    assert customer_emails() == ["ann@example.com", "cat@example.com", "dan@example.com"]
+    assert len(loyalty_accounts()) == 3
+    assert "duplicate in database" in (tmp_path / 'rejects.csv').read_text()
@@ -0,0 +1,40 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+from src.metrics import instrument_engine, registry
+
+
+def test_each_engine_reports_under_its_own_name():
+    primary, replica = (create_engine('sqlite://', poolclass=QueuePool) for _ in range(2))
+    instrument_engine(primary, 'test_primary')
+    instrument_engine(replica, 'test_replica')
+
+    with primary.connect() as conn:
+        conn.execute(text('SELECT 1'))
+    with replica.connect() as conn:
+        conn.execute(text('SELECT 1'))
+        conn.execute(text('SELECT 1'))
+
+    counts = {(row['kind'], row['name']): row['count'] for row in registry.snapshot()}
+    assert counts[('sql', '[test_primary] SELECT 1')] == 1
+    assert counts[('sql', '[test_replica] SELECT 1')] == 2
+    assert counts[('pool', '[test_primary] checkout wait')] == 1
+    assert counts[('pool', '[test_replica] connection held')] == 1
+    counters = registry.counters()
+    assert counters['test_primary_pool_checkouts'] == 1
+    assert counters['test_replica_pool_checkouts'] == 1
+    assert 'test_primary_pool_checkedout' in counters and 'test_replica_pool_checkedout' in counters
+
+
+def test_a_failed_statement_does_not_skew_the_next_timing():
+    engine = create_engine('sqlite://', poolclass=QueuePool)
+    instrument_engine(engine, 'test_failing')
+
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.execute(text('SELECT * FROM missing_table'))
+        conn.execute(text('SELECT 2'))
+
+    timed = [row for row in registry.snapshot() if row['kind'] == 'sql' and row['name'].startswith('[test_failing]')]
+    assert [(row['name'], row['count']) for row in timed] == [('[test_failing] SELECT 2', 1)]
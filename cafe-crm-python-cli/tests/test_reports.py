@@ -0,0 +1,72 @@
+import pytest
+from src import reports
+from src.cache import TTLCache, invalidate_table
+from src.reports import report_cache, run_reports
+
+
+@pytest.fixture(autouse=True)
+def empty_report_cache():
+    report_cache.invalidate()
+    yield
+    report_cache.invalidate()
+
+
+def test_set_skips_values_loaded_before_an_invalidation():
+    cache = TTLCache(ttl=60)
+    generation = cache.generation(('orders',))
+    cache.invalidate_table('order_items')
+    assert cache.set('fresh', 1, depends_on=('orders',), generation=generation)
+    assert cache.get('fresh') == 1
+
+    generation = cache.generation(('orders',))
+    cache.invalidate_table('orders')
+    assert not cache.set('stale', 2, depends_on=('orders',), generation=generation)
+    assert cache.get('stale') is None
+
+    generation = cache.generation(('orders',))
+    cache.invalidate()
+    assert not cache.set('stale', 2, depends_on=('orders',), generation=generation)
+
+
+def test_results_are_cached_until_a_table_they_read_is_written(checkout):
+    checkout()
+    first, = run_reports(['GetPeakOrderHours'])
+    second, = run_reports(['GetPeakOrderHours'])
+    assert (first['cached'], second['cached']) == (False, True)
+    assert second['rows'] == first['rows']
+
+    invalidate_table('orders')
+    third, = run_reports(['GetPeakOrderHours'])
+    assert not third['cached']
+
+
+def test_a_write_while_the_report_runs_keeps_it_out_of_the_cache(checkout, monkeypatch):
+    checkout()
+    execute = reports._execute
+
+    def execute_during_a_write(report, values, state):
+        invalidate_table('orders')
+        return execute(report, values, state)
+
+    monkeypatch.setattr(reports, '_execute', execute_during_a_write)
+    result, = run_reports(['GetPeakOrderHours'])
+
+    assert result['error'] is None and result['rows']
+    assert report_cache.stats()['size'] == 0
+
+
+def test_a_report_that_finishes_past_its_timeout_is_rejected(checkout, monkeypatch):
+    checkout()
+    execute = reports._execute
+
+    def slow_execute(report, values, state):
+        rows = execute(report, values, state)
+        state['started'] -= 10
+        return rows
+
+    monkeypatch.setattr(reports, '_execute', slow_execute)
+    result, = run_reports(['GetPeakOrderHours'], timeout=5)
+
+    assert result['rows'] is None
+    assert result['error'] == "timed out after 5s"
+    assert report_cache.stats()['size'] == 0
@@ -0,0 +1,78 @@
+import time
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from src import services, search
+from src.database import engine
+from src.search import CustomerSearchIndex, customer_index, like_search, search_customers
+
+
+def register(session, name, **data):
+    return services.register_customer(session, name=name, **data)['customer_id']
+
+
+def test_refresh_picks_up_a_lower_id_committed_after_a_higher_one():
+    index = CustomerSearchIndex(rescan_window=20)
+    with engine.connect() as conn, Session(bind=conn) as session:
+        register(session, "Ada Lovelace", customer_id=1)
+        session.commit()
+        index.rebuild(conn)
+
+        # id 10 commits first; id 5 was handed out earlier but its checkout commits later
+        register(session, "Hedy Lamarr", customer_id=10)
+        session.commit()
+        index.refresh(conn)
+        assert [row['name'] for row in index.search("hedy")] == ["Hedy Lamarr"]
+
+        register(session, "Grace Hopper", customer_id=5)
+        session.commit()
+        index.refresh(conn)
+
+        assert [row['name'] for row in index.search("grace")] == ["Grace Hopper"]
+        assert sorted(index._data.customers) == [1, 5, 10]
+        assert len(index._data.field_keys) == len(set(index._data.field_keys))
+
+
+def test_refresh_picks_up_a_customer_registered_by_another_till():
+    index = CustomerSearchIndex()
+    with engine.connect() as conn:
+        index.rebuild(conn)
+
+        # written straight to the table, as another process would: no BaseCRUD invalidation here
+        conn.execute(insert(search.customer.table).values(customer_id=7, name="Katherine Johnson"))
+        conn.commit()
+        index.refresh(conn)
+
+        assert [row['name'] for row in index.search("katherine")] == ["Katherine Johnson"]
+
+
+def test_like_search_ranks_like_the_index():
+    with engine.connect() as conn, Session(bind=conn) as session:
+        register(session, "Ann Lee", email="ann@example.com", mobile_no="5550001")
+        register(session, "Annabel Smith", email="bel@example.com")
+        register(session, "Joanne Ann Price")
+        register(session, "100%_sure")
+        session.commit()
+
+        assert [row['name'] for row in like_search(conn, "ann")] == ["Ann Lee", "Joanne Ann Price", "Annabel Smith"]
+        assert [row['name'] for row in like_search(conn, "555")] == ["Ann Lee"]
+        assert [row['name'] for row in like_search(conn, "100%")] == ["100%_sure"]
+        assert like_search(conn, "1000") == []
+
+        index = CustomerSearchIndex()
+        index.rebuild(conn)
+        assert ([row['customer_id'] for row in like_search(conn, "ann")]
+                == [row['customer_id'] for row in index.search("ann")])
+
+
+def test_search_falls_back_to_like_until_the_background_build_is_done(monkeypatch):
+    monkeypatch.setattr(customer_index, '_data', None)
+    with engine.connect() as conn, Session(bind=conn) as session:
+        register(session, "Ada Lovelace")
+        session.commit()
+
+        assert [row['name'] for row in search_customers(conn, "ada")] == ["Ada Lovelace"]
+        deadline = time.monotonic() + 5
+        while not customer_index.ready and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert customer_index.ready
+        assert [row['name'] for row in search_customers(conn, "lovel")] == ["Ada Lovelace"]
@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+from src import services
+from src.database import engine
+from src.helper_classes import Payment
+from src.settings import NEWBIE_LOYALTY_POINTS
+
+
+def row_count(table_name):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(services.BaseCRUD(table_name).table)).scalar()
+
+
+def test_checkout_writes_the_whole_order(checkout):
+    result = checkout(items=[(1, 2), (2, 1), (1, 1)], new_customer={"name": "Ann", "email": "ann@example.com"})
+
+    with engine.connect() as conn:
+        pricing = services.price_order(conn, result.order['order_id'])
+        bill = services.order_bills.get_one(conn, order_id=result.order['order_id'])
+        loyalty = services.loyalty_program.get_one(conn, customer_id=result.customer['customer_id'])
+
+    assert result.order['order_status'] == 'completed'
+    assert [(item['item_id'], item['quantity']) for item in result.items] == [(1, 3), (2, 1)]
+    assert bill['payment_status'] == 'paid'
+    assert float(bill['total_price']) == float(pricing['total_price']) == float(result.bill['total_price'])
+    assert result.payments[0]['amount_paid'] == result.bill['final_price']
+    assert loyalty['total_points'] == NEWBIE_LOYALTY_POINTS + result.points_earned
+    assert row_count('loyalty_points_logs') == (1 if result.points_earned else 0)
+
+
+@pytest.mark.parametrize('discount_applied', [0.0, 10.0])
+def test_final_price_is_a_whole_number_with_or_without_a_discount(discount_applied):
+    bill = services.build_bill({"order_id": 1, "total_price": 123.75}, discount_applied)
+
+    assert bill['final_price'] == int(123.75 - int(discount_applied))
+    assert type(bill['final_price']) is int
+
+
+def test_partial_payment_leaves_the_bill_partially_paid(checkout):
+    result = checkout(items=[(1, 4)], payment=Payment(amount_paid=1))
+
+    assert result.bill['payment_status'] == 'partially_paid'
+    assert result.points_earned == 0
+
+
+@pytest.mark.parametrize('request_fields', [
+    {"new_customer": {"name": "Ann"}, "discount_ids": [999999]},
+    {"new_customer": {"name": "Ann"}, "payment": Payment(amount_paid=10 ** 9)},
+    {"new_customer": {"name": "Ann"}, "items": [(999999, 1)]},
+    {"customer_id": 999999},
+    {"new_customer": {"name": "Ann"}, "items": [(1, 50)], "discount_ids": [1] * 12},
+])
+def test_a_failed_checkout_rolls_everything_back(checkout, request_fields):
+    with pytest.raises(Exception):
+        checkout(**request_fields)
+
+    for table_name in ('customers', 'loyalty_program', 'orders', 'order_items', 'order_bills', 'order_payments',
+                       'order_discounts', 'summary_order_hours'):
+        assert row_count(table_name) == 0, table_name
+
+
+def test_a_failed_checkout_leaves_the_session_usable(checkout):
+    with pytest.raises(ValueError):
+        checkout(items=[])
+    assert checkout().bill['payment_status'] == 'paid'
+    assert row_count('orders') == 1
+
+
+def test_repeated_discount_ids_are_rejected_up_front(checkout):
+    with pytest.raises(ValueError, match=r"repeated: \[1\]"):
+        checkout(items=[(1, 50)], new_customer={"name": "Ann"}, discount_ids=[1, 2, 1])
+    assert row_count('customers') == 0
+
+
+def test_a_discount_stack_larger_than_the_total_leaves_a_zero_bill():
+    with engine.connect() as conn, Session(bind=conn) as session:
+        order = services.create_order(session)
+        services.add_items(session, order['order_id'], [services.OrderLine(1, 2)], new_order=True)
+        pricing = services.price_order(session, order['order_id'])
+        stack = [{"discount_amount": pricing['total_price']}, {"discount_amount": 50}]
+
+        bill = services.write_bill(session, order, pricing, stack)
+
+    assert bill['discount_applied'] == pricing['total_price']
+    assert bill['final_price'] == 0
@@ -0,0 +1,71 @@
+from sqlalchemy.orm import Session
+from src import services
+from src.database import engine
+from src.helper_classes import OrderLine
+from src.snapshot import export_snapshot, load_column
+
+
+def open_order(session):
+    order = services.create_order(session)
+    services.add_items(session, order['order_id'], [OrderLine(1, 1)], new_order=True)
+    session.commit()
+    return order
+
+
+def settle(session, order):
+    order = services.complete_order(session, order['order_id'])
+    bill = services.write_bill(session, order, services.price_order(session, order['order_id']), [])
+    services.pay_order(session, order['order_id'], bill['final_price'], bill=bill)
+    session.commit()
+
+
+def exported_order_ids(output_dir):
+    values, _ = load_column(output_dir, 'orders', 'order_id')
+    return sorted(int(value) for value in values)
+
+
+def test_incremental_export_appends_only_new_orders(tmp_path, checkout):
+    first = checkout()
+    assert export_snapshot(tmp_path)['orders'] == 1
+    second = checkout()
+
+    exported = export_snapshot(tmp_path)
+
+    assert exported['orders'] == 1
+    assert exported['order_items'] == 2
+    assert exported_order_ids(tmp_path) == [first.order['order_id'], second.order['order_id']]
+    assert export_snapshot(tmp_path)['orders'] == 0
+
+
+def test_order_billed_after_a_newer_one_is_still_exported(tmp_path):
+    with engine.connect() as connection, Session(bind=connection) as session:
+        older, newer = open_order(session), open_order(session)
+        settle(session, newer)
+        assert export_snapshot(tmp_path)['orders'] == 1
+
+        settle(session, older)
+        exported = export_snapshot(tmp_path)
+
+    assert exported['orders'] == 1
+    assert exported['order_bills'] == 1
+    assert exported_order_ids(tmp_path) == sorted([older['order_id'], newer['order_id']])
+
+
+def test_open_orders_wait_until_settled(tmp_path):
+    with engine.connect() as connection, Session(bind=connection) as session:
+        order = open_order(session)
+        assert export_snapshot(tmp_path)['orders'] == 0
+
+        settle(session, order)
+        assert export_snapshot(tmp_path)['orders'] == 1
+
+    status, _ = load_column(tmp_path, 'orders', 'order_status', decode=True)
+    assert status == ['completed']
+
+
+def test_open_orders_past_the_overlap_window_are_exported_as_they_stand(tmp_path):
+    with engine.connect() as connection, Session(bind=connection) as session:
+        open_order(session)
+
+    assert export_snapshot(tmp_path, overlap_hours=-1)['orders'] == 1
+    assert export_snapshot(tmp_path, overlap_hours=-1)['orders'] == 0
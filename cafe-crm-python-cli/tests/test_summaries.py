@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from sqlalchemy import select
+from src.database import engine
+from src.helper_classes import CheckoutRequest, OrderLine
+from src.summaries import monthly_revenue, customer_spending, order_hours, rebuild_summaries
+
+
+def summary_rows():
+    with engine.connect() as conn:
+        return {crud.table_name: sorted(tuple(row) for row in conn.execute(select(crud.table)))
+                for crud in (monthly_revenue, customer_spending, order_hours)}
+
+
+def rebuilt_summary_rows():
+    with engine.begin() as conn:
+        rebuild_summaries(conn)
+    return summary_rows()
+
+
+def test_checkouts_keep_the_summaries_equal_to_a_rebuild(checkout):
+    alice = checkout(new_customer={"name": "Alice", "email": "alice@example.com"}).customer
+    checkout(items=[(3, 1)], customer_id=alice['customer_id'])
+    checkout(items=[(2, 4)])
+    checkout(new_customer={"name": "Bob", "mobile_no": "5550100"})
+
+    incremental = summary_rows()
+
+    assert incremental['summary_customer_spending']
+    assert incremental == rebuilt_summary_rows()
+
+
+def test_a_rolled_back_checkout_leaves_the_summaries_alone(checkout):
+    checkout()
+    before = summary_rows()
+
+    with pytest.raises(ValueError):
+        checkout(customer_id=999999)
+    with pytest.raises(ValueError):
+        checkout(new_customer={"name": "Carol"}, discount_ids=[999999])
+
+    assert summary_rows() == before == rebuilt_summary_rows()
+
+
+def test_async_checkouts_apply_their_summaries_after_commit():
+    pytest.importorskip('aiosqlite')
+    from src.async_controller import get_async_engine
+    from src.async_services import AsyncOrderService
+
+    async def run():
+        service = AsyncOrderService()
+        await service.checkout(CheckoutRequest(items=[OrderLine(1, 2)], new_customer={"name": "Dan"}))
+        await service.checkout(CheckoutRequest(items=[OrderLine(2, 1)]))
+        await get_async_engine().dispose()
+
+    asyncio.run(run())
+
+    assert summary_rows()['summary_order_hours']
+    assert summary_rows() == rebuilt_summary_rows()
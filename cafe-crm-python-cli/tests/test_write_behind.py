@@ -0,0 +1,62 @@
+import json
+from sqlalchemy import create_engine, select
+from src.controller import BaseCRUD
+from src.database import engine
+from src.write_behind import WriteBehindQueue, PendingWrites
+
+
+def feedback(rating, comments=None):
+    return ('feedbacks', {"category_id": 1, "rating": rating, "comments": comments})
+
+
+def stored_feedbacks():
+    table = BaseCRUD('feedbacks').table
+    with engine.connect() as conn:
+        return conn.execute(select(table.c.comments).order_by(table.c.feedback_id)).scalars().all()
+
+
+def make_queue(tmp_path, bind=engine):
+    return WriteBehindQueue(bind, spill_path=str(tmp_path / 'spill.jsonl'),
+                            quarantine_path=str(tmp_path / 'quarantine.jsonl'))
+
+
+def test_a_rejected_row_is_quarantined_and_the_rest_of_the_batch_written(tmp_path):
+    write_behind = make_queue(tmp_path)
+
+    written = write_behind._write([feedback(5, 'first'), feedback(11, 'out of range'), feedback(7, 'last')])
+
+    assert written == 2
+    assert stored_feedbacks() == ['first', 'last']
+    assert not (tmp_path / 'spill.jsonl').exists()
+    quarantined = [json.loads(line) for line in (tmp_path / 'quarantine.jsonl').read_text().splitlines()]
+    assert len(quarantined) == 1
+    assert quarantined[0]['table'] == 'feedbacks'
+    assert quarantined[0]['row']['comments'] == 'out of range'
+    assert quarantined[0]['error']
+    assert write_behind.replay_spill() == 0
+
+
+def test_rows_are_spilled_while_the_database_is_down_and_replayed_once_it_is_back(tmp_path):
+    unreachable = create_engine(f"sqlite:///{tmp_path / 'missing' / 'cafe_crm.db'}")
+    write_behind = make_queue(tmp_path, unreachable)
+
+    assert write_behind._write([feedback(5, 'first'), feedback(7, 'second')]) == 0
+    assert len((tmp_path / 'spill.jsonl').read_text().splitlines()) == 2
+    assert not (tmp_path / 'quarantine.jsonl').exists()
+
+    write_behind.bind = engine
+    assert write_behind.replay_spill() == 2
+    assert stored_feedbacks() == ['first', 'second']
+    assert not (tmp_path / 'spill.jsonl').exists()
+    assert write_behind.replay_spill() == 0
+
+
+def test_submitted_rows_are_written_by_the_worker(tmp_path):
+    write_behind = make_queue(tmp_path)
+    pending = PendingWrites()
+    pending.add('feedbacks', category_id=1, rating=5, comments='queued')
+    write_behind.submit(pending)
+
+    assert write_behind.flush(timeout=5)
+    write_behind.close()
+    assert stored_feedbacks() == ['queued']
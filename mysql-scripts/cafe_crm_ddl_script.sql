@@ -116,7 +116,84 @@ CREATE TABLE loyalty_points_logs(
     FOREIGN KEY (order_id) REFERENCES orders(order_id) ON DELETE SET NULL
 );
 
+-- ARCHIVE
+-- Completed, fully paid orders older than ARCHIVE_AFTER_DAYS are moved here in chunks by
+-- `python -m src.archive`, so the hot order tables stay small. Same columns as the hot tables;
+-- ids are copied, not generated. The *_all views below span both.
+
+CREATE TABLE orders_archive (
+    order_id INT PRIMARY KEY,
+    customer_id INT DEFAULT NULL,
+    order_status ENUM('new', 'preparing', 'completed', 'cancelled') DEFAULT 'new',
+    created_at TIMESTAMP NULL,
+    updated_at TIMESTAMP NULL,
+    INDEX idx_orders_archive_created_at (created_at),
+    FOREIGN KEY (customer_id) REFERENCES customers(customer_id) ON DELETE SET NULL
+);
+
+CREATE TABLE order_items_archive (
+    order_id INT,
+    item_id INT,
+    quantity INT NOT NULL DEFAULT 1,
+    PRIMARY KEY (order_id, item_id),
+    FOREIGN KEY (order_id) REFERENCES orders_archive(order_id),
+    FOREIGN KEY (item_id) REFERENCES menu_items(item_id)
+);
+
+CREATE TABLE order_payments_archive (
+    payment_id INT PRIMARY KEY,
+    order_id INT NOT NULL,
+    payment_type ENUM('cash', 'card', 'upi', 'paypal') DEFAULT 'cash',
+    amount_paid DECIMAL(10,2) NOT NULL DEFAULT 0.0,
+    FOREIGN KEY (order_id) REFERENCES orders_archive(order_id) ON DELETE CASCADE
+);
+
+CREATE TABLE order_bills_archive (
+    order_id INT PRIMARY KEY,
+    total_price DECIMAL(10,2) NOT NULL DEFAULT 0.0,
+    discount_applied DECIMAL(10,2) NOT NULL DEFAULT 0.0,
+    final_price DECIMAL(10,2) NOT NULL DEFAULT 0.0,
+    payment_status ENUM('pending', 'partially_paid', 'paid', 'failed') DEFAULT 'pending',
+    FOREIGN KEY (order_id) REFERENCES orders_archive(order_id) ON DELETE CASCADE
+);
+
+CREATE TABLE order_discounts_archive (
+    order_discount_id INT PRIMARY KEY,
+    order_id INT NOT NULL,
+    discount_id INT DEFAULT NULL,
+    loyalty_points_used INT DEFAULT 0 CHECK (loyalty_points_used >= 0),
+    discount_amount DECIMAL(10,2) NOT NULL,
+    FOREIGN KEY (order_id) REFERENCES orders_archive(order_id) ON DELETE CASCADE,
+    FOREIGN KEY (discount_id) REFERENCES discounts(discount_id) ON DELETE SET NULL
+);
+
+CREATE TABLE loyalty_points_logs_archive (
+    log_id INT PRIMARY KEY,
+    customer_id INT NOT NULL,
+    order_id INT NULL,
+    points_earned INT NULL,
+    points_redeemed INT NULL,
+    created_at TIMESTAMP NULL,
+    updated_at TIMESTAMP NULL,
+    FOREIGN KEY (customer_id) REFERENCES customers(customer_id) ON DELETE CASCADE,
+    FOREIGN KEY (order_id) REFERENCES orders_archive(order_id) ON DELETE SET NULL
+);
+
+CREATE VIEW orders_all AS
+    SELECT * FROM orders UNION ALL SELECT * FROM orders_archive;
+CREATE VIEW order_items_all AS
+    SELECT * FROM order_items UNION ALL SELECT * FROM order_items_archive;
+CREATE VIEW order_payments_all AS
+    SELECT * FROM order_payments UNION ALL SELECT * FROM order_payments_archive;
+CREATE VIEW order_bills_all AS
+    SELECT * FROM order_bills UNION ALL SELECT * FROM order_bills_archive;
+CREATE VIEW order_discounts_all AS
+    SELECT * FROM order_discounts UNION ALL SELECT * FROM order_discounts_archive;
+CREATE VIEW loyalty_points_logs_all AS
+    SELECT * FROM loyalty_points_logs UNION ALL SELECT * FROM loyalty_points_logs_archive;
+
 -- FEEDBACKS AND COMPLAINTS
+-- When an order is archived, feedbacks and complaints keep pointing at it through archived_order_id.
 
 CREATE TABLE review_categories (
     category_id INT PRIMARY KEY AUTO_INCREMENT,
@@ -132,8 +209,10 @@ CREATE TABLE feedbacks (
     rating TINYINT NOT NULL CHECK (rating BETWEEN 1 AND 10),
     comments TEXT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    archived_order_id INT NULL,
     FOREIGN KEY (customer_id) REFERENCES customers(customer_id) ON DELETE SET NULL,
     FOREIGN KEY (order_id) REFERENCES orders(order_id) ON DELETE SET NULL,
+    FOREIGN KEY (archived_order_id) REFERENCES orders_archive(order_id) ON DELETE SET NULL,
     FOREIGN KEY (category_id) REFERENCES review_categories(category_id) ON DELETE CASCADE,
     FOREIGN KEY (item_id) REFERENCES menu_items(item_id) ON DELETE SET NULL
 );
@@ -147,13 +226,45 @@ CREATE TABLE complaints (
     comments TEXT NOT NULL,
     status ENUM('pending', 'resolved', 'in_progress', 'dismissed') DEFAULT 'pending',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    archived_order_id INT NULL,
     FOREIGN KEY (customer_id) REFERENCES customers(customer_id) ON DELETE SET NULL,
     FOREIGN KEY (order_id) REFERENCES orders(order_id) ON DELETE SET NULL,
+    FOREIGN KEY (archived_order_id) REFERENCES orders_archive(order_id) ON DELETE SET NULL,
     FOREIGN KEY (category_id) REFERENCES review_categories(category_id) ON DELETE CASCADE
 );
 
+-- REPORTING SUMMARIES
+-- Maintained incrementally by the application when orders and bills are written
+-- (src/summaries.py); rebuild from scratch with `python -m src.summaries --rebuild`.
+
+CREATE TABLE summary_monthly_revenue (
+    revenue_year INT NOT NULL,
+    revenue_month TINYINT NOT NULL,
+    billed_orders INT NOT NULL DEFAULT 0,
+    total_potential_revenue DECIMAL(14,2) NOT NULL DEFAULT 0.0,
+    total_collected_revenue DECIMAL(14,2) NOT NULL DEFAULT 0.0,
+    PRIMARY KEY (revenue_year, revenue_month)
+);
+
+CREATE TABLE summary_customer_spending (
+    customer_id INT PRIMARY KEY,
+    order_count INT NOT NULL DEFAULT 0,
+    billed_orders INT NOT NULL DEFAULT 0,
+    total_spent DECIMAL(14,2) NOT NULL DEFAULT 0.0,
+    INDEX idx_summary_customer_total_spent (total_spent),
+    FOREIGN KEY (customer_id) REFERENCES customers(customer_id) ON DELETE CASCADE
+);
+
+CREATE TABLE summary_order_hours (
+    order_hour TINYINT PRIMARY KEY,
+    order_count INT NOT NULL DEFAULT 0
+);
+
+
 
 -- PROCEDURES
+-- Order history is read through the *_all views, so reports still cover archived orders.
+
 
 -- 1. Get customer order counts
 DELIMITER //
@@ -166,7 +277,7 @@ BEGIN
         c.mobile_no, 
         COUNT(o.customer_id) AS total_no_of_orders
     FROM customers AS c
-    INNER JOIN orders AS o
+    INNER JOIN orders_all AS o
     ON o.customer_id = c.customer_id
     GROUP BY c.customer_id;
 END;
@@ -180,8 +291,8 @@ BEGIN
     SELECT 
         c.name, 
         SUM(ob.total_price) AS total_spent
-    FROM orders AS o
-    INNER JOIN order_bills AS ob
+    FROM orders_all AS o
+    INNER JOIN order_bills_all AS ob
         ON o.order_id = ob.order_id
     INNER JOIN customers AS c
         ON o.customer_id = c.customer_id
@@ -200,8 +311,8 @@ BEGIN
         MONTH(o.created_at) AS month,
         SUM(ob.total_price) AS total_potential_revenue,
         SUM(ob.final_price) AS total_collected_revenue
-    FROM orders AS o
-    INNER JOIN order_bills AS ob
+    FROM orders_all AS o
+    INNER JOIN order_bills_all AS ob
         ON o.order_id = ob.order_id
     GROUP BY MONTH(o.created_at);
 END;
@@ -215,8 +326,8 @@ BEGIN
     SELECT 
         c.name, 
         AVG(ob.total_price) AS average_order_value
-    FROM orders AS o
-    INNER JOIN order_bills AS ob
+    FROM orders_all AS o
+    INNER JOIN order_bills_all AS ob
         ON o.order_id = ob.order_id
     INNER JOIN customers AS c
         ON c.customer_id = o.customer_id
@@ -232,7 +343,7 @@ BEGIN
     SELECT 
         HOUR(created_at) AS order_hour, 
         COUNT(order_id) AS order_count
-    FROM orders 
+    FROM orders_all 
     GROUP BY HOUR(created_at)
     ORDER BY order_count DESC;
 END;
@@ -245,9 +356,9 @@ CREATE PROCEDURE GetRedeemedPointsPercentage()
 BEGIN
     SELECT 
         (SELECT COUNT(order_id) 
-         FROM loyalty_points_logs 
+         FROM loyalty_points_logs_all 
          WHERE points_redeemed IS NOT NULL) 
-        * 100.0 / NULLIF((SELECT COUNT(order_id) FROM loyalty_points_logs), 0) AS Percentage;
+        * 100.0 / NULLIF((SELECT COUNT(order_id) FROM loyalty_points_logs_all), 0) AS Percentage;
 END;
 //
 DELIMITER ;
@@ -260,7 +371,7 @@ BEGIN
         m.*, 
         COUNT(o.order_id) AS total_orders
     FROM menu_items AS m
-    INNER JOIN order_items AS o
+    INNER JOIN order_items_all AS o
         ON m.item_id = o.item_id
     GROUP BY o.item_id
     ORDER BY total_orders DESC;
@@ -308,7 +419,7 @@ BEGIN
         c.*, 
         COUNT(o.order_id) AS order_count
     FROM customers AS c
-    INNER JOIN orders AS o
+    INNER JOIN orders_all AS o
         ON c.customer_id = o.customer_id
     GROUP BY c.customer_id
     HAVING COUNT(o.order_id) > min_orders;
@@ -326,7 +437,7 @@ BEGIN
 		FROM menu_items AS mi
 		INNER JOIN menu_categories AS mc
 		ON mi.category_id = mc.category_id
-		INNER JOIN order_items as oi
+		INNER JOIN order_items_all as oi
 		ON mi.item_id = oi.item_id
 		GROUP BY mi.item_id, mi.category_id
         ) AS res